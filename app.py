@@ -4,7 +4,16 @@ from modules.transactions import TransactionManager
 from modules.categories import CategoryManager
 from modules.reports import ReportGenerator
 from modules.analytics import FinancialAnalytics
-from auth import AuthManager
+from modules.anomalies import AnomalyDetector
+from modules.maintenance import DatabaseMaintenance
+from modules.session_ledger import SessionLedger
+from modules.ledger_engine import LedgerEngine
+from modules.recurring import RecurringManager
+from modules.pivot import PivotExplorer
+from modules.sharding import sharding_enabled, user_database_path
+from auth import get_auth_manager
+from utils.helpers import format_currency, format_percentage
+from utils.formatting import format_currency_column, format_date_column
 
 # Configuração
 st.set_page_config(page_title="FinanceFlow", page_icon="💰", layout="wide")
@@ -28,35 +37,62 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Inicializar gerenciadores
-auth = AuthManager()
+# Inicializar gerenciadores (usuários: uma instância e uma conexão por processo)
+auth = get_auth_manager()
 
-# Verificar se está logado
-if 'logged_in' not in st.session_state:
-    st.session_state.logged_in = False
-
-if not st.session_state.logged_in:
+# Verificar se está logado (ou se há um token de sessão válido no cookie)
+if not auth.restore_session():
     auth.show_login_form()
     st.stop()
 
 # App principal (só executa se estiver logado)
-db = DatabaseManager()
+# Com o banco dividido, cada conta usa seu arquivo, com conexão reaproveitada entre execuções
+db = DatabaseManager(
+    user_database_path(st.session_state.username),
+    reporting_currency=st.session_state.get('reporting_currency', 'BRL'),
+    pooled=sharding_enabled()
+)
+# Agregados da sessão: depois de uma escrita, só o delta é aplicado (sem recarregar tudo)
+if 'ledger' not in st.session_state:
+    st.session_state.ledger = SessionLedger(db)
+ledger = st.session_state.ledger.attach(db)
+# Período quente (ano corrente) em colunas NumPy, mantido em dia pelas mesmas escritas
+if 'ledger_engine' not in st.session_state:
+    st.session_state.ledger_engine = LedgerEngine(db)
+engine = st.session_state.ledger_engine.attach(db)
 analytics = FinancialAnalytics(db)
 transaction_manager = TransactionManager(db)
 category_manager = CategoryManager(db)
-report_generator = ReportGenerator(db, analytics)
+report_generator = ReportGenerator(db, analytics, ledger, engine)
+anomaly_detector = AnomalyDetector(db)
+recurring_manager = RecurringManager(db)
+pivot_explorer = PivotExplorer(db)
+
+# Manutenção vencida roda uma vez por sessão, com orçamento curto de tempo
+if 'maintenance_checked' not in st.session_state:
+    DatabaseMaintenance(db).run_if_due()
+    st.session_state.maintenance_checked = True
+
+# Lança de uma vez as transações recorrentes vencidas desde o último acesso
+if 'recurring_checked' not in st.session_state:
+    launched = db.materialize_recurring()['inserted']
+    if launched:
+        st.toast(f"🔁 {launched} transações recorrentes lançadas")
+    st.session_state.recurring_checked = True
 
 class FinanceApp:
     def run(self):
         st.sidebar.title(f"👋 Olá, {st.session_state.username}!")
         
         if st.sidebar.button("🚪 Sair"):
-            st.session_state.logged_in = False
+            auth.logout()
             st.rerun()
         
+        st.sidebar.selectbox("💱 Moeda dos relatórios", db.get_currencies(), key='reporting_currency')
+        
         menu = st.sidebar.radio("Navegação", [
             "📊 Dashboard", "💸 Nova Transação", "📋 Histórico", 
-            "📈 Relatórios", "🏷️ Categorias"
+            "📈 Relatórios", "🧮 Explorador", "🔁 Recorrentes", "🏷️ Categorias"
         ])
         
         if menu == "📊 Dashboard":
@@ -71,6 +107,10 @@ class FinanceApp:
                 transaction_manager.show_transaction_history()
         elif menu == "📈 Relatórios":
             report_generator.show_financial_reports()
+        elif menu == "🧮 Explorador":
+            pivot_explorer.show_pivot_explorer()
+        elif menu == "🔁 Recorrentes":
+            recurring_manager.show_recurring_rules()
         elif menu == "🏷️ Categorias":
             category_manager.show_category_management()
     
@@ -78,7 +118,8 @@ class FinanceApp:
         st.header("📊 Dashboard Financeiro")
         
         # Métricas principais
-        summary = db.get_financial_summary()
+        summary = ledger.get_financial_summary()
+        currency = db.reporting_currency
         
         col1, col2, col3, col4 = st.columns(4)
         
@@ -86,30 +127,30 @@ class FinanceApp:
             st.markdown('<div class="metric-card">', unsafe_allow_html=True)
             st.metric(
                 "💰 Saldo Total", 
-                f"R$ {summary['balance']:,.2f}",
-                delta=f"R$ {summary['balance']:,.2f}" if summary['balance'] >= 0 else f"-R$ {abs(summary['balance']):,.2f}",
+                format_currency(summary['balance'], currency),
+                delta=format_currency(summary['balance'], currency) if summary['balance'] >= 0 else f"-{format_currency(abs(summary['balance']), currency)}",
                 delta_color="normal" if summary['balance'] >= 0 else "inverse"
             )
             st.markdown('</div>', unsafe_allow_html=True)
         
         with col2:
             st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("📈 Total Receitas", f"R$ {summary['total_income']:,.2f}")
+            st.metric("📈 Total Receitas", format_currency(summary['total_income'], currency))
             st.markdown('</div>', unsafe_allow_html=True)
         
         with col3:
             st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("📉 Total Despesas", f"R$ {summary['total_expense']:,.2f}")
+            st.metric("📉 Total Despesas", format_currency(summary['total_expense'], currency))
             st.markdown('</div>', unsafe_allow_html=True)
         
         with col4:
             st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("🎯 Taxa de Economia", f"{summary['savings_rate']:.1f}%")
+            st.metric("🎯 Taxa de Economia", format_percentage(summary['savings_rate']))
             st.markdown('</div>', unsafe_allow_html=True)
         
         # Gráficos do dashboard
-        monthly_data = db.get_monthly_summary()
-        expense_by_category = db.get_category_analysis('expense')
+        monthly_data = ledger.get_monthly_summary()
+        expense_by_category = ledger.get_category_analysis('expense')
         
         if not monthly_data.empty:
             col1, col2 = st.columns(2)
@@ -125,9 +166,12 @@ class FinanceApp:
                     pie_chart = analytics.create_expense_pie_chart(expense_by_category)
                     st.plotly_chart(pie_chart, use_container_width=True)
             
+            # Alertas de gastos fora do padrão
+            self.show_anomaly_alerts()
+            
             # Últimas transações
             st.subheader("📝 Últimas Transações")
-            recent_transactions = db.get_transactions(limit=10)
+            recent_transactions = ledger.get_transactions(limit=10)
             
             if not recent_transactions.empty:
                 display_df = recent_transactions.copy()
@@ -135,10 +179,9 @@ class FinanceApp:
                     'income': '📈', 
                     'expense': '📉'
                 })
-                display_df['amount_display'] = display_df['amount'].apply(
-                    lambda x: f"R$ {x:,.2f}"
-                )
-                display_df['date_display'] = display_df['date'].dt.strftime('%d/%m/%Y')
+                # Formatação em lote; cada transação aparece na sua moeda original
+                display_df['amount_display'] = format_currency_column(display_df['amount'], display_df['currency'])
+                display_df['date_display'] = format_date_column(display_df['date'])
                 
                 st.dataframe(
                     display_df[['date_display', 'type_display', 'category', 'amount_display', 'description']],
@@ -188,6 +231,29 @@ class FinanceApp:
                 </div>
                 """, unsafe_allow_html=True)
 
+    def show_anomaly_alerts(self):
+        flagged = anomaly_detector.get_flagged_transactions(limit=5)
+        monthly_jumps = anomaly_detector.get_monthly_jumps()
+        
+        if flagged.empty and monthly_jumps.empty:
+            return
+        
+        st.subheader("⚠️ Gastos Fora do Padrão")
+        
+        currency = db.reporting_currency
+        for _, jump in monthly_jumps.iterrows():
+            st.warning(
+                f"**{jump['category']}**: {format_currency(jump['total'], currency)} neste mês "
+                f"(normalmente {format_currency(jump['usual'], currency)})"
+            )
+        
+        # Cada gasto aparece na sua moeda original
+        for _, row in flagged.iterrows():
+            st.warning(
+                f"{row['icon']} **{row['category']}** em {row['date'].strftime('%d/%m/%Y')}: "
+                f"{format_currency(row['amount'], row['currency'])} ({row['anomaly_score']:.1f}σ acima da média)"
+            )
+
 if __name__ == "__main__":
     app = FinanceApp()
     app.run()
\ No newline at end of file
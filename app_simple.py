@@ -1,30 +1,65 @@
-import streamlit as st
-import pandas as pd
-import plotly.express as px
+"""Visualizador somente leitura (quiosques e celulares).
+
+Uso: streamlit run app_simple.py
+
+Abre o banco com mode=ro e mostra só agregados prontos do SQLite: saldo
+total, totais do mês e as últimas 10 transações. Não importa Plotly e não
+cria tabelas, migra esquema ou insere categorias: o banco é mantido pelo
+app.py. Com o banco dividido por usuário, mostra o livro-caixa do dono.
+"""
 import sqlite3
-import os
-from datetime import datetime
-
-# Configuração simples
-st.set_page_config(page_title="Finance App", page_icon="💰", layout="wide")
-st.title("💰 Gerenciador Financeiro Simples")
-
-# Conexão direta com banco
-conn = sqlite3.connect('data/finance.db', check_same_thread=False)
-cursor = conn.cursor()
-
-# Criar tabela se não existir
-cursor.execute('''
-    CREATE TABLE IF NOT EXISTS transactions (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        amount REAL NOT NULL,
-        type TEXT NOT NULL,
-        category TEXT NOT NULL,
-        description TEXT,
-        date DATE NOT NULL
-    )
-''')
-conn.commit()
-
-st.success("✅ Aplicação carregada com sucesso!")
-st.info("Adicione funcionalidades gradualmente.")
\ No newline at end of file
+from datetime import date
+import pandas as pd
+import streamlit as st
+from database import DatabaseManager
+from modules.sharding import load_shard_config, shard_path
+from utils.helpers import format_currency
+from utils.formatting import format_currency_column, format_date_column
+
+DB_PATH = 'data/finance.db'
+RECENT_LIMIT = 10
+
+def ledger_path(db_path=DB_PATH):
+    config = load_shard_config(db_path)
+    return shard_path(config['owner'], db_path) if config else db_path
+
+def load_overview(db_path):
+    """Saldo total, resumo do mês e últimas transações, em uma conexão somente leitura"""
+    db = DatabaseManager(db_path, read_only=True)
+    try:
+        total = db.get_financial_summary()
+        month = db.get_financial_summary(date.today().replace(day=1), date.today())
+        recent = db.get_transactions(limit=RECENT_LIMIT)
+        return total, month, recent, db.reporting_currency
+    finally:
+        db.close()
+
+st.set_page_config(page_title="Finance App", page_icon="💰", layout="centered")
+st.title("💰 FinanceFlow")
+st.caption("🔒 Modo somente leitura")
+
+try:
+    total, month, recent, currency = load_overview(ledger_path())
+except (sqlite3.Error, pd.errors.DatabaseError):
+    st.error("❌ Banco de dados indisponível. Abra o app completo (app.py) uma vez para criá-lo.")
+    st.stop()
+
+st.metric("💰 Saldo Total", format_currency(total['balance'], currency))
+
+st.subheader(f"📅 {date.today():%m/%Y}")
+col1, col2, col3 = st.columns(3)
+col1.metric("Receitas", format_currency(month['total_income'], currency))
+col2.metric("Despesas", format_currency(month['total_expense'], currency))
+col3.metric("Saldo", format_currency(month['balance'], currency))
+
+st.subheader("📋 Últimas Transações")
+if recent.empty:
+    st.info("📝 Nenhuma transação registrada.")
+else:
+    st.dataframe(pd.DataFrame({
+        'Data': format_date_column(recent['date']),
+        'Tipo': recent['type'].map({'income': '📈', 'expense': '📉'}),
+        'Categoria': recent['category'],
+        'Descrição': recent['description'],
+        'Valor': format_currency_column(recent['amount'], recent['currency']),
+    }), hide_index=True, use_container_width=True)
\ No newline at end of file
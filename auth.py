@@ -1,81 +1,307 @@
 import streamlit as st
+import base64
 import hashlib
+import hmac
+import inspect
+import json
+import secrets
 import sqlite3
+import threading
+import time
+import tempfile
 import os
 
+# Custo da verificação de senha (pago uma vez por login, não a cada execução do script)
+PBKDF2_ITERATIONS = 600000
+PASSWORD_SCHEME = 'pbkdf2_sha256'
+# Validade do token de sessão, em segundos
+SESSION_TTL = 12 * 3600
+# Cookie que guarda o token (sobrevive a recarregar a página sem aparecer na URL)
+SESSION_COOKIE = 'financeflow_session'
+# Parâmetro onde versões antigas punham o token; é retirado da URL ao abrir
+LEGACY_SESSION_PARAM = 'session'
+# st.context.cookies e st.html(unsafe_allow_javascript=...) só existem em versões
+# recentes do Streamlit; sem eles o login vale só para a sessão aberta
+COOKIES_SUPPORTED = hasattr(st, 'context') and hasattr(st, 'html') and (
+    'unsafe_allow_javascript' in inspect.signature(st.html).parameters
+)
+
+# Um AuthManager por banco e por processo
+_auth_managers = {}
+_auth_managers_lock = threading.Lock()
+
+def get_auth_manager(db_path='data/finance.db'):
+    """AuthManager compartilhado: tabela e usuário padrão só são criados na primeira chamada"""
+    with _auth_managers_lock:
+        if db_path not in _auth_managers:
+            _auth_managers[db_path] = AuthManager(db_path)
+        return _auth_managers[db_path]
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
 class AuthManager:
-    def __init__(self, db_path='data/finance.db'):
+    def __init__(self, db_path='data/finance.db', iterations=PBKDF2_ITERATIONS, session_ttl=SESSION_TTL):
         self.db_path = db_path
+        self.iterations = iterations
+        self.session_ttl = session_ttl
+        # Uma conexão reaproveitada por todas as sessões, serializada pelo lock
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.secret = self._load_secret()
+        # Épocas das sessões e tokens revogados em memória: conferir um token não consulta o SQLite
+        self._epochs = {}
+        self._revoked = set()
         self.create_users_table()
         self.create_default_user()  # Cria usuário padrão automaticamente
+        self._load_revoked_tokens()
+    
+    def _load_secret(self):
+        """Chave dos tokens, guardada ao lado do banco para valer entre reinícios"""
+        path = os.path.join(os.path.dirname(self.db_path) or '.', 'session.key')
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            pass
+        
+        # Grava num temporário e publica com link: quem perder a corrida lê a chave já completa
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(secrets.token_bytes(32))
+            os.link(tmp_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp_path)
+        with open(path, 'rb') as f:
+            return f.read()
     
     def create_users_table(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        conn.commit()
-        conn.close()
+        with self._lock:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT UNIQUE NOT NULL,
+                    password_hash TEXT NOT NULL,
+                    session_epoch INTEGER NOT NULL DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            columns = [row[1] for row in self.conn.execute('PRAGMA table_info(users)')]
+            if 'session_epoch' not in columns:
+                self.conn.execute('ALTER TABLE users ADD COLUMN session_epoch INTEGER NOT NULL DEFAULT 0')
+            # Tokens encerrados por logout, guardados até expirarem
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS revoked_tokens (
+                    token_id TEXT PRIMARY KEY,
+                    expires_at INTEGER NOT NULL
+                )
+            ''')
+            self.conn.commit()
+    
+    def _load_revoked_tokens(self):
+        """Descarta as revogações vencidas e carrega as demais na memória"""
+        with self._lock:
+            self.conn.execute('DELETE FROM revoked_tokens WHERE expires_at < ?', (int(time.time()),))
+            self.conn.commit()
+            self._revoked = {row[0] for row in self.conn.execute('SELECT token_id FROM revoked_tokens')}
     
     def create_default_user(self):
         """Cria um usuário padrão admin/1234 se não existir"""
         default_username = "admin"
         default_password = "1234"
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Verificar se já existe
-        cursor.execute('SELECT id FROM users WHERE username = ?', (default_username,))
-        if not cursor.fetchone():
-            password_hash = self.hash_password(default_password)
-            cursor.execute(
-                'INSERT INTO users (username, password_hash) VALUES (?, ?)',
-                (default_username, password_hash)
-            )
-            conn.commit()
-            print("✅ Usuário padrão criado: admin / 1234")
-        
-        conn.close()
+        with self._lock:
+            # Verificar se já existe
+            exists = self.conn.execute('SELECT id FROM users WHERE username = ?', (default_username,)).fetchone()
+        if not exists:
+            if self.register_user(default_username, default_password):
+                print("✅ Usuário padrão criado: admin / 1234")
     
+    # Senhas
     def hash_password(self, password):
-        return hashlib.sha256(password.encode()).hexdigest()
+        """PBKDF2-SHA256 com sal aleatório: pbkdf2_sha256$iterações$sal$hash"""
+        salt = secrets.token_bytes(16)
+        digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, self.iterations)
+        return f"{PASSWORD_SCHEME}${self.iterations}${salt.hex()}${digest.hex()}"
+    
+    def check_password(self, password, password_hash):
+        """Confere a senha; aceita também o SHA-256 sem sal das contas antigas"""
+        if not password_hash.startswith(PASSWORD_SCHEME + '$'):
+            legacy = hashlib.sha256(password.encode()).hexdigest()
+            return hmac.compare_digest(legacy, password_hash)
+        
+        try:
+            _, iterations, salt, expected = password_hash.split('$')
+            digest = hashlib.pbkdf2_hmac('sha256', password.encode(), bytes.fromhex(salt), int(iterations))
+        except ValueError:
+            # Hash corrompido: nenhuma senha confere
+            return False
+        return hmac.compare_digest(digest.hex(), expected)
+    
+    def needs_rehash(self, password_hash):
+        return password_hash.split('$')[:2] != [PASSWORD_SCHEME, str(self.iterations)]
     
     def register_user(self, username, password):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        password_hash = self.hash_password(password)
+        with self._lock:
+            try:
+                self.conn.execute(
+                    'INSERT INTO users (username, password_hash) VALUES (?, ?)',
+                    (username, password_hash)
+                )
+                self.conn.commit()
+                return True
+            except sqlite3.IntegrityError:
+                return False
+    
+    def verify_user(self, username, password):
+        with self._lock:
+            result = self.conn.execute(
+                'SELECT password_hash FROM users WHERE username = ?',
+                (username,)
+            ).fetchone()
+        
+        if not result or not self.check_password(password, result[0]):
+            return False
+        
+        if self.needs_rehash(result[0]):
+            # Senha antiga (SHA-256 ou outro custo): regrava com o esquema atual
+            with self._lock:
+                self.conn.execute(
+                    'UPDATE users SET password_hash = ? WHERE username = ?',
+                    (self.hash_password(password), username)
+                )
+                self.conn.commit()
+        return True
+    
+    # Tokens de sessão
+    def _sign(self, payload):
+        return _b64encode(hmac.new(self.secret, payload.encode(), hashlib.sha256).digest())
+    
+    def _session_epoch(self, username):
+        """Época das sessões do usuário (None se a conta não existe mais).
+        
+        Lida do SQLite uma vez por usuário e processo; depois vem da memória.
+        """
+        if username in self._epochs:
+            return self._epochs[username]
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT session_epoch FROM users WHERE username = ?', (username,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._epochs[username] = row[0]
+        return row[0]
+    
+    def issue_token(self, username):
+        """Token assinado (HMAC-SHA256) com o usuário, um id próprio, a época das sessões e a validade"""
+        data = {
+            'u': username, 'j': secrets.token_urlsafe(12), 'e': self._session_epoch(username),
+            'exp': int(time.time()) + self.session_ttl
+        }
+        payload = _b64encode(json.dumps(data).encode())
+        return f"{payload}.{self._sign(payload)}"
+    
+    def _token_data(self, token):
+        """Conteúdo do token se a assinatura confere, senão None"""
         try:
-            password_hash = self.hash_password(password)
-            cursor.execute(
-                'INSERT INTO users (username, password_hash) VALUES (?, ?)',
-                (username, password_hash)
+            payload, signature = token.split('.')
+            if not hmac.compare_digest(signature, self._sign(payload)):
+                return None
+            data = json.loads(_b64decode(payload))
+        except (ValueError, TypeError, AttributeError):
+            return None
+        return data if isinstance(data, dict) else None
+    
+    def verify_token(self, token):
+        """Usuário do token, ou None se a assinatura não confere, o token expirou, foi revogado ou a conta não existe.
+        
+        Só confere dados em memória (assinatura, validade, revogações e época);
+        o SQLite é lido apenas na primeira verificação de cada usuário no processo.
+        """
+        data = self._token_data(token)
+        if data is None or data.get('exp', 0) < time.time():
+            return None
+        # Tokens sem id (versões anteriores) não podem ser revogados um a um
+        if not data.get('j') or data['j'] in self._revoked:
+            return None
+        epoch = self._session_epoch(data.get('u'))
+        if epoch is None or data.get('e') != epoch:
+            return None
+        return data.get('u')
+    
+    def revoke_token(self, token):
+        """Invalida só este token (logout neste navegador); as outras sessões do usuário continuam"""
+        data = self._token_data(token)
+        if data is None or not data.get('j'):
+            return
+        with self._lock:
+            self.conn.execute(
+                'INSERT OR IGNORE INTO revoked_tokens (token_id, expires_at) VALUES (?, ?)',
+                (data['j'], int(data.get('exp', 0)))
             )
-            conn.commit()
+            self.conn.commit()
+            self._revoked.add(data['j'])
+    
+    def revoke_sessions(self, username):
+        """Invalida todos os tokens já emitidos para o usuário (sai de todos os dispositivos)"""
+        with self._lock:
+            self.conn.execute(
+                'UPDATE users SET session_epoch = session_epoch + 1 WHERE username = ?', (username,)
+            )
+            self.conn.commit()
+            self._epochs.pop(username, None)
+    
+    def _read_cookie(self):
+        return st.context.cookies.get(SESSION_COOKIE) if COOKIES_SUPPORTED else None
+    
+    def _write_cookie(self):
+        """Grava ou apaga no navegador o cookie pendente desta sessão.
+        
+        O cookie é gravado por JavaScript, então nunca pode ser HttpOnly: um
+        script injetado na página conseguiria lê-lo. Sem suporte a cookies na
+        versão instalada do Streamlit, nada é gravado.
+        """
+        token = st.session_state.pop('pending_session_cookie', None)
+        if token is None or not COOKIES_SUPPORTED:
+            return
+        max_age = self.session_ttl if token else 0
+        st.html(
+            f"<script>document.cookie = '{SESSION_COOKIE}={token}; path=/; max-age={max_age}; samesite=strict'"
+            " + (location.protocol === 'https:' ? '; secure' : '');</script>",
+            unsafe_allow_javascript=True
+        )
+    
+    def restore_session(self):
+        """Refaz o login a partir do cookie de sessão quando o session_state foi perdido"""
+        if LEGACY_SESSION_PARAM in st.query_params:
+            del st.query_params[LEGACY_SESSION_PARAM]
+        self._write_cookie()
+        if st.session_state.get('logged_in'):
             return True
-        except sqlite3.IntegrityError:
+        token = self._read_cookie()
+        username = self.verify_token(token) if token else None
+        if username is None:
             return False
-        finally:
-            conn.close()
+        st.session_state.logged_in = True
+        st.session_state.username = username
+        st.session_state.session_token = token
+        return True
     
-    def verify_user(self, username, password):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute(
-            'SELECT password_hash FROM users WHERE username = ?',
-            (username,)
-        )
-        result = cursor.fetchone()
-        conn.close()
-        
-        if result:
-            return result[0] == self.hash_password(password)
-        return False
+    def logout(self):
+        """Sai e revoga o token desta sessão (o cookie copiado deixa de valer; outros dispositivos continuam)"""
+        token = st.session_state.pop('session_token', None) or self._read_cookie()
+        if token:
+            self.revoke_token(token)
+        st.session_state.logged_in = False
+        st.session_state.pending_session_cookie = ''
     
     def show_login_form(self):
         st.header("🔐 Login")
@@ -91,6 +317,9 @@ class AuthManager:
                 if self.verify_user(username, password):
                     st.session_state.logged_in = True
                     st.session_state.username = username
+                    token = self.issue_token(username)
+                    st.session_state.session_token = token
+                    st.session_state.pending_session_cookie = token
                     st.success("✅ Login realizado com sucesso!")
                     st.rerun()
                 else:
@@ -0,0 +1,70 @@
+"""Consultas do período quente: SQL x motor em memória (LedgerEngine).
+
+Uso: python -m benchmarks.ledger_engine [--rows 100000 400000] [--start 2024-01-01] [--repeat 20]
+
+Gera livros-caixa sintéticos (10 anos) e mede, para o último ano, o tempo
+médio de cada consulta pelo caminho SQL (sem o cache de agregados) e pelo
+motor. Mede também o custo de manter o motor em dia após uma escrita: delta
+aplicado nas colunas x recarga completa.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import database
+from database import DatabaseManager
+from modules.ledger_engine import LedgerEngine
+from benchmarks.streaming_memory import build_ledger
+
+def timed(operation, repeat, before=None):
+    """Tempo médio (ms) de operation; before roda fora da medição"""
+    total = 0.0
+    for _ in range(repeat):
+        if before:
+            before()
+        started = time.perf_counter()
+        operation()
+        total += time.perf_counter() - started
+    return total / repeat * 1000
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 400000])
+    parser.add_argument('--start', default='2024-01-01', help='início do período quente')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args(argv)
+    start, end, month_start = args.start, '2024-12-31', '2024-06-01'
+    
+    print(f"{'linhas':>10}  {'consulta':<12} {'SQL (ms)':>10} {'motor (ms)':>11} {'ganho':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = os.path.join(tmp, f'ledger-{rows}.db')
+            build_ledger(path, rows)
+            db = DatabaseManager(path)
+            engine = LedgerEngine(db, start).attach(db)
+            engine.refresh()
+            
+            queries = [
+                ('resumo', lambda: db.get_financial_summary(start, end), lambda: engine.get_financial_summary(start, end)),
+                ('mensal', lambda: db._converted_rollup(['type'], *db._period_filter(start, end)),
+                 lambda: engine.get_monthly_summary(start, end)),
+                ('categorias', lambda: db.get_category_analysis('expense', start, end),
+                 lambda: engine.get_category_analysis('expense', start, end)),
+                ('intervalo', lambda: db.get_transactions(filters={'start_date': month_start, 'end_date': end}),
+                 lambda: engine.get_range(month_start, end)),
+            ]
+            for name, sql, in_memory in queries:
+                sql_ms = timed(sql, args.repeat, before=database._converted_cache.clear)
+                engine_ms = timed(in_memory, args.repeat)
+                print(f"{rows:>10}  {name:<12} {sql_ms:>10.2f} {engine_ms:>11.3f} {sql_ms / engine_ms:>6.0f}x")
+            
+            write = lambda: db.add_transaction(10.0, 'expense', 'Lazer', 'benchmark', '2024-07-15')
+            delta_ms = timed(lambda: (write(), engine.get_financial_summary(start, end)), args.repeat)
+            reload_ms = timed(engine.reload, args.repeat)
+            print(f"{rows:>10}  {'escrita':<12} {'delta':>10} {delta_ms:>10.2f}ms  recarga {reload_ms:.1f}ms"
+                  f"  ({len(engine)} linhas, {engine.nbytes / 1024:.0f} KiB)")
+            db.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+"""Teste de carga com sessões simultâneas sobre os gerenciadores reais.
+
+Uso: python -m benchmarks.load_test [--sessions 8] [--duration 10] [--mix login=1,dashboard=5,report=2,write=2]
+                                    [--connections run|pooled|session|shared] [--rows 20000 | --db data/finance.db]
+
+Cada sessão é uma thread que sorteia ações conforme os pesos de --mix:
+login (AuthManager.verify_user), dashboard e relatórios (as mesmas consultas
+das páginas) e escritas (inclusão e exclusão de transações). --connections
+define como as sessões obtêm o DatabaseManager: 'run' cria um por ação, como o
+app.py faz a cada execução do script; 'pooled' também um por ação, mas com
+pooled=True, como o app.py com o banco dividido por usuário (todas as sessões
+compartilham a conexão e a trava de escrita do arquivo); 'session' um por
+thread; 'shared' um só para todas as threads. O banco é sempre uma cópia
+temporária.
+
+Relata latência p50/p95/p99 por ação, vazão total, erros 'database is locked'
+e a espera pela trava de escrita (p50/p95 do tempo até o BEGIN IMMEDIATE
+conseguir a trava) e quantas transações esperaram mais que --lock-wait-ms.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from auth import get_auth_manager
+from benchmarks.streaming_memory import CATEGORIES, build_ledger
+from database import DatabaseManager
+from utils.helpers import comparison_periods
+
+DEFAULT_MIX = 'login=1,dashboard=5,report=2,write=2'
+
+def parse_mix(text):
+    """'login=1,dashboard=5' -> lista de ações e pesos normalizados"""
+    weights = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in ACTIONS:
+            raise argparse.ArgumentTypeError(f"Ação desconhecida: {name} (use {', '.join(ACTIONS)})")
+        weights[name] = float(weight or 1)
+    total = sum(weights.values())
+    if total <= 0:
+        raise argparse.ArgumentTypeError("Os pesos do mix devem somar mais que zero")
+    return list(weights), [weight / total for weight in weights.values()]
+
+# Ações (recebem a sessão e devolvem nada; exceções contam como erro)
+def login(session):
+    # Como o app: AuthManager único por processo, senha conferida uma vez e token emitido
+    auth = get_auth_manager(session.path)
+    if not auth.verify_user('admin', '1234') or auth.verify_token(auth.issue_token('admin')) != 'admin':
+        raise RuntimeError('login recusado')
+
+def dashboard(session):
+    db = session.database()
+    db.get_financial_summary()
+    db.get_monthly_summary()
+    db.get_category_analysis('expense')
+    db.get_transactions(limit=10)
+
+def report(session):
+    db = session.database()
+    db.get_monthly_summary()
+    db.get_monthly_category_summary()
+    db.get_category_analysis('expense')
+    db.get_category_analysis('income')
+    current, previous = comparison_periods('mom')
+    db.get_period_comparison(current, previous)
+
+def write(session):
+    db = session.database()
+    # Metade das escritas remove uma transação criada pela própria sessão
+    if session.created and session.rng.random() < 0.5:
+        db.delete_transaction(session.created.pop())
+        return
+    category = CATEGORIES[session.rng.randrange(len(CATEGORIES))]
+    transaction_id = db.add_transaction(
+        round(session.rng.uniform(5, 500), 2),
+        'income' if category == 'Salário' else 'expense',
+        category, 'teste de carga', time.strftime('%Y-%m-%d')
+    )
+    session.created.append(transaction_id)
+
+ACTIONS = {'login': login, 'dashboard': dashboard, 'report': report, 'write': write}
+
+class Session:
+    """Estado de uma sessão simulada (uma thread)"""
+    
+    def __init__(self, path, mode, seed, shared=None, lock_waits=None):
+        self.path = path
+        self.mode = mode
+        self.rng = random.Random(seed)
+        self.created = []
+        self.shared = shared
+        self.lock_waits = lock_waits
+        self._db = None
+    
+    def _open(self):
+        db = DatabaseManager(self.path, pooled=self.mode == 'pooled')
+        db.lock_wait_observer = self.lock_waits.append
+        return db
+    
+    def database(self):
+        if self.mode == 'shared':
+            return self.shared
+        if self.mode == 'session':
+            if self._db is None:
+                self._db = self._open()
+            return self._db
+        # 'run' e 'pooled': um gerenciador novo por ação, como cada execução do app.py
+        if self._db is not None:
+            self._db.close()
+        self._db = self._open()
+        return self._db
+    
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+
+def run_session(session, names, weights, deadline, think, results, lock):
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    while time.perf_counter() < deadline:
+        name = session.rng.choices(names, weights)[0]
+        started = time.perf_counter()
+        try:
+            ACTIONS[name](session)
+        except Exception as e:
+            kind = 'database is locked' if 'locked' in str(e) else type(e).__name__
+            errors[(name, kind)] += 1
+        else:
+            samples[name].append(time.perf_counter() - started)
+        if think:
+            time.sleep(session.rng.uniform(0, 2 * think))
+    session.close()
+    
+    with lock:
+        for name, values in samples.items():
+            results['samples'][name].extend(values)
+        for key, count in errors.items():
+            results['errors'][key] += count
+
+def prepare_database(tmp, args):
+    path = os.path.join(tmp, 'load.db')
+    if args.db:
+        # Cópia consistente mesmo com o app em uso
+        source = sqlite3.connect(args.db)
+        target = sqlite3.connect(path)
+        source.backup(target)
+        source.close()
+        target.close()
+    else:
+        build_ledger(path, args.rows)
+    get_auth_manager(path)
+    return path
+
+def report_results(results, elapsed, lock_wait_ms):
+    print(f"{'ação':<10} {'ok':>7} {'erros':>6} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9}")
+    total = 0
+    for name in ACTIONS:
+        values = np.array(results['samples'].get(name, [])) * 1000
+        failed = sum(count for (action, _), count in results['errors'].items() if action == name)
+        if not len(values) and not failed:
+            continue
+        total += len(values)
+        p50, p95, p99 = np.percentile(values, [50, 95, 99]) if len(values) else (np.nan,) * 3
+        print(f"{name:<10} {len(values):>7} {failed:>6} {p50:>9.1f} {p95:>9.1f} {p99:>9.1f}")
+    
+    waits = np.array(results['lock_waits']) * 1000
+    locked = sum(count for (_, kind), count in results['errors'].items() if kind == 'database is locked')
+    print(f"\nVazão: {total / elapsed:.1f} ações/s em {elapsed:.1f} s")
+    print(f"'database is locked': {locked}")
+    if len(waits):
+        p50, p95 = np.percentile(waits, [50, 95])
+        print(f"Espera pela trava de escrita: p50 {p50:.1f} ms, p95 {p95:.1f} ms em {len(waits)} transações")
+        print(f"Transações com espera > {lock_wait_ms:g} ms: {int((waits > lock_wait_ms).sum())}")
+    for (name, kind), count in sorted(results['errors'].items()):
+        if kind != 'database is locked':
+            print(f"Erro em {name}: {kind} x{count}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help='segundos de carga')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    parser.add_argument('--connections', choices=['run', 'pooled', 'session', 'shared'], default='run')
+    parser.add_argument('--think-ms', type=float, default=0.0, help='pausa média entre ações')
+    parser.add_argument('--lock-wait-ms', type=float, default=100.0)
+    parser.add_argument('--rows', type=int, default=20000, help='tamanho do livro-caixa sintético')
+    parser.add_argument('--db', help='banco a copiar em vez do sintético (o original não é alterado)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+    names, weights = args.mix
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = prepare_database(tmp, args)
+        # list.append é atômico: as threads registram as esperas direto na mesma lista
+        results = {'samples': defaultdict(list), 'errors': defaultdict(int), 'lock_waits': []}
+        shared = None
+        if args.connections == 'shared':
+            shared = DatabaseManager(path)
+            shared.lock_wait_observer = results['lock_waits'].append
+        sessions = [
+            Session(path, args.connections, args.seed + i, shared, results['lock_waits'])
+            for i in range(args.sessions)
+        ]
+        lock = threading.Lock()
+        
+        started = time.perf_counter()
+        deadline = started + args.duration
+        threads = [
+            threading.Thread(
+                target=run_session,
+                args=(session, names, weights, deadline, args.think_ms / 1000, results, lock)
+            )
+            for session in sessions
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        if shared is not None:
+            shared.close()
+        
+        print(f"{args.sessions} sessões, conexões '{args.connections}'\n")
+        report_results(results, elapsed, args.lock_wait_ms)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Pico de memória das análises materializadas x em streaming.
+
+Uso: python -m benchmarks.streaming_memory [--rows 100000 400000 1600000] [--chunksize 50000]
+
+Gera livros-caixa sintéticos em um diretório temporário e mede, com
+tracemalloc, o pico de memória de cada abordagem. A materializada cresce com
+o número de linhas; a em streaming fica limitada pelo tamanho do bloco.
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from database import DatabaseManager
+
+CATEGORIES = ['Alimentação', 'Transporte', 'Moradia', 'Lazer', 'Saúde', 'Educação', 'Compras', 'Salário']
+
+def build_ledger(path, rows, seed=42):
+    """Cria um banco com rows transações aleatórias ao longo de 10 anos"""
+    DatabaseManager(path).close()
+    rng = np.random.default_rng(seed)
+    days = rng.integers(0, 3650, rows).astype('timedelta64[D]') + np.datetime64('2015-01-01')
+    categories = rng.integers(0, len(CATEGORIES), rows)
+    amounts = rng.gamma(2.0, 80.0, rows).round(2) + 0.01
+    
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        'INSERT INTO transactions (amount, type, category, description, date) VALUES (?, ?, ?, ?, ?)',
+        (
+            (float(amount), 'income' if CATEGORIES[category] == 'Salário' else 'expense',
+             CATEGORIES[category], 'lançamento sintético', str(day))
+            for amount, category, day in zip(amounts, categories, days)
+        )
+    )
+    conn.commit()
+    conn.close()
+
+def materialized_monthly(db):
+    """Pipeline antigo: carrega todas as transações e agrupa no pandas"""
+    df = db.get_transactions()
+    df['month'] = df['date'].dt.to_period('M').astype(str)
+    return df.groupby(['month', 'type'])['amount'].sum().unstack(fill_value=0)
+
+def measure(operation):
+    tracemalloc.start()
+    started = time.perf_counter()
+    operation()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2**20, elapsed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 400000, 1600000])
+    parser.add_argument('--chunksize', type=int, default=50000)
+    args = parser.parse_args(argv)
+    
+    print(f"{'linhas':>10}  {'abordagem':<14} {'pico (MB)':>10} {'tempo (s)':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = os.path.join(tmp, f'ledger-{rows}.db')
+            build_ledger(path, rows)
+            db = DatabaseManager(path)
+            approaches = [
+                ('materializada', lambda: materialized_monthly(db)),
+                ('streaming', lambda: db.stream_monthly_summary(chunksize=args.chunksize)),
+            ]
+            for name, operation in approaches:
+                peak, elapsed = measure(operation)
+                print(f"{rows:>10}  {name:<14} {peak:>10.1f} {elapsed:>10.2f}")
+            db.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,421 @@
+"""Linha de comando do FinanceFlow, sem Streamlit.
+
+Uso: python -m cli [--db data/finance.db] <comando> [opções]
+
+Os módulos pesados (pandas, plotly) só são importados pelo comando que
+precisa deles, para manter a partida rápida em tarefas agendadas (cron).
+"""
+import argparse
+import json
+import sys
+
+CHARTS = {
+    'trend': ('monthly', 'create_monthly_trend_chart', {}),
+    'income-expense': ('monthly', 'create_income_vs_expense_chart', {}),
+    'expense-pie': ('expense', 'create_expense_pie_chart', {}),
+    'income-pie': ('income', 'create_income_pie_chart', {}),
+    'expense-bar': ('expense', 'create_category_bar_chart', {'type': 'expense'}),
+    'income-bar': ('income', 'create_category_bar_chart', {'type': 'income'}),
+}
+
+def open_database(args):
+    from database import DatabaseManager
+    from modules.sharding import load_shard_config, user_database_path
+    
+    # Banco dividido por usuário: sem --user, usa o livro-caixa do dono
+    config = load_shard_config(args.db)
+    user = args.user or (config['owner'] if config else None)
+    return DatabaseManager(user_database_path(user, args.db), reporting_currency=args.currency.upper())
+
+def write_output(data, args):
+    """Escreve um DataFrame ou dicionário como JSON/CSV no arquivo ou na saída padrão"""
+    import pandas as pd
+    
+    if isinstance(data, dict):
+        if args.format == 'json':
+            text = json.dumps({key: float(value) for key, value in data.items()}, indent=2)
+        else:
+            text = pd.DataFrame([data]).to_csv(index=False)
+    elif args.format == 'json':
+        text = data.to_json(orient='records', date_format='iso', force_ascii=False, indent=2)
+    else:
+        text = data.to_csv(index=False)
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text.rstrip('\n') + '\n')
+
+def read_transactions_file(path):
+    import pandas as pd
+    
+    if path.endswith('.json'):
+        df = pd.read_json(path)
+    else:
+        df = pd.read_csv(path)
+    
+    missing = {'date', 'type', 'category', 'amount'} - set(df.columns)
+    if missing:
+        raise ValueError(f"{path}: colunas ausentes: {', '.join(sorted(missing))}")
+    if 'description' not in df.columns:
+        df['description'] = ''
+    if 'account' not in df.columns:
+        df['account'] = ''
+    if 'currency' not in df.columns:
+        df['currency'] = 'BRL'
+    return df
+
+def cmd_import(args):
+    import pandas as pd
+    from modules.anomalies import AnomalyDetector
+    from utils.helpers import VALIDATION_MESSAGES, validate_transactions
+    
+    db = open_database(args)
+    known_categories = set(db.get_categories()['name'])
+    # A origem numera as linhas repetidas por arquivo (extratos sobrepostos se reconhecem)
+    frames = [read_transactions_file(path).assign(source=path) for path in args.files]
+    df = pd.concat(frames, ignore_index=True)
+    
+    errors = validate_transactions(df, known_categories)
+    df['amount'] = pd.to_numeric(df['amount'], errors='coerce')
+    df['currency'] = df['currency'].fillna('BRL').astype(str).str.upper()
+    unknown_currency = ~df['currency'].isin(db.get_currencies())
+    valid = (errors == 0) & ~unknown_currency
+    rejected = int((~valid).sum())
+    
+    # Motivos de rejeição, contados por código de erro
+    for flag, message in VALIDATION_MESSAGES.items():
+        count = int(((errors & flag) > 0).sum())
+        if count:
+            print(f"⚠️ {count} linhas: {message}", file=sys.stderr)
+    if unknown_currency.any():
+        print(f"⚠️ {int(unknown_currency.sum())} linhas: Moeda sem cotação cadastrada", file=sys.stderr)
+    
+    result = db.add_transactions_bulk(df[valid], on_duplicate=args.on_duplicate)
+    if (result['inserted'] or result['merged']) and not args.skip_rescore:
+        AnomalyDetector(db).rescore_all()
+    
+    print(
+        f"✅ {result['inserted']} transações importadas, {result['duplicates']} duplicadas "
+        f"({result['merged']} mescladas), {rejected} rejeitadas"
+    )
+    db.close()
+    return 1 if rejected and args.strict else 0
+
+def cmd_fx(args):
+    import pandas as pd
+    
+    db = open_database(args)
+    if args.action == 'load':
+        if not args.files:
+            raise ValueError("Informe os arquivos de cotações (colunas date, currency, rate)")
+        frames = [pd.read_json(path) if path.endswith('.json') else pd.read_csv(path) for path in args.files]
+        count = db.save_fx_rates(pd.concat(frames, ignore_index=True))
+        print(f"✅ {count} cotações gravadas")
+    else:
+        write_output(db.get_fx_rates(), args)
+    db.close()
+    return 0
+
+def cmd_summary(args):
+    db = open_database(args)
+    if args.chunksize:
+        write_output(db.stream_financial_summary(args.start, args.end, args.chunksize), args)
+    else:
+        write_output(db.get_financial_summary(args.start, args.end), args)
+    db.close()
+    return 0
+
+def cmd_monthly(args):
+    db = open_database(args)
+    write_output(db.stream_monthly_summary(args.chunksize) if args.chunksize else db.get_monthly_summary(), args)
+    db.close()
+    return 0
+
+def cmd_categories(args):
+    db = open_database(args)
+    if args.chunksize:
+        write_output(db.stream_category_analysis(args.type, chunksize=args.chunksize), args)
+    else:
+        write_output(db.get_category_analysis(args.type), args)
+    db.close()
+    return 0
+
+def cmd_tags(args):
+    db = open_database(args)
+    write_output(db.get_tag_analysis(args.type, args.start, args.end), args)
+    db.close()
+    return 0
+
+def cmd_compare(args):
+    from datetime import date
+    from utils.helpers import comparison_periods
+    
+    db = open_database(args)
+    reference = date.fromisoformat(args.date) if args.date else None
+    current, previous = comparison_periods(args.mode, reference)
+    write_output(db.get_period_comparison(current, previous, args.type), args)
+    db.close()
+    return 0
+
+def cmd_duplicates(args):
+    db = open_database(args)
+    write_output(db.get_near_duplicates(args.window), args)
+    db.close()
+    return 0
+
+def cmd_chart(args):
+    from modules.analytics import FinancialAnalytics
+    
+    db = open_database(args)
+    analytics = FinancialAnalytics(db, cache=None)
+    source, method, params = CHARTS[args.name]
+    data = db.get_monthly_summary() if source == 'monthly' else db.get_category_analysis(source)
+    fig = getattr(analytics, method)(data, **params)
+    db.close()
+    
+    if args.output.endswith('.html'):
+        fig.write_html(args.output, include_plotlyjs='cdn')
+    else:
+        # Imagens estáticas dependem do pacote opcional kaleido
+        try:
+            fig.write_image(args.output)
+        except (ImportError, ValueError, RuntimeError) as e:
+            print(f"❌ Não foi possível gerar a imagem: {e}", file=sys.stderr)
+            return 1
+    print(f"✅ Gráfico salvo em {args.output}")
+    return 0
+
+def cmd_reports(args):
+    from modules.batch_reports import BatchReportGenerator
+    
+    generator = BatchReportGenerator(args.db, args.output_dir, args.workers, args.formats.split(','))
+    result = generator.run(args.month)
+    print(
+        f"✅ {result['generated']} extratos gerados em {result['seconds']:.1f}s "
+        f"({result['reports_per_second']}/s), {result['skipped']} já existentes"
+    )
+    return 1 if result['failed'] else 0
+
+def backup_targets(args):
+    """Um BackupManager por banco: o principal e, no modo por usuário, cada arquivo em data/users"""
+    import os
+    from modules.backup import BackupManager
+    from modules.sharding import shard_files
+    
+    options = dict(keep=args.keep, step_pages=args.step_pages, pause=args.pause)
+    targets = [BackupManager(args.db, args.backup_dir, **options)]
+    for path in shard_files(args.db):
+        name = os.path.splitext(os.path.basename(path))[0]
+        targets.append(BackupManager(path, os.path.join(args.backup_dir, 'users', name), **options))
+    return targets
+
+def cmd_backup(args):
+    import os
+    
+    targets = backup_targets(args)
+    if args.action == 'create':
+        reports = [backups.create_backup() for backups in targets]
+        print(json.dumps(reports if len(reports) > 1 else reports[0], indent=2, ensure_ascii=False))
+    elif args.action == 'list':
+        for backups in targets:
+            for path in backups.list_backups():
+                print(path)
+    elif args.action == 'verify':
+        paths = [args.file] if args.file else [path for backups in targets for path in backups.list_backups()]
+        failures = 0
+        for path in paths:
+            valid, message = targets[0].verify(path)
+            failures += not valid
+            print(f"{'✅' if valid else '❌'} {path}: {message}")
+        return 1 if failures else 0
+    elif args.action == 'restore':
+        if not args.file:
+            raise ValueError("Informe o arquivo de backup a restaurar")
+        # O diretório do backup indica o banco de destino (principal ou de um usuário)
+        directory = os.path.abspath(os.path.dirname(args.file))
+        matches = [backups for backups in targets if os.path.abspath(backups.backup_dir) == directory]
+        if not matches:
+            raise ValueError(f"Backup fora de {args.backup_dir}: {args.file}")
+        print(json.dumps(matches[0].restore(args.file), indent=2, ensure_ascii=False))
+    return 0
+
+def cmd_maintenance(args):
+    from modules.anomalies import AnomalyDetector
+    from modules.maintenance import DatabaseMaintenance
+    
+    db = open_database(args)
+    maintenance = DatabaseMaintenance(db)
+    if args.task == 'rescore':
+        count = AnomalyDetector(db).rescore_all()
+        print(f"✅ {count} transações reavaliadas")
+    elif args.task == 'rebuild-stats':
+        db.rebuild_category_stats()
+        print("✅ Estatísticas por categoria recalculadas")
+    elif args.task == 'auto':
+        print(json.dumps(maintenance.run_if_due(args.time_budget), indent=2, ensure_ascii=False))
+    elif args.task == 'optimize':
+        print(maintenance.optimize(full=True))
+    elif args.task == 'vacuum':
+        if maintenance.enable_incremental_vacuum():
+            print("✅ Banco convertido para vacuum incremental")
+        print(f"{maintenance.incremental_vacuum()} páginas liberadas")
+    elif args.task == 'check':
+        print(maintenance.integrity_check(quick=False))
+    elif args.task == 'all':
+        print(json.dumps(maintenance.run_all(), indent=2, ensure_ascii=False))
+    elif args.task == 'status':
+        print(json.dumps(maintenance.get_status(), indent=2, ensure_ascii=False))
+    db.close()
+    return 0
+
+def cmd_shards(args):
+    from modules.sharding import ShardMigration, load_shard_config, shard_path
+    
+    if args.action == 'migrate':
+        config = ShardMigration(args.db, args.owner).run()
+        print(f"✅ {config['users']} bancos por usuário criados; livro-caixa atual com {config['owner']}")
+    elif args.action == 'status':
+        config = load_shard_config(args.db)
+        if config is None:
+            print("Banco único (modo por usuário desativado)")
+            return 0
+        print(json.dumps(config, indent=2, ensure_ascii=False))
+        for username in ShardMigration(args.db).get_usernames():
+            print(f"{username}: {shard_path(username, args.db)}")
+    return 0
+
+def cmd_recurring(args):
+    from datetime import date, timedelta
+    
+    db = open_database(args)
+    if args.action == 'run':
+        result = db.materialize_recurring(args.until)
+        print(f"✅ {result['inserted']} transações lançadas de {result['rules']} regras ({result['duplicates']} já existiam)")
+    elif args.action == 'list':
+        write_output(db.get_recurring_rules(), args)
+    elif args.action == 'project':
+        until = args.until or (date.today() + timedelta(days=args.days)).isoformat()
+        projection = db.project_recurring(until)
+        projection['date'] = projection['date'].dt.strftime('%Y-%m-%d')
+        write_output(projection, args)
+    db.close()
+    return 0
+
+def add_output_options(parser):
+    parser.add_argument('--format', choices=['json', 'csv'], default='json')
+    parser.add_argument('--output', '-o', help='arquivo de saída (padrão: saída padrão)')
+
+def add_streaming_option(parser):
+    parser.add_argument('--chunksize', type=int,
+                        help='agrega lendo blocos de N linhas (memória limitada em livros-caixa enormes)')
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m cli', description='FinanceFlow sem interface web')
+    parser.add_argument('--db', default='data/finance.db', help='caminho do banco SQLite')
+    parser.add_argument('--currency', default='BRL', help='moeda dos agregados (padrão: BRL)')
+    parser.add_argument('--user', help='livro-caixa do usuário (banco dividido por usuário)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    p = commands.add_parser('import', help='importa transações de arquivos CSV/JSON')
+    p.add_argument('files', nargs='+')
+    p.add_argument('--strict', action='store_true', help='retorna erro se alguma linha for rejeitada')
+    p.add_argument('--skip-rescore', action='store_true', help='não recalcula os escores de anomalia')
+    p.add_argument('--on-duplicate', choices=['skip', 'merge'], default='skip',
+                   help='ignora duplicatas ou atualiza categoria/descrição da existente')
+    p.set_defaults(handler=cmd_import)
+    
+    p = commands.add_parser('duplicates', help='relatório de possíveis duplicatas (mesmo valor, datas próximas)')
+    p.add_argument('--window', type=int, default=3, help='distância máxima em dias')
+    add_output_options(p)
+    p.set_defaults(handler=cmd_duplicates)
+    
+    p = commands.add_parser('fx', help='cotações locais usadas na conversão de moedas')
+    p.add_argument('action', choices=['load', 'list'])
+    p.add_argument('files', nargs='*', help='arquivos CSV/JSON com date, currency, rate (valor em BRL)')
+    add_output_options(p)
+    p.set_defaults(handler=cmd_fx)
+    
+    p = commands.add_parser('summary', help='resumo financeiro do período')
+    p.add_argument('--start', help='data inicial (AAAA-MM-DD)')
+    p.add_argument('--end', help='data final (AAAA-MM-DD)')
+    add_output_options(p)
+    add_streaming_option(p)
+    p.set_defaults(handler=cmd_summary)
+    
+    p = commands.add_parser('monthly', help='consolidado mensal')
+    add_output_options(p)
+    add_streaming_option(p)
+    p.set_defaults(handler=cmd_monthly)
+    
+    p = commands.add_parser('categories', help='análise por categoria')
+    p.add_argument('--type', choices=['expense', 'income'], default='expense')
+    add_output_options(p)
+    add_streaming_option(p)
+    p.set_defaults(handler=cmd_categories)
+    
+    p = commands.add_parser('tags', help='totais por tag (transações com várias tags contam em cada uma)')
+    p.add_argument('--type', choices=['expense', 'income'], default='expense')
+    p.add_argument('--start', help='data inicial (AAAA-MM-DD)')
+    p.add_argument('--end', help='data final (AAAA-MM-DD)')
+    add_output_options(p)
+    p.set_defaults(handler=cmd_tags)
+    
+    p = commands.add_parser('compare', help='comparação por categoria com o período anterior (mês a mês / ano a ano)')
+    p.add_argument('--mode', choices=['mom', 'yoy'], default='mom')
+    p.add_argument('--date', help='data de referência (AAAA-MM-DD, padrão: hoje)')
+    p.add_argument('--type', choices=['expense', 'income'])
+    add_output_options(p)
+    p.set_defaults(handler=cmd_compare)
+    
+    p = commands.add_parser('chart', help='gera um gráfico em HTML ou imagem (PNG/SVG/PDF)')
+    p.add_argument('name', choices=sorted(CHARTS))
+    p.add_argument('--output', '-o', required=True)
+    p.set_defaults(handler=cmd_chart)
+    
+    p = commands.add_parser('reports', help='gera extratos mensais de todos os usuários em paralelo')
+    p.add_argument('--month', required=True, help='mês do extrato (AAAA-MM)')
+    p.add_argument('--output-dir', default='reports')
+    p.add_argument('--workers', type=int, help='processos em paralelo (padrão: núcleos da CPU)')
+    p.add_argument('--formats', default='html', help='formatos separados por vírgula: html,png')
+    p.set_defaults(handler=cmd_reports)
+    
+    p = commands.add_parser('backup', help='backup online, verificação e restauração do banco (e dos bancos por usuário)')
+    p.add_argument('action', choices=['create', 'list', 'verify', 'restore'])
+    p.add_argument('file', nargs='?', help='arquivo de backup (verify/restore)')
+    p.add_argument('--backup-dir', default='data/backups')
+    p.add_argument('--keep', type=int, default=7, help='quantidade de backups mantidos na rotação')
+    p.add_argument('--step-pages', type=int, default=256, help='páginas copiadas por passo')
+    p.add_argument('--pause', type=float, default=0.0, help='pausa entre passos, em segundos')
+    p.set_defaults(handler=cmd_backup)
+    
+    p = commands.add_parser('maintenance', help='tarefas de manutenção do banco')
+    p.add_argument('task', choices=['auto', 'all', 'optimize', 'vacuum', 'check', 'status', 'rescore', 'rebuild-stats'])
+    p.add_argument('--time-budget', type=float, default=5.0, help="limite em segundos para 'auto'")
+    p.set_defaults(handler=cmd_maintenance)
+    
+    p = commands.add_parser('recurring', help='transações recorrentes: lança as vencidas ou projeta as próximas')
+    p.add_argument('action', choices=['run', 'list', 'project'])
+    p.add_argument('--until', help="data limite AAAA-MM-DD (run: hoje; project: hoje + --days)")
+    p.add_argument('--days', type=int, default=30, help='horizonte da projeção em dias')
+    add_output_options(p)
+    p.set_defaults(handler=cmd_recurring)
+    
+    p = commands.add_parser('shards', help='divide o banco em um arquivo por usuário')
+    p.add_argument('action', choices=['migrate', 'status'])
+    p.add_argument('--owner', default='admin', help='usuário que recebe o livro-caixa atual')
+    p.set_defaults(handler=cmd_shards)
+    
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.handler(args)
+    except (ValueError, OSError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,20 +1,257 @@
 import sqlite3
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 import pandas as pd
+import numpy as np
 from datetime import datetime, date
+from pathlib import Path
 import os
+import json
+from utils.helpers import (
+    DEFAULT_CURRENCY, fingerprint, fingerprint_keys, normalize_tags, recurrence_dates, transaction_fingerprints
+)
+
+# Mínimo de lançamentos anteriores na categoria para calcular o escore de anomalia
+ANOMALY_MIN_SAMPLES = 5
+# Desvio mínimo (fração da média) para categorias com valores quase constantes
+ANOMALY_MIN_STD_RATIO = 0.05
+# Versão do cálculo de category_stats; bancos com versão menor são recalculados (2: valores em BRL)
+STATS_VERSION = 2
+# Janela móvel das estatísticas: o mês corrente e os meses anteriores até completar esta quantidade
+# de meses fechados; padrões de gasto antigos deixam de esconder as anomalias atuais
+ANOMALY_WINDOW_MONTHS = 12
+
+def stats_window_start(today=None):
+    """Primeiro dia da janela das estatísticas de anomalia ('AAAA-MM-DD')"""
+    today = today or date.today()
+    months = today.year * 12 + today.month - 1 - ANOMALY_WINDOW_MONTHS
+    return f'{months // 12:04d}-{months % 12 + 1:02d}-01'
+
+def welford_add(count, mean, m2, value):
+    """Inclui um valor nas estatísticas acumuladas (algoritmo de Welford)"""
+    count += 1
+    delta = value - mean
+    mean += delta / count
+    m2 += delta * (value - mean)
+    return count, mean, m2
+
+def welford_remove(count, mean, m2, value):
+    """Remove um valor das estatísticas acumuladas"""
+    if count <= 1:
+        return 0, 0.0, 0.0
+    old_mean = (count * mean - value) / (count - 1)
+    m2 = max(m2 - (value - old_mean) * (value - mean), 0.0)
+    return count - 1, old_mean, m2
+
+# Linhas por bloco nas leituras em streaming
+DEFAULT_CHUNKSIZE = 50000
+
+# Totais convertidos em memória, por banco, moeda de relatório e revisões do livro e das cotações
+CONVERTED_CACHE_SIZE = 32
+_converted_cache = OrderedDict()
+_converted_cache_lock = threading.Lock()
+# Cotação vigente na data (busca pela chave primária currency, date), ou a primeira
+# cotação para datas anteriores; moedas sem cotação (BRL) valem 1
+FX_RATE_SQL = '''COALESCE(
+    (SELECT rate FROM fx_rates f WHERE f.currency = {currency} AND f.date <= {date} ORDER BY f.date DESC LIMIT 1),
+    (SELECT rate FROM fx_rates f WHERE f.currency = {currency} ORDER BY f.date LIMIT 1),
+    1.0
+)'''
+# Valor da transação t em BRL: moeda das estatísticas e escores de anomalia
+BASE_AMOUNT_SQL = f"t.amount * {FX_RATE_SQL.format(currency='t.currency', date='t.date')}"
+
+# Explorador de tabelas dinâmicas: dimensões e medidas que podem ser combinadas
+PIVOT_DIMENSIONS = {
+    'month': "strftime('%Y-%m', t.date)",
+    'week': "strftime('%Y-S%W', t.date)",
+    'weekday': "CAST(strftime('%w', t.date) AS INTEGER)",
+    'category': 't.category',
+    'type': 't.type',
+    'tag': 'g.name',
+}
+PIVOT_MEASURES = {
+    'sum': 'SUM(amount)',
+    'count': 'COUNT(*)',
+    'avg': 'AVG(amount)',
+    # Mediana: média do(s) elemento(s) central(is) numerados pela janela do CTE ranked
+    'median': 'AVG(CASE WHEN rn IN ((n + 1) / 2, (n + 2) / 2) THEN amount END)',
+}
+# Linhas devolvidas por uma consulta dinâmica (o excedente é descartado no próprio SQLite)
+PIVOT_MAX_ROWS = 5000
+
+# Conexões reaproveitadas entre execuções (modo por usuário), uma por arquivo, com a
+# trava de escrita compartilhada por quem a usa; as menos usadas saem primeiro
+CONNECTION_CACHE_SIZE = 16
+_connection_cache = OrderedDict()
+_connection_cache_lock = threading.Lock()
+_initialized_paths = set()
+
+class _PooledConnection:
+    """Conexão do cache com a trava de escrita do arquivo e a contagem de gerenciadores que a usam"""
+    
+    def __init__(self, conn):
+        self.conn = conn
+        self.lock = threading.RLock()
+        self.users = 0
+        self.evicted = False
+    
+    def release(self):
+        """Devolve a conexão; uma conexão já removida do cache é fechada pelo último usuário"""
+        with _connection_cache_lock:
+            self.users -= 1
+            close = self.evicted and self.users == 0
+        if close:
+            self.conn.close()
+
+def anomaly_score(count, mean, m2, value):
+    """Escore z do valor frente às estatísticas da categoria (None se houver poucos dados)"""
+    if count < ANOMALY_MIN_SAMPLES:
+        return None
+    std = max(math.sqrt(m2 / (count - 1)), abs(mean) * ANOMALY_MIN_STD_RATIO, 0.01)
+    return (value - mean) / std
+
+def build_financial_summary(total_income, total_expense):
+    balance = total_income - total_expense
+    savings_rate = (balance / total_income * 100) if total_income > 0 else 0
+    return {
+        'total_income': total_income,
+        'total_expense': total_expense,
+        'balance': balance,
+        'savings_rate': savings_rate
+    }
+
+def build_monthly_summary(monthly):
+    """Completa a tabela mês x tipo com saldo e taxa de economia"""
+    monthly['balance'] = monthly.get('income', 0) - monthly.get('expense', 0)
+    monthly['savings_rate'] = (monthly['balance'] / monthly.get('income', 1) * 100).round(1)
+    return monthly.reset_index()
+
+def build_category_frame(totals, styles):
+    """Totais por categoria (total_amount, transaction_count) com cor e ícone, do maior para o menor"""
+    category_df = totals.round(2).join(styles)
+    category_df = category_df.sort_values('total_amount', ascending=False)
+    return category_df.reset_index()
 
 class DatabaseManager:
-    def __init__(self, db_path='data/finance.db'):
+    def __init__(self, db_path='data/finance.db', read_only=False, reporting_currency=DEFAULT_CURRENCY,
+                 pooled=False):
+        self.db_path = db_path
+        self.read_only = read_only
+        self.pooled = pooled
+        # Moeda em que os agregados (resumos, mensal, categorias) são apresentados
+        self.reporting_currency = reporting_currency
+        # Chamados após cada escrita unitária confirmada (ver _notify_write)
+        self._write_listeners = []
+        # Chamado com a espera (s) pela trava de escrita de cada transação (teste de carga)
+        self.lock_wait_observer = None
+        
+        # Profundidade das escritas aninhadas, por thread, e trava das escritas
+        # (no modo pooled, a da conexão compartilhada)
+        self._local = threading.local()
+        self._write_lock = threading.RLock()
+        self._pooled = None
+        
+        if read_only:
+            # Somente leitura: sem criação de tabelas, migrações ou categorias padrão
+            uri = f"{Path(db_path).absolute().as_uri()}?mode=ro"
+            self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            self.conn.row_factory = sqlite3.Row
+            return
+        
+        if pooled:
+            self._pooled = self._pooled_connection()
+            self.conn = self._pooled.conn
+            self._write_lock = self._pooled.lock
+            return
+        
+        self.conn = self._open()
+        self._setup_schema()
+    
+    def _open(self):
         # Garantir que o diretório data existe
-        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         
-        self.db_path = db_path
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def _setup_schema(self):
+        # Só tem efeito em bancos novos; bancos existentes migram em update_database_schema
+        self.conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
         self.create_tables()
         self.update_database_schema()
         self.insert_default_categories()
     
+    def _pooled_connection(self):
+        """Conexão do arquivo no cache LRU, chaveado só pelo arquivo.
+        
+        Cada execução do Streamlit roda em uma thread nova, então a conexão é
+        compartilhada entre threads (check_same_thread=False); as escritas de
+        todos os gerenciadores do arquivo passam pela mesma trava. Criação de
+        tabelas e migrações só rodam na primeira abertura de cada arquivo.
+        """
+        path = os.path.abspath(self.db_path)
+        evicted = []
+        with _connection_cache_lock:
+            pooled = _connection_cache.get(path)
+            if pooled is not None:
+                _connection_cache.move_to_end(path)
+            else:
+                pooled = _PooledConnection(self._open())
+                self.conn = pooled.conn
+                if path not in _initialized_paths:
+                    self._setup_schema()
+                    _initialized_paths.add(path)
+                _connection_cache[path] = pooled
+                while len(_connection_cache) > CONNECTION_CACHE_SIZE:
+                    # Conexões em uso são fechadas quando o último gerenciador as devolve
+                    _, old = _connection_cache.popitem(last=False)
+                    old.evicted = True
+                    if old.users == 0:
+                        evicted.append(old.conn)
+            pooled.users += 1
+        for conn in evicted:
+            conn.close()
+        return pooled
+    
+    @contextmanager
+    def _write_transaction(self):
+        """Escrita atômica: BEGIN IMMEDIATE pega a trava de escrita do SQLite antes da primeira leitura.
+        
+        Leituras e escritas de uma operação (estatísticas, totais do mês, revisão)
+        não se intercalam com as de outra conexão ou thread. Chamadas aninhadas
+        participam da transação de fora, que faz o commit.
+        """
+        started = time.perf_counter()
+        with self._write_lock:
+            depth = getattr(self._local, 'write_depth', 0)
+            conn = self.conn
+            if depth:
+                self._local.write_depth = depth + 1
+                try:
+                    yield conn.cursor()
+                finally:
+                    self._local.write_depth = depth
+                return
+            
+            conn.execute('BEGIN IMMEDIATE')
+            if self.lock_wait_observer is not None:
+                # Espera pela trava do gerenciador e pela do SQLite (busy timeout)
+                self.lock_wait_observer(time.perf_counter() - started)
+            self._local.write_depth = 1
+            try:
+                yield conn.cursor()
+            except BaseException:
+                conn.rollback()
+                raise
+            else:
+                conn.commit()
+            finally:
+                self._local.write_depth = 0
+    
     def create_tables(self):
         cursor = self.conn.cursor()
         
@@ -40,10 +277,114 @@ class DatabaseManager:
                 description TEXT,
                 date DATE NOT NULL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                anomaly_score REAL,
+                account TEXT NOT NULL DEFAULT '',
+                fingerprint TEXT,
+                currency TEXT NOT NULL DEFAULT 'BRL',
+                FOREIGN KEY (category) REFERENCES categories (name)
+            )
+        ''')
+        
+        # Cotações locais: valor de 1 unidade da moeda em BRL, vigente a partir da data
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS fx_rates (
+                currency TEXT NOT NULL,
+                date DATE NOT NULL,
+                rate REAL NOT NULL CHECK(rate > 0),
+                PRIMARY KEY (currency, date)
+            )
+        ''')
+        
+        # Regras de transações recorrentes; materialized_through é a última data já lançada
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS recurring_rules (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                amount REAL NOT NULL CHECK(amount > 0),
+                type TEXT NOT NULL CHECK(type IN ('income', 'expense')),
+                category TEXT NOT NULL,
+                description TEXT,
+                currency TEXT NOT NULL DEFAULT 'BRL',
+                frequency TEXT NOT NULL CHECK(frequency IN ('monthly', 'weekly', 'daily')),
+                interval INTEGER NOT NULL DEFAULT 1 CHECK(interval >= 1),
+                start_date DATE NOT NULL,
+                end_date DATE,
+                materialized_through DATE,
+                active INTEGER NOT NULL DEFAULT 1,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (category) REFERENCES categories (name)
             )
         ''')
         
+        # Tags: relação N:N com índices nos dois sentidos (transação -> tags e tag -> transações)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS tags (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL UNIQUE,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS transaction_tags (
+                transaction_id INTEGER NOT NULL,
+                tag_id INTEGER NOT NULL,
+                PRIMARY KEY (transaction_id, tag_id),
+                FOREIGN KEY (transaction_id) REFERENCES transactions (id),
+                FOREIGN KEY (tag_id) REFERENCES tags (id)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_transaction_tags_tag
+            ON transaction_tags (tag_id, transaction_id)
+        ''')
+        # Mudanças nos vínculos invalidam os resultados em cache que agrupam por tag
+        for event in ('INSERT', 'DELETE'):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_transaction_tags_{event.lower()}_revision
+                AFTER {event} ON transaction_tags
+                BEGIN
+                    UPDATE meta SET value = value + 1 WHERE key = 'tag_revision';
+                END
+            ''')
+        # Excluir a transação (por qualquer caminho) remove seus vínculos com tags
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_transactions_delete_tags
+            AFTER DELETE ON transactions
+            BEGIN
+                DELETE FROM transaction_tags WHERE transaction_id = old.id;
+            END
+        ''')
+        
+        # Contadores de revisão: invalidam os totais convertidos em cache
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            INSERT OR IGNORE INTO meta (key, value)
+            VALUES ('ledger_revision', 0), ('fx_revision', 0), ('tag_revision', 0)
+        ''')
+        
+        # Estatísticas acumuladas por categoria para detecção de anomalias
+        # scope 'transaction': valores individuais; scope 'month': totais mensais
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS category_stats (
+                category TEXT NOT NULL,
+                scope TEXT NOT NULL CHECK(scope IN ('transaction', 'month')),
+                count INTEGER NOT NULL DEFAULT 0,
+                mean REAL NOT NULL DEFAULT 0,
+                m2 REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (category, scope)
+            )
+        ''')
+        
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (date)')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_transactions_category_date
+            ON transactions (category, date)
+        ''')
+        
         self.conn.commit()
     
     def update_database_schema(self):
@@ -62,7 +403,56 @@ class DatabaseManager:
                     ADD COLUMN created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 ''')
             
+            if 'anomaly_score' not in columns:
+                cursor.execute('ALTER TABLE transactions ADD COLUMN anomaly_score REAL')
+            
+            # Deduplicação de importações: conta de origem e impressão digital única
+            if 'account' not in columns:
+                cursor.execute("ALTER TABLE transactions ADD COLUMN account TEXT NOT NULL DEFAULT ''")
+            if 'fingerprint' not in columns:
+                cursor.execute('ALTER TABLE transactions ADD COLUMN fingerprint TEXT')
+            cursor.execute('''
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_fingerprint
+                ON transactions (fingerprint)
+            ''')
+            # Linhas anteriores à deduplicação também recebem impressão, para que importações as reconheçam
+            legacy = pd.read_sql_query('''
+                SELECT id, date, type, amount, description, account FROM transactions
+                WHERE fingerprint IS NULL ORDER BY id
+            ''', self.conn)
+            if not legacy.empty:
+                cursor.executemany(
+                    'UPDATE transactions SET fingerprint = ? WHERE id = ?',
+                    zip(self._free_fingerprints(cursor, legacy), legacy['id'].tolist())
+                )
+            
+            if 'currency' not in columns:
+                cursor.execute("ALTER TABLE transactions ADD COLUMN currency TEXT NOT NULL DEFAULT 'BRL'")
+            
+            # Qualquer mudança que altere valores agregados incrementa a revisão do livro
+            for event in ('INSERT', 'UPDATE OF amount, type, category, date, currency', 'DELETE'):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS trg_transactions_{event.split()[0].lower()}_revision
+                    AFTER {event} ON transactions
+                    BEGIN
+                        UPDATE meta SET value = value + 1 WHERE key = 'ledger_revision';
+                    END
+                ''')
+            
             self.conn.commit()
+            
+            # Bancos antigos: popula as estatísticas a partir do histórico existente
+            # (e refaz as calculadas antes de serem convertidas para BRL)
+            stats_count = cursor.execute('SELECT COUNT(*) FROM category_stats').fetchone()[0]
+            if stats_count == 0 or self._revision('stats_version') < STATS_VERSION or self._stats_window_moved():
+                self.rebuild_category_stats()
+                cursor.execute('''
+                    INSERT INTO meta (key, value) VALUES ('stats_version', ?)
+                    ON CONFLICT (key) DO UPDATE SET value = excluded.value
+                ''', (STATS_VERSION,))
+                self.conn.commit()
+            # Bancos antigos passam ao vacuum incremental pela manutenção (python -m cli maintenance vacuum):
+            # a conversão exige um VACUUM completo, longo demais para a abertura do app
         except Exception as e:
             print(f"Aviso na atualização do schema: {e}")
     
@@ -98,23 +488,279 @@ class DatabaseManager:
         
         self.conn.commit()
     
+    # Notificação de escritas
+    def add_write_listener(self, listener):
+        """Registra uma função chamada com o evento de cada escrita confirmada"""
+        self._write_listeners.append(listener)
+    
+    def remove_write_listener(self, listener):
+        if listener in self._write_listeners:
+            self._write_listeners.remove(listener)
+    
+    def _notify_write(self, action, before, after, revision):
+        """Avisa os ouvintes: linhas antes/depois da escrita e a revisão do livro gerada por ela"""
+        event = {'action': action, 'before': before, 'after': after, 'revision': revision}
+        for listener in list(self._write_listeners):
+            listener(event)
+    
     # Métodos para Transações
-    def add_transaction(self, amount, type, category, description, date):
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            INSERT INTO transactions (amount, type, category, description, date)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (amount, type, category, description, date))
-        self.conn.commit()
-        return cursor.lastrowid
+    def add_transaction(self, amount, type, category, description, date, currency=DEFAULT_CURRENCY, tags=None):
+        with self._write_transaction() as cursor:
+            self._roll_stats_window()
+            month_key = (category, str(date)[:7])
+            total_before = self._month_total(cursor, month_key)
+            
+            # Estatísticas e escore em BRL, para não misturar moedas na mesma categoria
+            base_amount = amount * self._base_rate(cursor, currency, date)
+            score = self._score_transaction(cursor, category, base_amount)
+            [row_fingerprint] = self._free_fingerprints(cursor, pd.DataFrame({
+                'date': [date], 'type': [type], 'amount': [amount], 'description': [description]
+            }))
+            cursor.execute('''
+                INSERT INTO transactions (amount, type, category, description, date, anomaly_score, currency,
+                                          fingerprint)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (amount, type, category, description, date, score, currency, row_fingerprint))
+            transaction_id = cursor.lastrowid
+            if tags:
+                self._set_tags(cursor, transaction_id, tags)
+            
+            self._update_transaction_stats(cursor, category, date, base_amount, welford_add)
+            self._update_month_stats(cursor, month_key, total_before, total_before + base_amount)
+            revision = self._revision('ledger_revision')
+        
+        self._notify_write('insert', None, self._transaction_row(transaction_id), revision)
+        return transaction_id
     
-    def get_transactions(self, limit=None, filters=None):
-        query = '''
-            SELECT t.*, c.color, c.icon 
+    def _free_fingerprints(self, cursor, transactions):
+        """Impressões de linhas lançadas fora de uma importação: a primeira ocorrência ainda livre.
+        
+        Um lançamento manual igual a uma linha já importada (ou vice-versa) ocupa
+        a ocorrência seguinte, sem violar o índice único; uma importação posterior
+        do mesmo extrato reconhece as linhas já lançadas.
+        """
+        taken = set()
+        fingerprints = []
+        for key in fingerprint_keys(transactions):
+            occurrence = 0
+            while True:
+                candidate = fingerprint(key, occurrence)
+                if candidate not in taken and cursor.execute(
+                    'SELECT 1 FROM transactions WHERE fingerprint = ?', (candidate,)
+                ).fetchone() is None:
+                    break
+                occurrence += 1
+            taken.add(candidate)
+            fingerprints.append(candidate)
+        return fingerprints
+    
+    def add_transactions_bulk(self, transactions, on_duplicate='skip'):
+        """Importa um DataFrame de transações em um único commit.
+        
+        Duplicatas são detectadas pela impressão digital (índice único): com
+        on_duplicate='skip' são ignoradas; com 'merge' a categoria e a descrição
+        da transação existente são atualizadas.
+        """
+        if transactions.empty:
+            return {'inserted': 0, 'duplicates': 0, 'merged': 0}
+        
+        transactions = transactions.assign(
+            description=transactions['description'].fillna('').astype(str)
+        )
+        rows = pd.DataFrame({
+            'amount': transactions['amount'].astype(float),
+            'type': transactions['type'],
+            'category': transactions['category'],
+            'description': transactions['description'],
+            'date': pd.to_datetime(transactions['date']).dt.strftime('%Y-%m-%d'),
+            'account': transactions['account'].fillna('').astype(str) if 'account' in transactions else '',
+            'fingerprint': (
+                transactions['fingerprint'] if 'fingerprint' in transactions
+                else transaction_fingerprints(transactions)
+            ),
+            'currency': (
+                transactions['currency'].fillna(DEFAULT_CURRENCY).astype(str).str.upper()
+                if 'currency' in transactions else DEFAULT_CURRENCY
+            )
+        })
+        
+        if on_duplicate == 'merge':
+            conflict = 'DO UPDATE SET category = excluded.category, description = excluded.description'
+        else:
+            conflict = 'DO NOTHING'
+        
+        with self._write_transaction() as cursor:
+            count_before = cursor.execute('SELECT COUNT(*) FROM transactions').fetchone()[0]
+            cursor.executemany(f'''
+                INSERT INTO transactions (amount, type, category, description, date, account, fingerprint, currency)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (fingerprint) {conflict}
+            ''', rows.itertuples(index=False, name=None))
+            changed = cursor.rowcount
+            inserted = cursor.execute('SELECT COUNT(*) FROM transactions').fetchone()[0] - count_before
+            
+            # Um recálculo em SQL sai mais barato que atualizar as estatísticas linha a linha
+            if inserted or changed:
+                self.rebuild_category_stats()
+        return {
+            'inserted': inserted,
+            'duplicates': len(rows) - inserted,
+            'merged': changed - inserted if on_duplicate == 'merge' else 0
+        }
+    
+    def get_near_duplicates(self, window_days=3):
+        """Pares com mesmo tipo e valor a até window_days dias um do outro.
+        
+        Em vez de comparar todos os pares, ordena por (tipo, valor, data) e, para
+        cada transação, localiza por busca binária o fim da sua janela.
+        """
+        df = pd.read_sql_query(
+            'SELECT id, date, type, amount, category, description, account FROM transactions',
+            self.conn
+        )
+        columns = ['id_a', 'id_b', 'date_a', 'date_b', 'type', 'amount', 'days_apart',
+                   'description_a', 'description_b']
+        if len(df) < 2:
+            return pd.DataFrame(columns=columns)
+        
+        days = pd.to_datetime(df['date']).to_numpy().astype('datetime64[D]').astype(np.int64)
+        cents = (df['amount'].to_numpy() * 100).round().astype(np.int64)
+        type_codes = pd.factorize(df['type'])[0]
+        
+        order = np.lexsort((days, cents, type_codes))
+        df = df.iloc[order].reset_index(drop=True)
+        days, cents, type_codes = days[order], cents[order], type_codes[order]
+        new_group = np.r_[True, (cents[1:] != cents[:-1]) | (type_codes[1:] != type_codes[:-1])]
+        groups = np.cumsum(new_group) - 1
+        
+        # Chave composta crescente: grupo (tipo, valor) e, dentro dele, o dia
+        offset = days - days.min()
+        span = int(offset.max()) + window_days + 1
+        keys = groups * span + offset
+        window_end = np.searchsorted(keys, keys + window_days, side='right')
+        
+        # Gera os pares (i, j) com i < j < fim da janela de i
+        pair_counts = window_end - np.arange(len(df)) - 1
+        first = np.repeat(np.arange(len(df)), pair_counts)
+        starts = np.repeat(np.cumsum(pair_counts) - pair_counts, pair_counts)
+        second = first + 1 + (np.arange(len(first)) - starts)
+        
+        a = df.iloc[first].reset_index(drop=True)
+        b = df.iloc[second].reset_index(drop=True)
+        return pd.DataFrame({
+            'id_a': a['id'],
+            'id_b': b['id'],
+            'date_a': a['date'],
+            'date_b': b['date'],
+            'type': a['type'],
+            'amount': a['amount'],
+            'days_apart': days[second] - days[first],
+            'description_a': a['description'],
+            'description_b': b['description']
+        }, columns=columns)
+    
+    def update_transaction(self, transaction_id, amount, type, category, description, date, currency=None,
+                           tags=None):
+        with self._write_transaction() as cursor:
+            old = cursor.execute(
+                f'SELECT category, date, currency, {BASE_AMOUNT_SQL} AS base_amount FROM transactions t WHERE id = ?',
+                (transaction_id,)
+            ).fetchone()
+            if old is None:
+                return False
+            before = self._transaction_row(transaction_id)
+            self._roll_stats_window()
+            
+            month_keys = {(old['category'], str(old['date'])[:7]), (category, str(date)[:7])}
+            totals_before = {key: self._month_total(cursor, key) for key in month_keys}
+            
+            # Tira o valor antigo das estatísticas antes de pontuar o novo
+            self._update_transaction_stats(cursor, old['category'], old['date'], old['base_amount'], welford_remove)
+            base_amount = amount * self._base_rate(cursor, currency or old['currency'], date)
+            score = self._score_transaction(cursor, category, base_amount)
+            cursor.execute('''
+                UPDATE transactions 
+                SET amount = ?, type = ?, category = ?, description = ?, date = ?, anomaly_score = ?,
+                    currency = COALESCE(?, currency)
+                WHERE id = ?
+            ''', (amount, type, category, description, date, score, currency, transaction_id))
+            updated = cursor.rowcount > 0
+            # tags=None mantém as tags atuais; uma lista vazia remove todas
+            if tags is not None:
+                self._set_tags(cursor, transaction_id, tags)
+            
+            self._update_transaction_stats(cursor, category, date, base_amount, welford_add)
+            for key, total_before in totals_before.items():
+                self._update_month_stats(cursor, key, total_before, self._month_total(cursor, key))
+            revision = self._revision('ledger_revision')
+        
+        if updated:
+            self._notify_write('update', before, self._transaction_row(transaction_id), revision)
+        return updated
+    
+    # Tags
+    def _set_tags(self, cursor, transaction_id, tags):
+        """Substitui as tags da transação (sem commit)"""
+        names = normalize_tags(tags)
+        cursor.executemany('INSERT OR IGNORE INTO tags (name) VALUES (?)', [(name,) for name in names])
+        cursor.execute('DELETE FROM transaction_tags WHERE transaction_id = ?', (transaction_id,))
+        cursor.executemany('''
+            INSERT INTO transaction_tags (transaction_id, tag_id)
+            SELECT ?, id FROM tags WHERE name = ?
+        ''', [(transaction_id, name) for name in names])
+    
+    def set_transaction_tags(self, transaction_id, tags):
+        with self._write_transaction() as cursor:
+            self._set_tags(cursor, transaction_id, tags)
+    
+    def get_transaction_tags(self, transaction_id):
+        rows = self.conn.execute('''
+            SELECT g.name FROM transaction_tags tt JOIN tags g ON g.id = tt.tag_id
+            WHERE tt.transaction_id = ? ORDER BY g.name
+        ''', (transaction_id,))
+        return [row[0] for row in rows]
+    
+    def get_tags(self):
+        """Tags em uso, com a quantidade de transações de cada uma"""
+        return pd.read_sql_query('''
+            SELECT g.name, COUNT(tt.transaction_id) AS transaction_count
+            FROM tags g
+            JOIN transaction_tags tt ON tt.tag_id = g.id
+            GROUP BY g.id
+            ORDER BY g.name
+        ''', self.conn)
+    
+    def _tag_filter(self, tags, mode='all'):
+        """Subconsulta com os ids das transações que têm todas ('all') ou alguma ('any') das tags.
+        
+        Cada tag vira uma leitura do índice (tag_id, transaction_id), já ordenada
+        por transação; INTERSECT/UNION combinam essas listas sem olhar a descrição.
+        """
+        names = normalize_tags(tags)
+        branch = 'SELECT transaction_id FROM transaction_tags WHERE tag_id = (SELECT id FROM tags WHERE name = ?)'
+        operator = ' INTERSECT ' if mode == 'all' else ' UNION '
+        return f" AND t.id IN ({operator.join([branch] * len(names))})", names
+    
+    def _transaction_row(self, transaction_id):
+        """Uma transação, com as mesmas colunas de get_transactions (busca pela chave primária)"""
+        row = self.conn.execute('''
+            SELECT t.*, c.color, c.icon
             FROM transactions t
             LEFT JOIN categories c ON t.category = c.name
-            WHERE 1=1
-        '''
+            WHERE t.id = ?
+        ''', (transaction_id,)).fetchone()
+        return dict(row) if row else None
+    
+    def _transactions_query(self, filters=None, columns=None):
+        if columns:
+            query = f"SELECT {', '.join('t.' + column for column in columns)} FROM transactions t WHERE 1=1"
+        else:
+            query = '''
+                SELECT t.*, c.color, c.icon 
+                FROM transactions t
+                LEFT JOIN categories c ON t.category = c.name
+                WHERE 1=1
+            '''
         params = []
         
         if filters:
@@ -130,9 +776,17 @@ class DatabaseManager:
             if filters.get('end_date'):
                 query += ' AND t.date <= ?'
                 params.append(filters['end_date'])
+            if filters.get('tags'):
+                tag_query, tag_params = self._tag_filter(filters['tags'], filters.get('tag_mode', 'all'))
+                query += tag_query
+                params.extend(tag_params)
         
         # Ordenação segura
         query += ' ORDER BY t.date DESC'
+        return query, params
+    
+    def get_transactions(self, limit=None, filters=None, with_tags=False):
+        query, params = self._transactions_query(filters)
         
         if limit:
             query += ' LIMIT ?'
@@ -141,13 +795,143 @@ class DatabaseManager:
         df = pd.read_sql_query(query, self.conn, params=params)
         if not df.empty and 'date' in df.columns:
             df['date'] = pd.to_datetime(df['date'])
+        if with_tags:
+            # Tags só das linhas retornadas, em uma consulta pela chave (transaction_id, tag_id)
+            df['tags'] = self._tags_for(df['id']) if not df.empty else pd.Series(dtype=str)
         return df
     
+    def _tags_for(self, transaction_ids):
+        """Tags de cada transação, separadas por vírgula ('' se não houver)"""
+        links = pd.read_sql_query('''
+            SELECT tt.transaction_id, g.name
+            FROM transaction_tags tt JOIN tags g ON g.id = tt.tag_id
+            WHERE tt.transaction_id IN (SELECT value FROM json_each(?))
+            ORDER BY g.name
+        ''', self.conn, params=[json.dumps(transaction_ids.astype(int).tolist())])
+        joined = links.groupby('transaction_id')['name'].agg(', '.join)
+        return transaction_ids.map(joined).fillna('').to_numpy()
+    
+    def iter_transactions(self, filters=None, chunksize=DEFAULT_CHUNKSIZE, columns=None):
+        """Mesmas linhas de get_transactions, em DataFrames de até chunksize linhas.
+        
+        O cursor é lido aos poucos (fetchmany), então a memória usada depende do
+        tamanho do bloco e não do tamanho do livro-caixa. columns restringe as
+        colunas lidas (sem cor e ícone da categoria).
+        """
+        query, params = self._transactions_query(filters, columns)
+        for chunk in pd.read_sql_query(query, self.conn, params=params, chunksize=chunksize):
+            chunk['date'] = pd.to_datetime(chunk['date'])
+            yield chunk
+    
     def delete_transaction(self, transaction_id):
-        cursor = self.conn.cursor()
-        cursor.execute('DELETE FROM transactions WHERE id = ?', (transaction_id,))
-        self.conn.commit()
-        return cursor.rowcount > 0
+        with self._write_transaction() as cursor:
+            old = cursor.execute(
+                f'SELECT category, date, {BASE_AMOUNT_SQL} AS base_amount FROM transactions t WHERE id = ?',
+                (transaction_id,)
+            ).fetchone()
+            if old is None:
+                return False
+            before = self._transaction_row(transaction_id)
+            self._roll_stats_window()
+            
+            month_key = (old['category'], str(old['date'])[:7])
+            total_before = self._month_total(cursor, month_key)
+            cursor.execute('DELETE FROM transactions WHERE id = ?', (transaction_id,))
+            deleted = cursor.rowcount > 0
+            
+            self._update_transaction_stats(cursor, old['category'], old['date'], old['base_amount'], welford_remove)
+            self._update_month_stats(cursor, month_key, total_before, total_before - old['base_amount'])
+            revision = self._revision('ledger_revision')
+        
+        if deleted:
+            self._notify_write('delete', before, None, revision)
+        return deleted
+    
+    # Estatísticas incrementais para detecção de anomalias
+    def _get_stats(self, cursor, category, scope):
+        row = cursor.execute(
+            'SELECT count, mean, m2 FROM category_stats WHERE category = ? AND scope = ?',
+            (category, scope)
+        ).fetchone()
+        return (row[0], row[1], row[2]) if row else (0, 0.0, 0.0)
+    
+    def _save_stats(self, cursor, category, scope, stats):
+        cursor.execute('''
+            INSERT OR REPLACE INTO category_stats (category, scope, count, mean, m2)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (category, scope) + tuple(stats))
+    
+    def _base_rate(self, cursor, currency, date):
+        """Fator de conversão da moeda para BRL na data (mesma regra de BASE_AMOUNT_SQL)"""
+        rate_sql = FX_RATE_SQL.format(currency='?', date='?')
+        return cursor.execute(f'SELECT {rate_sql}', (currency, str(date)[:10], currency)).fetchone()[0]
+    
+    def _score_transaction(self, cursor, category, amount):
+        return anomaly_score(*self._get_stats(cursor, category, 'transaction'), amount)
+    
+    def _stats_window_moved(self):
+        return self._revision('stats_window') != int(stats_window_start().replace('-', ''))
+    
+    def _roll_stats_window(self):
+        """Recalcula as estatísticas quando a janela avança (uma vez por mês)"""
+        if self._stats_window_moved():
+            self.rebuild_category_stats()
+    
+    def _update_transaction_stats(self, cursor, category, date, amount, update):
+        # Valores anteriores à janela não entram nas estatísticas
+        if str(date)[:10] < stats_window_start():
+            return
+        stats = self._get_stats(cursor, category, 'transaction')
+        self._save_stats(cursor, category, 'transaction', update(*stats, amount))
+    
+    def _month_total(self, cursor, month_key):
+        """Total da categoria no mês em BRL, via índice (category, date)"""
+        category, month = month_key
+        return cursor.execute(f'''
+            SELECT COALESCE(SUM({BASE_AMOUNT_SQL}), 0) FROM transactions t
+            WHERE category = ? AND date >= ? AND date < ?
+        ''', (category, f'{month}-01', f'{month}-32')).fetchone()[0]
+    
+    def _update_month_stats(self, cursor, month_key, total_before, total_after):
+        """Troca o total antigo do mês pelo novo nas estatísticas mensais da categoria"""
+        if abs(total_after - total_before) < 0.005 or f'{month_key[1]}-01' < stats_window_start():
+            return
+        category = month_key[0]
+        stats = self._get_stats(cursor, category, 'month')
+        if total_before > 0.005:
+            stats = welford_remove(*stats, total_before)
+        if total_after > 0.005:
+            stats = welford_add(*stats, total_after)
+        self._save_stats(cursor, category, 'month', stats)
+    
+    def rebuild_category_stats(self):
+        """Recalcula as estatísticas de todas as categorias direto no SQLite (valores em BRL, só a janela)"""
+        window_start = stats_window_start()
+        with self._write_transaction() as cursor:
+            cursor.execute('DELETE FROM category_stats')
+            cursor.execute(f'''
+                INSERT INTO category_stats (category, scope, count, mean, m2)
+                SELECT category, 'transaction', COUNT(*), AVG(amount),
+                       MAX(SUM(amount * amount) - COUNT(*) * AVG(amount) * AVG(amount), 0)
+                FROM (SELECT category, {BASE_AMOUNT_SQL} AS amount FROM transactions t WHERE date >= ?)
+                GROUP BY category
+            ''', (window_start,))
+            cursor.execute(f'''
+                INSERT INTO category_stats (category, scope, count, mean, m2)
+                SELECT category, 'month', COUNT(*), AVG(total),
+                       MAX(SUM(total * total) - COUNT(*) * AVG(total) * AVG(total), 0)
+                FROM (
+                    SELECT category, strftime('%Y-%m', date) AS month, SUM({BASE_AMOUNT_SQL}) AS total
+                    FROM transactions t
+                    WHERE date >= ?
+                    GROUP BY category, month
+                )
+                GROUP BY category
+            ''', (window_start,))
+            cursor.execute('''
+                INSERT INTO meta (key, value) VALUES ('stats_window', ?)
+                ON CONFLICT (key) DO UPDATE SET value = excluded.value
+            ''', (int(window_start.replace('-', '')),))
     
     # Métodos para Categorias
     def get_categories(self, type=None):
@@ -161,56 +945,450 @@ class DatabaseManager:
         result = pd.read_sql_query(query, self.conn, params=params)
         return result
     
+    # Transações recorrentes
+    def add_recurring_rule(self, amount, type, category, description, frequency, start_date,
+                           interval=1, end_date=None, currency=DEFAULT_CURRENCY):
+        with self._write_transaction() as cursor:
+            cursor.execute('''
+                INSERT INTO recurring_rules
+                    (amount, type, category, description, currency, frequency, interval, start_date, end_date)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (amount, type, category, description, currency, frequency, interval, start_date, end_date))
+        return cursor.lastrowid
+    
+    def get_recurring_rules(self, active_only=False):
+        query = 'SELECT * FROM recurring_rules'
+        if active_only:
+            query += ' WHERE active = 1'
+        query += ' ORDER BY type, category, id'
+        return pd.read_sql_query(query, self.conn)
+    
+    def set_recurring_rule_active(self, rule_id, active):
+        """Pausa ou retoma a regra; ao retomar, as ocorrências do período pausado não são lançadas"""
+        with self._write_transaction() as cursor:
+            if active:
+                # Só conta como lançado até ontem: a ocorrência de hoje (e as seguintes) ainda entram
+                yesterday = (pd.Timestamp(date.today()) - pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+                cursor.execute('''
+                    UPDATE recurring_rules SET materialized_through = MAX(COALESCE(materialized_through, ''), ?)
+                    WHERE id = ? AND active = 0
+                ''', (yesterday, rule_id))
+            cursor.execute('UPDATE recurring_rules SET active = ? WHERE id = ?', (int(active), rule_id))
+    
+    def delete_recurring_rule(self, rule_id):
+        """Remove a regra; as transações já lançadas por ela são mantidas"""
+        with self._write_transaction() as cursor:
+            cursor.execute('DELETE FROM recurring_rules WHERE id = ?', (rule_id,))
+    
+    def _recurring_occurrences(self, rules, until, after=None):
+        """Ocorrências de todas as regras até until (após after ou a última data lançada)"""
+        frames = []
+        for rule in rules.itertuples(index=False):
+            last = max((pd.Timestamp(d) for d in (rule.materialized_through, after) if pd.notna(d)), default=None)
+            end = min(pd.Timestamp(until), pd.Timestamp(rule.end_date)) if pd.notna(rule.end_date) else until
+            dates = recurrence_dates(rule.start_date, rule.frequency, rule.interval, end, after=last)
+            if len(dates):
+                frames.append(pd.DataFrame({
+                    'rule_id': rule.id, 'date': dates, 'amount': rule.amount, 'type': rule.type,
+                    'category': rule.category, 'description': rule.description, 'currency': rule.currency
+                }))
+        if not frames:
+            return pd.DataFrame(columns=['rule_id', 'date', 'amount', 'type', 'category', 'description', 'currency'])
+        return pd.concat(frames, ignore_index=True).sort_values(['date', 'rule_id'], ignore_index=True)
+    
+    def materialize_recurring(self, until=None):
+        """Lança todas as ocorrências vencidas de todas as regras em uma única inserção em lote.
+        
+        Após um longo período sem uso, todas as ocorrências atrasadas entram no
+        mesmo lote. A impressão digital de cada ocorrência (regra + data) torna a
+        operação idempotente: rodar de novo nunca duplica lançamentos.
+        """
+        until = pd.Timestamp(until or date.today()).strftime('%Y-%m-%d')
+        rules = self.get_recurring_rules(active_only=True)
+        rules = rules[pd.to_datetime(rules['start_date']) <= pd.Timestamp(until)]
+        occurrences = self._recurring_occurrences(rules, until)
+        if occurrences.empty:
+            return {'rules': 0, 'inserted': 0, 'duplicates': 0}
+        
+        occurrences['fingerprint'] = (
+            'recorrente:' + occurrences['rule_id'].astype(str) + ':'
+            + occurrences['date'].dt.strftime('%Y-%m-%d')
+        )
+        rule_ids = occurrences['rule_id'].unique().tolist()
+        # Confirmado no mesmo commit da inserção em lote
+        with self._write_transaction() as cursor:
+            cursor.executemany(
+                'UPDATE recurring_rules SET materialized_through = ? WHERE id = ?',
+                [(until, int(rule_id)) for rule_id in rule_ids]
+            )
+            result = self.add_transactions_bulk(occurrences)
+        return {'rules': len(rule_ids), 'inserted': result['inserted'], 'duplicates': result['duplicates']}
+    
+    def project_recurring(self, until, after=None):
+        """Próximas ocorrências até until, sem gravar nada (padrão: a partir de amanhã)"""
+        after = pd.Timestamp(after or date.today()).strftime('%Y-%m-%d')
+        return self._recurring_occurrences(self.get_recurring_rules(active_only=True), until, after=after)
+    
+    # Moedas e cotações
+    def _revision(self, key):
+        row = self.conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else 0
+    
+    def get_revisions(self):
+        """Revisões atuais do livro-caixa e das cotações (incrementadas a cada escrita)"""
+        return self._revision('ledger_revision'), self._revision('fx_revision')
+    
+    def _cached(self, name, compute):
+        """Resultado em cache até mudar o livro-caixa, as cotações ou a moeda de relatório"""
+        key = (
+            os.path.abspath(self.db_path), name, self.reporting_currency,
+            self._revision('ledger_revision'), self._revision('fx_revision')
+        )
+        with _converted_cache_lock:
+            if key in _converted_cache:
+                _converted_cache.move_to_end(key)
+                return _converted_cache[key].copy()
+        
+        value = compute()
+        with _converted_cache_lock:
+            _converted_cache[key] = value
+            while len(_converted_cache) > CONVERTED_CACHE_SIZE:
+                _converted_cache.popitem(last=False)
+        return value.copy()
+    
+    def save_fx_rates(self, rates):
+        """Grava cotações (colunas date, currency, rate) e invalida os totais convertidos"""
+        missing = {'date', 'currency', 'rate'} - set(rates.columns)
+        if missing:
+            raise ValueError(f"Colunas ausentes nas cotações: {', '.join(sorted(missing))}")
+        
+        rows = pd.DataFrame({
+            'currency': rates['currency'].astype(str).str.strip().str.upper(),
+            'date': pd.to_datetime(rates['date']).dt.strftime('%Y-%m-%d'),
+            'rate': pd.to_numeric(rates['rate'], errors='coerce')
+        })
+        if rows['rate'].isna().any() or (rows['rate'] <= 0).any():
+            raise ValueError("Cotações devem ser números positivos")
+        
+        with self._write_transaction() as cursor:
+            cursor.executemany('''
+                INSERT INTO fx_rates (currency, date, rate) VALUES (?, ?, ?)
+                ON CONFLICT (currency, date) DO UPDATE SET rate = excluded.rate
+            ''', rows.itertuples(index=False, name=None))
+            cursor.execute("UPDATE meta SET value = value + 1 WHERE key = 'fx_revision'")
+            # Estatísticas de anomalia são mantidas em BRL: novas cotações mudam os valores convertidos
+            self.rebuild_category_stats()
+        return len(rows)
+    
+    def get_fx_rates(self):
+        def load():
+            rates = pd.read_sql_query('SELECT currency, date, rate FROM fx_rates ORDER BY date', self.conn)
+            rates['date'] = pd.to_datetime(rates['date']).astype('datetime64[ns]')
+            return rates
+        return self._cached('fx_rates', load)
+    
+    def get_currencies(self):
+        """Moedas com cotação disponível (BRL sempre incluída)"""
+        rates = self.get_fx_rates()
+        return [DEFAULT_CURRENCY] + sorted(set(rates['currency']) - {DEFAULT_CURRENCY})
+    
+    def _rates_asof(self, dates, currencies):
+        """Cotação vigente em cada data, com um merge_asof vetorizado sobre a tabela de cotações.
+        
+        Datas anteriores à primeira cotação usam a primeira cotação da moeda.
+        """
+        result = pd.Series(1.0, index=dates.index)
+        foreign = currencies != DEFAULT_CURRENCY
+        if not foreign.any():
+            return result
+        
+        rates = self.get_fx_rates()
+        missing = set(currencies[foreign]) - set(rates['currency'])
+        if missing:
+            raise ValueError(f"Sem cotação cadastrada para: {', '.join(sorted(missing))}")
+        
+        left = pd.DataFrame({
+            'row': dates.index[foreign],
+            'date': dates[foreign].astype('datetime64[ns]'),
+            'currency': currencies[foreign]
+        }).sort_values('date', kind='stable')
+        merged = pd.merge_asof(left, rates, on='date', by='currency', direction='backward')
+        first_rates = rates.groupby('currency')['rate'].first()
+        merged['rate'] = merged['rate'].fillna(merged['currency'].map(first_rates))
+        result.loc[merged['row'].to_numpy()] = merged['rate'].to_numpy()
+        return result
+    
+    def convert_amounts(self, amounts, dates, currencies):
+        """Converte valores (Series alinhadas) para a moeda de relatório pela cotação de cada data"""
+        factors = self._rates_asof(dates, currencies)
+        if self.reporting_currency != DEFAULT_CURRENCY:
+            factors = factors / self._rates_asof(dates, pd.Series(self.reporting_currency, index=dates.index))
+        return amounts * factors
+    
+    def _converted_rollup(self, group_by, where='', params=(), join=''):
+        """Somas agrupadas no SQLite por data, moeda e group_by, convertidas para a moeda de relatório.
+        
+        Converter depois de agregar faz o número de buscas de cotação depender
+        de dias × moedas, e não do número de transações.
+        """
+        columns = ''.join(f', {column}' for column in group_by)
+        # Colunas com apelido ('g.name AS tag') agrupam pela expressão
+        group_columns = ''.join(f", {column.split(' AS ')[0]}" for column in group_by)
+        df = pd.read_sql_query(f'''
+            SELECT date, currency{columns}, SUM(amount) AS amount, COUNT(*) AS transaction_count
+            FROM transactions {join}
+            WHERE 1=1 {where}
+            GROUP BY date, currency{group_columns}
+        ''', self.conn, params=list(params))
+        
+        df['date'] = pd.to_datetime(df['date'], format='ISO8601')
+        df['amount'] = self.convert_amounts(df['amount'], df['date'], df['currency'])
+        return df
+    
+    def _period_filter(self, start_date=None, end_date=None):
+        where, params = '', []
+        if start_date:
+            where += ' AND date >= ?'
+            params.append(start_date)
+        if end_date:
+            where += ' AND date <= ?'
+            params.append(end_date)
+        return where, params
+    
     # Métodos para Analytics
     def get_financial_summary(self, start_date=None, end_date=None):
-        df = self.get_transactions(filters={'start_date': start_date, 'end_date': end_date})
-        
+        where, params = self._period_filter(start_date, end_date)
+        totals = self._converted_rollup(['type'], where, params).groupby('type')['amount'].sum()
+        return build_financial_summary(totals.get('income', 0), totals.get('expense', 0))
+    
+    def get_monthly_summary(self, start_date=None, end_date=None):
+        def compute():
+            df = self._converted_rollup(['type'], *self._period_filter(start_date, end_date))
+            if df.empty:
+                return pd.DataFrame()
+            
+            df['month'] = df['date'].dt.strftime('%Y-%m')
+            return build_monthly_summary(df.groupby(['month', 'type'])['amount'].sum().unstack(fill_value=0))
+        name = 'monthly_summary' if not (start_date or end_date) else f'monthly_summary:{start_date}:{end_date}'
+        return self._cached(name, compute)
+    
+    def get_monthly_category_summary(self):
+        """Totais por mês, tipo e categoria, agregados no SQLite e convertidos"""
+        def compute():
+            df = self._converted_rollup(['type', 'category'])
+            df['month'] = df['date'].dt.strftime('%Y-%m')
+            return (
+                df.groupby(['month', 'type', 'category'], as_index=False)[['amount', 'transaction_count']]
+                .sum()
+                .sort_values('month', kind='stable')
+                .reset_index(drop=True)
+            )
+        return self._cached('monthly_category_summary', compute)
+    
+    def get_category_analysis(self, type='expense', start_date=None, end_date=None):
+        where, params = self._period_filter(start_date, end_date)
+        df = self._converted_rollup(['category'], where + ' AND type = ?', params + [type])
         if df.empty:
-            return {
-                'total_income': 0,
-                'total_expense': 0,
-                'balance': 0,
-                'savings_rate': 0
-            }
-        
-        total_income = df[df['type'] == 'income']['amount'].sum()
-        total_expense = df[df['type'] == 'expense']['amount'].sum()
-        balance = total_income - total_expense
-        savings_rate = (balance / total_income * 100) if total_income > 0 else 0
+            return pd.DataFrame()
         
-        return {
-            'total_income': total_income,
-            'total_expense': total_expense,
-            'balance': balance,
-            'savings_rate': savings_rate
-        }
+        return self._category_frame(df.groupby('category').agg(
+            total_amount=('amount', 'sum'),
+            transaction_count=('transaction_count', 'sum')
+        ))
     
-    def get_monthly_summary(self):
-        df = self.get_transactions()
+    def get_tag_analysis(self, type='expense', start_date=None, end_date=None):
+        """Totais por tag (no formato de get_category_analysis); transações com várias tags contam em cada uma"""
+        where, params = self._period_filter(start_date, end_date)
+        join = 'JOIN transaction_tags tt ON tt.transaction_id = transactions.id JOIN tags g ON g.id = tt.tag_id'
+        df = self._converted_rollup(['g.name AS tag'], where + ' AND type = ?', params + [type], join=join)
         if df.empty:
             return pd.DataFrame()
         
-        df['month'] = df['date'].dt.to_period('M').astype(str)
-        monthly = df.groupby(['month', 'type'])['amount'].sum().unstack(fill_value=0)
-        monthly['balance'] = monthly.get('income', 0) - monthly.get('expense', 0)
-        monthly['savings_rate'] = (monthly['balance'] / monthly.get('income', 1) * 100).round(1)
+        totals = df.groupby('tag').agg(
+            total_amount=('amount', 'sum'),
+            transaction_count=('transaction_count', 'sum')
+        ).round(2)
+        return totals.sort_values('total_amount', ascending=False).reset_index()
+    
+    def _fx_amount_expression(self):
+        """Valor convertido para a moeda de relatório, calculado no SQLite.
         
-        return monthly.reset_index()
+        Mesma regra de _rates_asof: cotação vigente na data (busca pela chave
+        primária currency, date), ou a primeira cotação para datas anteriores; BRL vale 1.
+        """
+        if self.conn.execute('SELECT 1 FROM fx_rates LIMIT 1').fetchone() is None:
+            return 't.amount', []
+        if self.reporting_currency == DEFAULT_CURRENCY:
+            return BASE_AMOUNT_SQL, []
+        return (
+            f"{BASE_AMOUNT_SQL} / {FX_RATE_SQL.format(currency='?', date='t.date')}",
+            [self.reporting_currency] * 2
+        )
     
-    def get_category_analysis(self, type='expense'):
-        df = self.get_transactions()
+    def get_pivot(self, dimensions, measures=('sum',), filters=None, max_rows=PIVOT_MAX_ROWS):
+        """Tabela dinâmica compilada em um único GROUP BY parametrizado.
+        
+        dimensions e measures são chaves de PIVOT_DIMENSIONS e PIVOT_MEASURES;
+        filters aceita type, start_date e end_date. No máximo max_rows grupos saem
+        do SQLite; df.attrs['truncated'] indica se houve corte. O resultado fica em cache por
+        especificação até o livro-caixa, as cotações ou as tags mudarem.
+        """
+        unknown = [d for d in dimensions if d not in PIVOT_DIMENSIONS] + [m for m in measures if m not in PIVOT_MEASURES]
+        if unknown:
+            raise ValueError(f"Dimensão ou medida desconhecida: {', '.join(unknown)}")
+        if not dimensions or not measures:
+            raise ValueError("Escolha ao menos uma dimensão e uma medida")
+        
+        filters = filters or {}
+        spec = (tuple(dimensions), tuple(measures), tuple(sorted((k, str(v)) for k, v in filters.items() if v)), max_rows)
+        # Vínculos de tags não mudam a revisão do livro; entram na chave quando agrupados
+        tag_revision = self._revision('tag_revision') if 'tag' in dimensions else None
+        return self._cached(('pivot', spec, tag_revision), lambda: self._run_pivot(dimensions, measures, filters, max_rows))
+    
+    def _run_pivot(self, dimensions, measures, filters, max_rows):
+        amount, params = self._fx_amount_expression()
+        join = 'JOIN transaction_tags tt ON tt.transaction_id = t.id JOIN tags g ON g.id = tt.tag_id' if 'tag' in dimensions else ''
+        where = ''
+        for key, clause in (('type', 't.type = ?'), ('start_date', 't.date >= ?'), ('end_date', 't.date <= ?')):
+            if filters.get(key):
+                where += f' AND {clause}'
+                params.append(str(filters[key]))
+        
+        keys = ', '.join(f'd{i}' for i in range(len(dimensions)))
+        selected = ', '.join(f'{PIVOT_DIMENSIONS[d]} AS d{i}' for i, d in enumerate(dimensions))
+        source = 'base'
+        ranked = ''
+        if 'median' in measures:
+            # Numera os valores de cada grupo em ordem; a mediana usa os do meio
+            ranked = f''', ranked AS (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY {keys} ORDER BY amount) AS rn,
+                       COUNT(*) OVER (PARTITION BY {keys}) AS n
+                FROM base
+            )'''
+            source = 'ranked'
+        aggregates = ', '.join(f'{PIVOT_MEASURES[m]} AS {m}' for m in measures)
+        
+        query = f'''
+            WITH base AS (
+                SELECT {selected}, {amount} AS amount
+                FROM transactions t {join}
+                WHERE 1=1 {where}
+            ){ranked}
+            SELECT {keys}, {aggregates}
+            FROM {source}
+            GROUP BY {keys}
+            ORDER BY {keys}
+            LIMIT ?
+        '''
+        df = pd.read_sql_query(query, self.conn, params=params + [max_rows + 1])
+        truncated = len(df) > max_rows
+        df = df.head(max_rows).rename(columns={f'd{i}': d for i, d in enumerate(dimensions)})
+        for measure in ('sum', 'avg', 'median'):
+            if measure in df:
+                df[measure] = df[measure].round(2)
+        df.attrs['truncated'] = truncated
+        return df
+    
+    def get_category_styles(self):
+        """Cor e ícone de cada categoria, indexados pelo nome"""
+        return self.get_categories()[['name', 'color', 'icon']].drop_duplicates('name').set_index('name')
+    
+    def _category_frame(self, totals):
+        return build_category_frame(totals, self.get_category_styles())
+    
+    def get_period_comparison(self, current, previous, type=None):
+        """Totais por categoria de dois períodos lado a lado, em uma única consulta agrupada.
+        
+        current e previous são pares (início, fim). As somas condicionais (CASE)
+        separam os períodos numa só leitura do índice por data; o resultado traz
+        a diferença absoluta e a variação percentual.
+        """
+        (current_start, current_end), (previous_start, previous_end) = [
+            tuple(pd.Timestamp(value).strftime('%Y-%m-%d') for value in period)
+            for period in (current, previous)
+        ]
+        query = '''
+            SELECT date, currency, type, category,
+                   SUM(CASE WHEN date BETWEEN ? AND ? THEN amount ELSE 0 END) AS current,
+                   SUM(CASE WHEN date BETWEEN ? AND ? THEN amount ELSE 0 END) AS previous
+            FROM transactions
+            WHERE (date BETWEEN ? AND ? OR date BETWEEN ? AND ?)
+        '''
+        params = [current_start, current_end, previous_start, previous_end] * 2
+        if type:
+            query += ' AND type = ?'
+            params.append(type)
+        query += ' GROUP BY date, currency, type, category'
+        
+        columns = ['type', 'category', 'current', 'previous', 'delta', 'change_pct', 'color', 'icon']
+        df = pd.read_sql_query(query, self.conn, params=params)
         if df.empty:
-            return pd.DataFrame()
+            return pd.DataFrame(columns=columns)
+        
+        # Mesmo fator de conversão para as duas colunas da linha (mesma data e moeda)
+        df['date'] = pd.to_datetime(df['date'], format='ISO8601')
+        factors = self.convert_amounts(pd.Series(1.0, index=df.index), df['date'], df['currency'])
+        df['current'] *= factors
+        df['previous'] *= factors
         
-        category_df = df[df['type'] == type].groupby('category').agg({
-            'amount': ['sum', 'count'],
-            'color': 'first',
-            'icon': 'first'
-        }).round(2)
+        comparison = df.groupby(['type', 'category'])[['current', 'previous']].sum()
+        comparison['delta'] = comparison['current'] - comparison['previous']
+        previous_totals = comparison['previous'].where(comparison['previous'] > 0)
+        comparison['change_pct'] = comparison['delta'] / previous_totals * 100
         
-        category_df.columns = ['total_amount', 'transaction_count', 'color', 'icon']
-        category_df = category_df.sort_values('total_amount', ascending=False)
-        return category_df.reset_index()
+        styles = self.get_categories()[['name', 'color', 'icon']].drop_duplicates('name').set_index('name')
+        comparison = comparison.reset_index().join(styles, on='category').round(2)
+        return comparison.sort_values('delta', key=abs, ascending=False).reset_index(drop=True)[columns]
+    
+    # Agregações em streaming: memória limitada pelo tamanho do bloco
+    def _stream_totals(self, keys, filters=None, chunksize=DEFAULT_CHUNKSIZE):
+        """Soma e conta os valores convertidos por chave, combinando os parciais de cada bloco"""
+        totals = None
+        columns = ['date', 'type', 'category', 'amount', 'currency']
+        for chunk in self.iter_transactions(filters, chunksize, columns):
+            amounts = self.convert_amounts(chunk['amount'], chunk['date'], chunk['currency'])
+            partial = amounts.groupby(keys(chunk)).agg(['sum', 'count'])
+            totals = partial if totals is None else totals.add(partial, fill_value=0)
+        return totals
+    
+    def stream_financial_summary(self, start_date=None, end_date=None, chunksize=DEFAULT_CHUNKSIZE):
+        filters = {'start_date': start_date, 'end_date': end_date}
+        totals = self._stream_totals(lambda chunk: chunk['type'], filters, chunksize)
+        if totals is None:
+            return build_financial_summary(0, 0)
+        return build_financial_summary(totals['sum'].get('income', 0), totals['sum'].get('expense', 0))
+    
+    def stream_monthly_summary(self, chunksize=DEFAULT_CHUNKSIZE):
+        # Agrupa pelo mês como datetime64 e só formata os rótulos no final
+        totals = self._stream_totals(
+            lambda chunk: [chunk['date'].dt.to_period('M').rename('month'), chunk['type']],
+            chunksize=chunksize
+        )
+        if totals is None:
+            return pd.DataFrame()
+        monthly = totals['sum'].unstack(fill_value=0)
+        monthly.index = monthly.index.astype(str)
+        return build_monthly_summary(monthly)
+    
+    def stream_category_analysis(self, type='expense', start_date=None, end_date=None, chunksize=DEFAULT_CHUNKSIZE):
+        filters = {'type': type, 'start_date': start_date, 'end_date': end_date}
+        totals = self._stream_totals(lambda chunk: chunk['category'], filters, chunksize)
+        if totals is None:
+            return pd.DataFrame()
+        return self._category_frame(pd.DataFrame({
+            'total_amount': totals['sum'],
+            'transaction_count': totals['count'].astype(int)
+        }))
     
     def close(self):
-        self.conn.close()
\ No newline at end of file
+        # Conexões do cache são compartilhadas com outras execuções: só são devolvidas
+        if not self.pooled:
+            self.conn.close()
+        elif self._pooled is not None:
+            pooled, self._pooled = self._pooled, None
+            pooled.release()
+    
+    def __del__(self):
+        # O app.py não fecha o gerenciador de cada execução; a conexão volta ao cache quando ele é descartado
+        if getattr(self, '_pooled', None) is not None:
+            self.close()
\ No newline at end of file
@@ -1,39 +1,223 @@
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
+from utils.helpers import DEFAULT_CURRENCY, currency_symbol
+
+# Orçamento padrão de pontos por série e limite para usar traces WebGL
+DEFAULT_MAX_POINTS = 2000
+DEFAULT_WEBGL_THRESHOLD = 1000
+# Separadores decimal e de milhar do Plotly no padrão brasileiro
+PT_BR_SEPARATORS = ',.'
+
+def downsample_indices(x, y, max_points):
+    """Seleciona os índices a manter com o algoritmo LTTB (Largest-Triangle-Three-Buckets)"""
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if not max_points or max_points < 3 or n <= max_points:
+        return np.arange(n)
+    
+    # Eixo X numérico: datas viram inteiros, rótulos (ex: '2024-01') viram posições
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.number):
+        xs = x.astype(float)
+    elif np.issubdtype(x.dtype, np.datetime64):
+        xs = x.astype('datetime64[ns]').astype(np.int64).astype(float)
+    else:
+        xs = np.arange(n, dtype=float)
+    
+    # Primeiro e último pontos são sempre mantidos; o restante é dividido em buckets
+    edges = (np.arange(max_points - 1) * ((n - 2) / (max_points - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    
+    indices = np.empty(max_points, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    anchor = 0
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], edges[i + 2]
+        else:
+            next_start, next_end = n - 1, n
+        avg_x = xs[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        
+        # Mantém o ponto que forma o maior triângulo com o anterior e a média do próximo bucket
+        area = np.abs(
+            (xs[anchor] - avg_x) * (y[start:end] - y[anchor])
+            - (xs[anchor] - xs[start:end]) * (avg_y - y[anchor])
+        )
+        anchor = start + int(area.argmax())
+        indices[i + 1] = anchor
+    
+    return indices
+
+class FigureCache:
+    """Cache LRU de figuras já montadas, chaveado pelo conteúdo dos dados.
+    
+    Guarda a especificação (fig.to_dict()) e devolve uma figura nova a cada
+    acerto: entradas compartilhadas entre reruns e sessões, alterar a figura
+    recebida (update_layout, add_trace) não muda o que o cache devolve depois.
+    """
+    
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _update_digest(digest, value):
+        if isinstance(value, pd.DataFrame):
+            # Hash do conteúdo: mesmas colunas e valores geram a mesma chave
+            digest.update(repr(list(value.columns)).encode())
+            digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+        else:
+            digest.update(repr(value).encode())
+    
+    @classmethod
+    def make_key(cls, chart_name, args, params):
+        digest = hashlib.sha1(chart_name.encode())
+        for value in args:
+            cls._update_digest(digest, value)
+        for name, value in sorted(params.items()):
+            digest.update(name.encode())
+            cls._update_digest(digest, value)
+        return digest.hexdigest()
+    
+    def get(self, key):
+        with self._lock:
+            spec = self._entries.get(key)
+            if spec is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # A especificação já foi validada ao montar a figura: revalidar custaria
+        # mais que montá-la de novo
+        return go.Figure(spec, _validate=False)
+    
+    def put(self, key, figure):
+        spec = figure.to_dict()
+        with self._lock:
+            self._entries[key] = spec
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self):
+        return len(self._entries)
+
+# Cache compartilhado entre reruns e sessões do mesmo processo
+figure_cache = FigureCache()
+
+def cached_chart(method):
+    """Memoriza a figura; em cache hit ela não é montada, validada nem convertida de novo"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self._cached_figure(method, *args, **kwargs)
+    wrapper.uncached = method
+    return wrapper
 
 class FinancialAnalytics:
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, max_points=DEFAULT_MAX_POINTS, webgl_threshold=DEFAULT_WEBGL_THRESHOLD,
+                 cache=figure_cache):
         self.db = db_manager
+        self.max_points = max_points
+        self.webgl_threshold = webgl_threshold
+        self.cache = cache
     
+    @property
+    def currency_symbol(self):
+        """Símbolo da moeda de relatório, usado em eixos e rótulos"""
+        return currency_symbol(getattr(self.db, 'reporting_currency', DEFAULT_CURRENCY))
+    
+    def _build_figure(self, method, *args, **kwargs):
+        fig = method(self, *args, **kwargs)
+        # Separadores brasileiros nos números de eixos, rótulos e hovers (1.234,56)
+        fig.update_layout(separators=PT_BR_SEPARATORS)
+        return fig
+    
+    def _cached_figure(self, method, *args, **kwargs):
+        if self.cache is None:
+            return self._build_figure(method, *args, **kwargs)
+        
+        # Parâmetros que alteram a figura também fazem parte da chave
+        params = dict(kwargs, max_points=self.max_points, webgl_threshold=self.webgl_threshold,
+                      currency=self.currency_symbol)
+        key = self.cache.make_key(method.__name__, args, params)
+        figure = self.cache.get(key)
+        if figure is None:
+            figure = self._build_figure(method, *args, **kwargs)
+            self.cache.put(key, figure)
+        return figure
+    
+    def _series_points(self, data, x_column, y_columns):
+        """Extrai as séries como arrays NumPy, reduzidas a um único conjunto de índices.
+        
+        Cada série escolhe seus pontos (LTTB) com uma fração do orçamento; a união
+        desses índices vale para todas, então barras e linhas agrupadas continuam
+        com os mesmos valores de X.
+        """
+        x = data[x_column].to_numpy()
+        ys = [
+            data[column].to_numpy(dtype=float) if column in data else np.zeros(len(data))
+            for column in y_columns
+        ]
+        
+        if not self.max_points or len(x) <= self.max_points:
+            return x, ys
+        budget = max(self.max_points // len(ys), 3)
+        indices = np.unique(np.concatenate([downsample_indices(x, y, budget) for y in ys]))
+        return x[indices], [y[indices] for y in ys]
+    
+    def _scatter_class(self, x):
+        """Usa Scattergl quando a série ainda é grande demais para SVG"""
+        return go.Scattergl if len(x) > self.webgl_threshold else go.Scatter
+    
+    @cached_chart
     def create_income_vs_expense_chart(self, monthly_data):
         if monthly_data.empty:
             return go.Figure()
         
         fig = go.Figure()
         
-        # Garantir que os dados são arrays/lists
+        # Séries como arrays NumPy, reduzidas antes de montar a figura
+        x, (income_y, expense_y, balance_y) = self._series_points(
+            monthly_data, 'month', ['income', 'expense', 'balance']
+        )
+        
         fig.add_trace(go.Bar(
             name='Receitas',
-            x=monthly_data['month'].tolist(),
-            y=monthly_data.get('income', pd.Series([0] * len(monthly_data))).tolist(),
+            x=x,
+            y=income_y,
             marker_color='#22c55e',
             opacity=0.8
         ))
         
         fig.add_trace(go.Bar(
             name='Despesas',
-            x=monthly_data['month'].tolist(),
-            y=monthly_data.get('expense', pd.Series([0] * len(monthly_data))).tolist(),
+            x=x,
+            y=expense_y,
             marker_color='#ef4444',
             opacity=0.8
         ))
         
-        fig.add_trace(go.Scatter(
+        fig.add_trace(self._scatter_class(x)(
             name='Saldo',
-            x=monthly_data['month'].tolist(),
-            y=monthly_data['balance'].tolist(),
+            x=x,
+            y=balance_y,
             mode='lines+markers',
             line=dict(color='#3b82f6', width=3),
             marker=dict(size=8),
@@ -43,9 +227,9 @@ class FinancialAnalytics:
         fig.update_layout(
             title='Receitas vs Despesas Mensais',
             xaxis_title='Mês',
-            yaxis_title='Valor (R$)',
+            yaxis_title=f'Valor ({self.currency_symbol})',
             yaxis2=dict(
-                title='Saldo (R$)',
+                title=f'Saldo ({self.currency_symbol})',
                 overlaying='y',
                 side='right',
                 showgrid=False
@@ -59,6 +243,7 @@ class FinancialAnalytics:
         
         return fig
     
+    @cached_chart
     def create_expense_pie_chart(self, category_data):
         if category_data.empty:
             return go.Figure()
@@ -75,7 +260,7 @@ class FinancialAnalytics:
         fig.update_traces(
             textposition='inside',
             textinfo='percent+label',
-            hovertemplate='<b>%{label}</b><br>R$ %{value:,.2f}<br>%{percent}'
+            hovertemplate=f'<b>%{{label}}</b><br>{self.currency_symbol} %{{value:,.2f}}<br>%{{percent}}'
         )
         
         fig.update_layout(
@@ -87,6 +272,7 @@ class FinancialAnalytics:
         
         return fig
     
+    @cached_chart
     def create_income_pie_chart(self, category_data):
         if category_data.empty:
             return go.Figure()
@@ -103,7 +289,7 @@ class FinancialAnalytics:
         fig.update_traces(
             textposition='inside',
             textinfo='percent+label',
-            hovertemplate='<b>%{label}</b><br>R$ %{value:,.2f}<br>%{percent}'
+            hovertemplate=f'<b>%{{label}}</b><br>{self.currency_symbol} %{{value:,.2f}}<br>%{{percent}}'
         )
         
         fig.update_layout(
@@ -115,49 +301,52 @@ class FinancialAnalytics:
         
         return fig
     
-    def create_monthly_trend_chart(self, monthly_data):
+    @cached_chart
+    def create_monthly_trend_chart(self, monthly_data, forecast=None):
         if monthly_data.empty:
             return go.Figure()
         
         fig = go.Figure()
         
-        # Converter para listas para garantir que são arrays
-        months = monthly_data['month'].tolist()
-        income_data = monthly_data.get('income', pd.Series([0] * len(monthly_data))).tolist()
-        expense_data = monthly_data.get('expense', pd.Series([0] * len(monthly_data))).tolist()
-        balance_data = monthly_data['balance'].tolist()
+        # Séries como arrays NumPy, reduzidas antes de montar a figura
+        x, (income_y, expense_y, balance_y) = self._series_points(
+            monthly_data, 'month', ['income', 'expense', 'balance']
+        )
         
-        fig.add_trace(go.Scatter(
+        fig.add_trace(self._scatter_class(x)(
             name='Receitas',
-            x=months,
-            y=income_data,
+            x=x,
+            y=income_y,
             mode='lines+markers',
             line=dict(color='#22c55e', width=3),
             marker=dict(size=6)
         ))
         
-        fig.add_trace(go.Scatter(
+        fig.add_trace(self._scatter_class(x)(
             name='Despesas',
-            x=months,
-            y=expense_data,
+            x=x,
+            y=expense_y,
             mode='lines+markers',
             line=dict(color='#ef4444', width=3),
             marker=dict(size=6)
         ))
         
-        fig.add_trace(go.Scatter(
+        fig.add_trace(self._scatter_class(x)(
             name='Saldo',
-            x=months,
-            y=balance_data,
+            x=x,
+            y=balance_y,
             mode='lines+markers',
             line=dict(color='#3b82f6', width=3, dash='dot'),
             marker=dict(size=6)
         ))
         
+        if forecast is not None and not forecast.empty:
+            self._add_forecast_traces(fig, monthly_data, forecast)
+        
         fig.update_layout(
             title='Tendência Mensal - Receitas, Despesas e Saldo',
             xaxis_title='Mês',
-            yaxis_title='Valor (R$)',
+            yaxis_title=f'Valor ({self.currency_symbol})',
             hovermode='x unified',
             plot_bgcolor='rgba(0,0,0,0)',
             paper_bgcolor='rgba(0,0,0,0)',
@@ -173,6 +362,33 @@ class FinancialAnalytics:
         
         return fig
     
+    def _add_forecast_traces(self, fig, monthly_data, forecast):
+        """Estende as séries com a projeção, partindo do último mês fechado antes dela"""
+        # O mês corrente (incompleto) já faz parte da projeção
+        closed = monthly_data[monthly_data['month'] < forecast['month'].iloc[0]]
+        last = closed.iloc[[-1]] if not closed.empty else closed
+        series = [
+            ('income', 'Receitas (previsão)', '#22c55e'),
+            ('expense', 'Despesas (previsão)', '#ef4444'),
+            ('balance', 'Saldo (previsão)', '#3b82f6')
+        ]
+        for column, name, color in series:
+            x = np.concatenate([last['month'].to_numpy(), forecast['month'].to_numpy()])
+            y = np.concatenate([
+                last[column].to_numpy(dtype=float) if column in last else np.zeros(len(last)),
+                forecast[column].to_numpy(dtype=float)
+            ])
+            fig.add_trace(go.Scatter(
+                name=name,
+                x=x,
+                y=y,
+                mode='lines+markers',
+                line=dict(color=color, width=2, dash='dash'),
+                marker=dict(size=5, symbol='circle-open'),
+                opacity=0.7
+            ))
+    
+    @cached_chart
     def create_category_bar_chart(self, category_data, type='expense'):
         if category_data.empty:
             return go.Figure()
@@ -191,15 +407,15 @@ class FinancialAnalytics:
         )
         
         fig.update_traces(
-            texttemplate='R$ %{text:,.0f}',
+            texttemplate=f'{self.currency_symbol} %{{text:,.0f}}',
             textposition='outside',
-            hovertemplate='<b>%{x}</b><br>R$ %{y:,.2f}<br>%{customdata[0]} transações',
+            hovertemplate=f'<b>%{{x}}</b><br>{self.currency_symbol} %{{y:,.2f}}<br>%{{customdata[0]}} transações',
             customdata=category_data[['transaction_count']].values
         )
         
         fig.update_layout(
             xaxis_title='Categoria',
-            yaxis_title='Valor Total (R$)',
+            yaxis_title=f'Valor Total ({self.currency_symbol})',
             showlegend=False,
             plot_bgcolor='rgba(0,0,0,0)',
             paper_bgcolor='rgba(0,0,0,0)', 
@@ -207,4 +423,43 @@ class FinancialAnalytics:
             xaxis={'categoryorder': 'total descending'}
         )
         
+        return fig
+    
+    @cached_chart
+    def create_period_comparison_chart(self, comparison, title='Comparação entre Períodos'):
+        """Barras divergentes com a variação de cada categoria entre os dois períodos"""
+        if comparison.empty:
+            return go.Figure()
+        
+        data = comparison.sort_values('delta')
+        # Aumento de despesa é ruim e aumento de receita é bom
+        worse = (data['delta'] > 0) == (data['type'] == 'expense')
+        labels = data['icon'].fillna('') + ' ' + data['category'] if 'icon' in data else data['category']
+        
+        fig = go.Figure(go.Bar(
+            x=data['delta'],
+            y=labels,
+            orientation='h',
+            marker_color=np.where(worse, '#ef4444', '#22c55e'),
+            customdata=data[['current', 'previous', 'change_pct']].to_numpy(),
+            hovertemplate=(
+                f'<b>%{{y}}</b><br>Variação: {self.currency_symbol} %{{x:,.2f}}'
+                f'<br>Atual: {self.currency_symbol} %{{customdata[0]:,.2f}}'
+                f'<br>Anterior: {self.currency_symbol} %{{customdata[1]:,.2f}}'
+                '<br>%{customdata[2]:+.1f}%<extra></extra>'
+            )
+        ))
+        
+        fig.add_vline(x=0, line_color='#6b7280', line_width=1)
+        fig.update_layout(
+            title=title,
+            xaxis_title=f'Variação ({self.currency_symbol})',
+            yaxis_title='Categoria',
+            showlegend=False,
+            height=max(300, 40 * len(data) + 120),
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            font=dict(color='#1f2937')
+        )
+        
         return fig
\ No newline at end of file
@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+from datetime import date
+from database import (
+    ANOMALY_MIN_SAMPLES, ANOMALY_MIN_STD_RATIO, ANOMALY_WINDOW_MONTHS, BASE_AMOUNT_SQL, stats_window_start
+)
+from utils.helpers import DEFAULT_CURRENCY
+
+# Escore z a partir do qual um gasto é sinalizado
+DEFAULT_THRESHOLD = 3.0
+
+def rolling_scores(codes, dates, values, window_months=ANOMALY_WINDOW_MONTHS):
+    """Escore z de cada valor frente aos valores do mesmo grupo nos window_months meses anteriores.
+    
+    Dentro de cada grupo os valores são ordenados por data (e, na mesma data, pela
+    ordem recebida); retorna NaN quando a janela ainda não tem
+    ANOMALY_MIN_SAMPLES valores anteriores.
+    """
+    codes = np.asarray(codes)
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return np.empty(0)
+    dates = pd.to_datetime(pd.Series(dates))
+    days = dates.to_numpy().astype('datetime64[D]').astype(np.int64)
+    window_days = (dates - pd.DateOffset(months=window_months)).to_numpy().astype('datetime64[D]').astype(np.int64)
+    
+    # Ordena por grupo e data, mantendo a ordem recebida nas datas repetidas
+    order = np.lexsort((np.arange(len(values)), days, codes))
+    sorted_codes, sorted_values = codes[order], values[order]
+    groups = np.cumsum(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]) - 1
+    
+    # Chave composta crescente (grupo, dia): o início da janela de cada valor sai de uma busca binária
+    first_day = window_days.min()
+    span = int(days.max() - first_day) + 1
+    keys = groups * span + (days[order] - first_day)
+    positions = np.arange(len(values))
+    start_index = np.searchsorted(keys, groups * span + (window_days[order] - first_day), side='left')
+    
+    # Somas acumuladas dos valores *anteriores* dentro da janela
+    cum_sum = np.r_[0.0, np.cumsum(sorted_values)]
+    cum_sq = np.r_[0.0, np.cumsum(sorted_values ** 2)]
+    count = positions - start_index
+    prior_sum = cum_sum[positions] - cum_sum[start_index]
+    prior_sq = cum_sq[positions] - cum_sq[start_index]
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = prior_sum / count
+        variance = np.maximum(prior_sq - count * mean ** 2, 0) / (count - 1)
+        std = np.maximum.reduce([np.sqrt(variance), np.abs(mean) * ANOMALY_MIN_STD_RATIO, np.full(len(values), 0.01)])
+        scores = np.where(count >= ANOMALY_MIN_SAMPLES, (sorted_values - mean) / std, np.nan)
+    
+    result = np.empty(len(values))
+    result[order] = scores
+    return result
+
+class AnomalyDetector:
+    def __init__(self, db_manager, threshold=DEFAULT_THRESHOLD):
+        self.db = db_manager
+        self.threshold = threshold
+    
+    def rescore_all(self):
+        """Recalcula o escore de todo o histórico de forma vetorizada (valores convertidos para BRL).
+        
+        Cada transação é comparada com a janela móvel de meses anteriores à sua data.
+        """
+        with self.db._write_transaction() as cursor:
+            df = pd.read_sql_query(
+                f'SELECT id, category, date, {BASE_AMOUNT_SQL} AS amount FROM transactions t ORDER BY id',
+                self.db.conn
+            )
+            if df.empty:
+                return 0
+            
+            codes = pd.factorize(df['category'])[0]
+            scores = rolling_scores(codes, df['date'], df['amount'].to_numpy())
+            scores = np.where(np.isnan(scores), None, np.round(scores, 4))
+            cursor.executemany(
+                'UPDATE transactions SET anomaly_score = ? WHERE id = ?',
+                zip(scores.tolist(), df['id'].tolist())
+            )
+            self.db.rebuild_category_stats()
+        return len(df)
+    
+    def get_flagged_transactions(self, limit=20, start_date=None):
+        """Gastos sinalizados, do mais recente para o mais antigo"""
+        query = '''
+            SELECT t.id, t.date, t.category, t.amount, t.currency, t.description, t.anomaly_score, c.icon
+            FROM transactions t
+            LEFT JOIN categories c ON t.category = c.name
+            WHERE t.type = 'expense' AND t.anomaly_score >= ?
+        '''
+        params = [self.threshold]
+        if start_date:
+            query += ' AND t.date >= ?'
+            params.append(start_date)
+        query += ' ORDER BY t.date DESC LIMIT ?'
+        params.append(limit)
+        
+        df = pd.read_sql_query(query, self.db.conn, params=params)
+        if not df.empty:
+            df['date'] = pd.to_datetime(df['date'])
+        return df
+    
+    def get_monthly_jumps(self, month=None):
+        """Categorias cujo total do mês (em BRL) destoa dos demais meses"""
+        month = month or date.today().strftime('%Y-%m')
+        query = f'''
+            SELECT t.category, SUM({BASE_AMOUNT_SQL}) AS total, s.count, s.mean, s.m2
+            FROM transactions t
+            JOIN category_stats s ON s.category = t.category AND s.scope = 'month'
+            WHERE t.type = 'expense' AND t.date >= ? AND t.date < ?
+            GROUP BY t.category
+        '''
+        df = pd.read_sql_query(query, self.db.conn, params=[f'{month}-01', f'{month}-32'])
+        if df.empty:
+            return df
+        
+        # Estatísticas dos outros meses da janela: retira o mês analisado (leave-one-out),
+        # se ele estiver nela
+        total = df['total'].to_numpy()
+        inside = f'{month}-01' >= stats_window_start()
+        count = df['count'].to_numpy() - inside
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = (df['count'].to_numpy() * df['mean'].to_numpy() - total * inside) / count
+            m2 = df['m2'].to_numpy()
+            if inside:
+                m2 = np.maximum(m2 - (total - mean) * (total - df['mean'].to_numpy()), 0)
+            std = np.maximum.reduce([np.sqrt(m2 / (count - 1)), np.abs(mean) * ANOMALY_MIN_STD_RATIO, np.full(len(df), 0.01)])
+            score = np.where(count >= ANOMALY_MIN_SAMPLES, (total - mean) / std, np.nan)
+        
+        df = df.assign(usual=mean, score=score)
+        df = df[df['score'] >= self.threshold]
+        
+        # Escores em BRL; valores exibidos na moeda de relatório, pela cotação do mês
+        dates = pd.Series(pd.Timestamp(f'{month}-01'), index=df.index)
+        currencies = pd.Series(DEFAULT_CURRENCY, index=df.index)
+        for column in ('total', 'usual'):
+            df[column] = self.db.convert_amounts(df[column], dates, currencies).round(2)
+        return df[['category', 'total', 'usual', 'score']].sort_values('score', ascending=False)
@@ -0,0 +1,189 @@
+import hashlib
+import os
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Páginas copiadas por passo: entre um passo e outro o banco fica livre para escrita
+DEFAULT_STEP_PAGES = 256
+DEFAULT_KEEP = 7
+# Recomeços tolerados antes de copiar o restante em um único passo
+MAX_RESTARTS = 3
+
+class BackupRestarted(Exception):
+    """A origem mudou durante a cópia vezes demais"""
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class BackupManager:
+    """Backups online com a API de backup do SQLite, com rotação e verificação"""
+    
+    def __init__(self, db_path='data/finance.db', backup_dir='data/backups',
+                 keep=DEFAULT_KEEP, step_pages=DEFAULT_STEP_PAGES, pause=0.0, busy_wait=0.25):
+        self.db_path = db_path
+        self.backup_dir = backup_dir
+        self.keep = keep
+        self.step_pages = step_pages
+        # Pausa entre passos (segundos), para dar vez a escritas concorrentes
+        self.pause = pause
+        # Espera antes de tentar de novo quando o banco está bloqueado por uma escrita
+        self.busy_wait = busy_wait
+    
+    def _copy(self, source, target):
+        """Copia em passos e mede a duração de cada um (o tempo máximo que uma escrita espera)"""
+        steps = []
+        restarts = 0
+        last = {'time': time.perf_counter(), 'remaining': None}
+        
+        def progress(status, remaining, total):
+            nonlocal restarts
+            steps.append(time.perf_counter() - last['time'])
+            # O SQLite recomeça a cópia se o banco de origem for alterado por outra conexão
+            if last['remaining'] is not None and remaining > last['remaining']:
+                restarts += 1
+                if restarts > MAX_RESTARTS:
+                    raise BackupRestarted()
+            if self.pause and remaining:
+                time.sleep(self.pause)
+            last.update(time=time.perf_counter(), remaining=remaining)
+        
+        started = time.perf_counter()
+        single_step = False
+        try:
+            source.backup(target, pages=self.step_pages, progress=progress, sleep=self.busy_wait)
+        except BackupRestarted:
+            # Com escritas contínuas a cópia incremental não termina: copia tudo em um passo
+            single_step = True
+            last['time'] = time.perf_counter()
+            source.backup(target, pages=-1, sleep=self.busy_wait)
+            steps.append(time.perf_counter() - last['time'])
+        elapsed = time.perf_counter() - started
+        return {
+            'seconds': round(elapsed, 4),
+            'steps': len(steps),
+            'max_step_ms': round(max(steps, default=0) * 1000, 2),
+            'restarts': restarts,
+            'single_step_fallback': single_step,
+        }
+    
+    def create_backup(self, label=None):
+        """Gera um backup consistente sem bloquear o app durante a cópia inteira"""
+        os.makedirs(self.backup_dir, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        name = f"finance-{stamp}{'-' + label if label else ''}.db"
+        final_path = os.path.join(self.backup_dir, name)
+        partial_path = final_path + '.partial'
+        
+        source = sqlite3.connect(self.db_path)
+        target = sqlite3.connect(partial_path)
+        try:
+            report = self._copy(source, target)
+        finally:
+            target.close()
+            source.close()
+        
+        checksum = file_sha256(partial_path)
+        os.replace(partial_path, final_path)
+        with open(final_path + '.sha256', 'w') as f:
+            f.write(f"{checksum}  {name}\n")
+        
+        report.update({
+            'path': final_path,
+            'bytes': os.path.getsize(final_path),
+            'sha256': checksum,
+            'removed': self.rotate(),
+        })
+        return report
+    
+    def list_backups(self):
+        """Backups do mais recente para o mais antigo"""
+        if not os.path.isdir(self.backup_dir):
+            return []
+        paths = [
+            os.path.join(self.backup_dir, name)
+            for name in os.listdir(self.backup_dir)
+            if name.startswith('finance-') and name.endswith('.db')
+        ]
+        return sorted(paths, reverse=True)
+    
+    def rotate(self):
+        """Mantém apenas os backups mais recentes"""
+        removed = []
+        # Backups de segurança feitos antes de uma restauração não entram na rotação
+        regular = [path for path in self.list_backups() if not path.endswith('-pre-restore.db')]
+        for path in regular[self.keep:]:
+            for file_path in (path, path + '.sha256'):
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+            removed.append(path)
+        return removed
+    
+    def verify(self, backup_path):
+        """Confere o checksum gravado e a integridade do arquivo de backup"""
+        checksum_path = backup_path + '.sha256'
+        if not os.path.exists(checksum_path):
+            return False, 'checksum ausente'
+        with open(checksum_path) as f:
+            expected = f.read().split()[0]
+        if file_sha256(backup_path) != expected:
+            return False, 'checksum divergente'
+        
+        uri = f"{Path(backup_path).absolute().as_uri()}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True)
+        try:
+            result = conn.execute('PRAGMA integrity_check').fetchone()[0]
+        finally:
+            conn.close()
+        return result == 'ok', result
+    
+    @staticmethod
+    def _read_revisions(conn):
+        try:
+            return dict(conn.execute("SELECT key, value FROM meta WHERE key LIKE '%revision'").fetchall())
+        except sqlite3.OperationalError:
+            return {}
+    
+    def _advance_revisions(self, conn, previous):
+        """Revisões do banco restaurado passam das anteriores à restauração.
+        
+        Caches de agregados (e os modelos das sessões) são chaveados pelas
+        revisões: se elas voltassem a números já usados, serviriam totais de
+        antes da restauração.
+        """
+        if not previous:
+            return
+        restored = self._read_revisions(conn)
+        conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL DEFAULT 0)')
+        conn.executemany(
+            'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+            [(key, max(value, restored.get(key, 0)) + 1) for key, value in previous.items()]
+        )
+        conn.commit()
+    
+    def restore(self, backup_path):
+        """Restaura o backup sobre o banco em uso, também de forma incremental"""
+        valid, message = self.verify(backup_path)
+        if not valid:
+            raise ValueError(f"Backup inválido ({message}): {backup_path}")
+        
+        # Cópia de segurança do estado atual antes de sobrescrever
+        safety = self.create_backup(label='pre-restore')
+        
+        source = sqlite3.connect(f"{Path(backup_path).absolute().as_uri()}?mode=ro", uri=True)
+        target = sqlite3.connect(self.db_path)
+        try:
+            revisions = self._read_revisions(target)
+            report = self._copy(source, target)
+            self._advance_revisions(target, revisions)
+        finally:
+            target.close()
+            source.close()
+        
+        report.update({'restored_from': backup_path, 'safety_backup': safety['path']})
+        return report
@@ -0,0 +1,220 @@
+import calendar
+import glob
+import hashlib
+import html
+import importlib.util
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime
+
+import pandas as pd
+
+from database import DatabaseManager
+from modules.analytics import FinancialAnalytics
+from modules.sharding import ensure_user_database, user_file_name
+from utils.helpers import format_currency, format_percentage
+from utils.formatting import format_currency_column, format_date_column
+
+REPORT_CHARTS = [
+    ('tendencia', 'create_monthly_trend_chart', 'monthly', {}),
+    ('receitas_despesas', 'create_income_vs_expense_chart', 'monthly', {}),
+    ('gastos_categoria', 'create_expense_pie_chart', 'expense', {}),
+    ('receitas_categoria', 'create_income_pie_chart', 'income', {}),
+]
+
+# Conexões somente leitura reaproveitadas dentro de cada processo do pool
+_worker_databases = {}
+
+def month_period(month):
+    """Converte 'AAAA-MM' nas datas inicial e final do mês"""
+    year, month_number = map(int, month.split('-'))
+    last_day = calendar.monthrange(year, month_number)[1]
+    return date(year, month_number, 1), date(year, month_number, last_day)
+
+def _worker_database(db_path):
+    if db_path not in _worker_databases:
+        _worker_databases[db_path] = DatabaseManager(db_path, read_only=True)
+    return _worker_databases[db_path]
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(65536), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _render_html(username, month, summary, transactions, chart_html, currency):
+    dates = format_date_column(transactions['date'])
+    amounts = format_currency_column(transactions['amount'], transactions['currency'])
+    rows = ''.join(
+        f"<tr><td>{row_date}</td><td>{'Receita' if row.type == 'income' else 'Despesa'}</td>"
+        f"<td>{html.escape(row.category)}</td><td class='valor'>{row_amount}</td>"
+        f"<td>{html.escape(row.description) if pd.notna(row.description) else ''}</td></tr>"
+        for row, row_date, row_amount in zip(transactions.itertuples(), dates, amounts)
+    )
+    return f"""<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+<meta charset="utf-8">
+<title>Extrato {month} - {html.escape(username)}</title>
+<style>
+    body {{ font-family: sans-serif; color: #1f2937; margin: 2rem; }}
+    .metricas {{ display: flex; gap: 1rem; }}
+    .metrica {{ background-color: #f8fafc; padding: 1rem; border-radius: 10px; border-left: 4px solid #3b82f6; }}
+    table {{ border-collapse: collapse; width: 100%; margin-top: 1rem; }}
+    td, th {{ border-bottom: 1px solid #e5e7eb; padding: 0.4rem; text-align: left; }}
+    .valor {{ text-align: right; }}
+</style>
+</head>
+<body>
+<h1>💰 Extrato {month} - {html.escape(username)}</h1>
+<div class="metricas">
+    <div class="metrica">💰 Saldo<br><b>{format_currency(summary['balance'], currency)}</b></div>
+    <div class="metrica">📈 Receitas<br><b>{format_currency(summary['total_income'], currency)}</b></div>
+    <div class="metrica">📉 Despesas<br><b>{format_currency(summary['total_expense'], currency)}</b></div>
+    <div class="metrica">🎯 Taxa de Economia<br><b>{format_percentage(summary['savings_rate'])}</b></div>
+</div>
+{''.join(chart_html)}
+<h2>📝 Transações</h2>
+<table>
+<tr><th>Data</th><th>Tipo</th><th>Categoria</th><th class="valor">Valor</th><th>Descrição</th></tr>
+{rows}
+</table>
+<p><small>Gerado em {datetime.now():%d/%m/%Y %H:%M}</small></p>
+</body>
+</html>
+"""
+
+def render_user_report(username, db_path, bundle_dir, month, formats):
+    """Monta o pacote de extrato de um usuário (executado nos processos do pool)"""
+    started = time.perf_counter()
+    db = _worker_database(db_path)
+    analytics = FinancialAnalytics(db, cache=None)
+    start_date, end_date = month_period(month)
+    
+    summary = db.get_financial_summary(start_date, end_date)
+    transactions = db.get_transactions(filters={'start_date': start_date, 'end_date': end_date})
+    sources = {
+        'monthly': db.get_monthly_summary(),
+        'expense': db.get_category_analysis('expense', start_date, end_date),
+        'income': db.get_category_analysis('income', start_date, end_date),
+    }
+    
+    # Escreve em um diretório temporário e só publica o pacote completo
+    partial_dir = f"{bundle_dir}.partial-{os.getpid()}"
+    shutil.rmtree(partial_dir, ignore_errors=True)
+    os.makedirs(partial_dir)
+    
+    chart_html = []
+    for name, method, source, params in REPORT_CHARTS:
+        if sources[source].empty:
+            continue
+        fig = getattr(analytics, method)(sources[source], **params)
+        include_js = 'cdn' if not chart_html else False
+        chart_html.append(fig.to_html(full_html=False, include_plotlyjs=include_js))
+        if 'png' in formats:
+            fig.write_image(os.path.join(partial_dir, f"{name}.png"))
+    
+    files = []
+    if 'html' in formats:
+        with open(os.path.join(partial_dir, 'extrato.html'), 'w', encoding='utf-8') as f:
+            f.write(_render_html(username, month, summary, transactions, chart_html, db.reporting_currency))
+    with open(os.path.join(partial_dir, 'resumo.json'), 'w', encoding='utf-8') as f:
+        json.dump({key: float(value) for key, value in summary.items()}, f, indent=2)
+    
+    for file_name in sorted(os.listdir(partial_dir)):
+        files.append({'name': file_name, 'sha256': _sha256(os.path.join(partial_dir, file_name))})
+    
+    # O manifesto é escrito por último: sua presença marca o pacote como concluído
+    manifest = {
+        'username': username,
+        'month': month,
+        'files': files,
+        'transactions': len(transactions),
+        'seconds': round(time.perf_counter() - started, 3),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    with open(os.path.join(partial_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    
+    shutil.rmtree(bundle_dir, ignore_errors=True)
+    os.replace(partial_dir, bundle_dir)
+    return manifest
+
+class BatchReportGenerator:
+    def __init__(self, db_path='data/finance.db', output_dir='reports', workers=None, formats=('html',)):
+        self.db_path = db_path
+        self.output_dir = output_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.formats = set(formats)
+        
+        if 'png' in self.formats and importlib.util.find_spec('kaleido') is None:
+            raise ValueError("Exportar PNG requer o pacote opcional 'kaleido'")
+    
+    def get_usernames(self):
+        db = DatabaseManager(self.db_path, read_only=True)
+        try:
+            return [row[0] for row in db.conn.execute('SELECT username FROM users ORDER BY username')]
+        finally:
+            db.close()
+    
+    def bundle_dir(self, month, username):
+        # Mesmo nome do banco do usuário: caracteres seguros + hash ("a/b" e "a_b" não colidem)
+        return os.path.join(self.output_dir, month, user_file_name(username))
+    
+    def sweep_partials(self, month):
+        """Remove pacotes incompletos deixados por processos que morreram no meio"""
+        partials = glob.glob(os.path.join(glob.escape(os.path.join(self.output_dir, month)), '*.partial-*'))
+        for path in partials:
+            shutil.rmtree(path, ignore_errors=True)
+        return len(partials)
+    
+    def is_done(self, month, username):
+        return os.path.exists(os.path.join(self.bundle_dir(month, username), 'manifest.json'))
+    
+    def run(self, month, progress=print):
+        """Gera os extratos pendentes do mês; pacotes já concluídos são pulados"""
+        swept = self.sweep_partials(month)
+        if swept:
+            progress(f"🧹 {swept} pacotes incompletos de execuções anteriores removidos")
+        usernames = self.get_usernames()
+        pending = [username for username in usernames if not self.is_done(month, username)]
+        skipped = len(usernames) - len(pending)
+        if skipped:
+            progress(f"↪️ {skipped} extratos já gerados, retomando os {len(pending)} restantes")
+        
+        started = time.perf_counter()
+        results, failures = [], []
+        with ProcessPoolExecutor(max_workers=min(self.workers, max(len(pending), 1))) as pool:
+            futures = {
+                pool.submit(
+                    render_user_report,
+                    username,
+                    ensure_user_database(username, self.db_path),
+                    self.bundle_dir(month, username),
+                    month,
+                    self.formats
+                ): username
+                for username in pending
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                username = futures[future]
+                try:
+                    manifest = future.result()
+                    results.append(manifest)
+                    progress(f"[{done}/{len(pending)}] ✅ {username} ({manifest['seconds']:.2f}s)")
+                except Exception as e:
+                    failures.append(username)
+                    progress(f"[{done}/{len(pending)}] ❌ {username}: {e}")
+        
+        elapsed = time.perf_counter() - started
+        return {
+            'generated': len(results),
+            'skipped': skipped,
+            'failed': failures,
+            'seconds': round(elapsed, 3),
+            'reports_per_second': round(len(results) / elapsed, 2) if elapsed > 0 else 0.0,
+        }
@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+class CashFlowForecaster:
+    """Projeta receitas, despesas e saldo a partir do consolidado mensal por categoria"""
+    
+    def __init__(self, db_manager, trend_window=24, recurring_window=6,
+                 recurring_max_cv=0.15, dormant_months=12):
+        self.db = db_manager
+        # Meses usados para ajustar a tendência linear
+        self.trend_window = trend_window
+        # Meses usados para detectar lançamentos recorrentes (ex: Salário, Moradia)
+        self.recurring_window = recurring_window
+        self.recurring_max_cv = recurring_max_cv
+        # Categorias sem movimento nesse período não são projetadas
+        self.dormant_months = dormant_months
+    
+    def _monthly_matrix(self, rollup):
+        """Converte o consolidado em uma matriz séries x meses, com meses vazios zerados"""
+        months = pd.PeriodIndex(rollup['month'], freq='M')
+        all_months = pd.period_range(months.min(), months.max(), freq='M')
+        
+        series = rollup[['type', 'category']].drop_duplicates().sort_values(['type', 'category'])
+        series = series.reset_index(drop=True)
+        series_codes = pd.MultiIndex.from_frame(series).get_indexer(
+            pd.MultiIndex.from_frame(rollup[['type', 'category']])
+        )
+        month_codes = months.asi8 - all_months.asi8[0]
+        
+        values = np.zeros((len(series), len(all_months)))
+        np.add.at(values, (series_codes, month_codes), rollup['amount'].to_numpy(dtype=float))
+        return series, all_months, values
+    
+    def _trend(self, values):
+        """Ajusta reta por mínimos quadrados em todas as séries de uma vez"""
+        window = values[:, -self.trend_window:]
+        t = np.arange(window.shape[1], dtype=float)
+        t_centered = t - t.mean()
+        denominator = (t_centered ** 2).sum()
+        
+        mean = window.mean(axis=1)
+        if denominator == 0:
+            slope = np.zeros(len(values))
+        else:
+            slope = (window - mean[:, None]) @ t_centered / denominator
+        # Intercepto relativo ao último mês observado
+        level = mean + slope * (t[-1] - t.mean())
+        return level, slope
+    
+    def _seasonality(self, values, all_months, level, slope):
+        """Índice sazonal por mês do ano, a partir dos resíduos da tendência.
+        
+        Usa só a janela em que a reta foi ajustada: estendida a meses mais
+        antigos, ela distorceria os resíduos desses meses.
+        """
+        seasonal = np.zeros((len(values), 12))
+        window = values[:, -self.trend_window:]
+        if window.shape[1] < 24:
+            return seasonal
+        
+        t = np.arange(window.shape[1], dtype=float) - (window.shape[1] - 1)
+        residuals = window - (level[:, None] + slope[:, None] * t)
+        
+        month_of_year = all_months[-window.shape[1]:].month.to_numpy() - 1
+        one_hot = np.zeros((window.shape[1], 12))
+        one_hot[np.arange(window.shape[1]), month_of_year] = 1
+        counts = one_hot.sum(axis=0)
+        
+        seasonal = (residuals @ one_hot) / np.where(counts > 0, counts, 1)
+        return seasonal - seasonal.mean(axis=1, keepdims=True)
+    
+    def _recurring(self, values):
+        """Detecta séries estáveis: presentes em quase todos os meses e com pouca variação"""
+        recent = values[:, -self.recurring_window:]
+        active = (recent > 0).sum(axis=1) >= recent.shape[1] - 1
+        mean = recent.mean(axis=1)
+        cv = np.divide(recent.std(axis=1), mean, out=np.full(len(recent), np.inf), where=mean > 0)
+        
+        is_recurring = active & (recent.shape[1] >= 3) & (cv <= self.recurring_max_cv)
+        return is_recurring, np.median(recent, axis=1)
+    
+    def forecast_categories(self, months=6, as_of=None):
+        """Projeção por categoria para os próximos meses.
+        
+        O mês corrente (de as_of, padrão hoje) ainda está incompleto: fica fora
+        do histórico, para não puxar a tendência para baixo nem esconder
+        recorrências, e passa a ser o primeiro mês projetado.
+        """
+        rollup = self.db.get_monthly_category_summary()
+        current_month = pd.Period(as_of or pd.Timestamp.today(), freq='M')
+        if not rollup.empty:
+            rollup = rollup[pd.PeriodIndex(rollup['month'], freq='M') < current_month]
+        if rollup.empty or months <= 0:
+            return pd.DataFrame(columns=['month', 'type', 'category', 'amount', 'method'])
+        
+        series, all_months, values = self._monthly_matrix(rollup)
+        level, slope = self._trend(values)
+        seasonal = self._seasonality(values, all_months, level, slope)
+        is_recurring, recurring_level = self._recurring(values)
+        
+        future_months = pd.period_range(all_months[-1] + 1, periods=months, freq='M')
+        horizon = np.arange(1, months + 1, dtype=float)
+        month_of_year = future_months.month.to_numpy() - 1
+        
+        projected = level[:, None] + slope[:, None] * horizon + seasonal[:, month_of_year]
+        projected = np.where(is_recurring[:, None], recurring_level[:, None], projected)
+        
+        # Categorias paradas há muito tempo não entram na projeção
+        dormant = values[:, -self.dormant_months:].sum(axis=1) == 0
+        projected[dormant] = 0
+        projected = np.clip(projected, 0, None).round(2)
+        
+        method = np.where(is_recurring, 'recorrente', 'tendência + sazonalidade')
+        return pd.DataFrame({
+            'month': np.tile(future_months.astype(str), len(series)),
+            'type': np.repeat(series['type'].to_numpy(), months),
+            'category': np.repeat(series['category'].to_numpy(), months),
+            'amount': projected.ravel(),
+            'method': np.repeat(method, months)
+        })
+    
+    def forecast_monthly(self, months=6, by_category=None):
+        """Projeção consolidada no mesmo formato de get_monthly_summary (reaproveita by_category, se já calculada)"""
+        if by_category is None:
+            by_category = self.forecast_categories(months)
+        if by_category.empty:
+            return pd.DataFrame()
+        
+        monthly = by_category.pivot_table(
+            index='month', columns='type', values='amount', aggfunc='sum', fill_value=0
+        )
+        monthly = monthly.reindex(columns=['income', 'expense'], fill_value=0)
+        monthly['balance'] = monthly['income'] - monthly['expense']
+        monthly.columns.name = None
+        return monthly.reset_index()
@@ -0,0 +1,176 @@
+from datetime import date
+import numpy as np
+import pandas as pd
+from database import build_category_frame, build_financial_summary, build_monthly_summary
+from modules.write_listener import WriteListenerModel
+
+TYPES = ['income', 'expense']
+EPOCH = np.datetime64('1970-01-01', 'D')
+
+def day_numbers(dates):
+    """Datas (texto AAAA-MM-DD, date ou Timestamp) -> dias desde 1970-01-01 (int32)"""
+    values = pd.to_datetime(pd.Series(dates)).to_numpy().astype('datetime64[D]')
+    return (values - EPOCH).astype(np.int32)
+
+class LedgerEngine(WriteListenerModel):
+    """Período quente do livro-caixa em colunas NumPy compactas, ordenadas por dia.
+    
+    Valores em centavos (int64, já na moeda de relatório), dia (int32), código da
+    categoria (int16) e tipo (int8). Consultas por período viram duas buscas
+    binárias na coluna de dias e reduções vetorizadas (bincount) sobre a fatia.
+    As escritas do DatabaseManager são aplicadas às colunas (ver
+    WriteListenerModel). Cada inclusão ou exclusão copia as cinco colunas
+    (np.insert/np.delete), O(n) no tamanho do período quente: aceitável para um
+    ano de lançamentos. Períodos que começam antes do período quente (ou sem
+    início) são respondidos pelo SQL.
+    """
+    
+    def __init__(self, db_manager, start_date=None):
+        super().__init__(db_manager)
+        # Padrão: ano corrente, o que a maioria dos painéis consulta
+        self.start_date = pd.Timestamp(start_date or date.today().replace(month=1, day=1))
+        self.start_day = int(day_numbers([self.start_date])[0])
+    
+    def _read_rows(self, start_date=None, end_date=None):
+        """Transações do período lidas do SQLite, com data e valor já convertido"""
+        where, params = self.db._period_filter(
+            start_date and pd.Timestamp(start_date).strftime('%Y-%m-%d'),
+            end_date and pd.Timestamp(end_date).strftime('%Y-%m-%d')
+        )
+        rows = pd.read_sql_query(f'''
+            SELECT id, amount, type, category, date, currency
+            FROM transactions
+            WHERE 1=1 {where}
+            ORDER BY date, id
+        ''', self.db.conn, params=params)
+        rows['date'] = pd.to_datetime(rows['date'], format='ISO8601')
+        rows['amount'] = self.db.convert_amounts(rows['amount'], rows['date'], rows['currency'])
+        return rows
+    
+    def _load(self):
+        rows = self._read_rows(self.start_date)
+        dates, converted = rows['date'], rows['amount']
+        
+        codes, categories = pd.factorize(rows['category'], sort=True)
+        self.categories = list(categories)
+        self._codes = {name: code for code, name in enumerate(self.categories)}
+        self.ids = rows['id'].to_numpy(dtype=np.int64)
+        self.cents = np.rint(converted.to_numpy(dtype=float) * 100).astype(np.int64)
+        self.days = day_numbers(dates) if len(rows) else np.empty(0, dtype=np.int32)
+        self.category_codes = codes.astype(np.int16)
+        self.types = (rows['type'] == 'expense').to_numpy().astype(np.int8)
+        self.styles = self.db.get_category_styles()
+    
+    def __len__(self):
+        return len(self.refresh().ids)
+    
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in (self.ids, self.cents, self.days, self.category_codes, self.types))
+    
+    # Deltas
+    def _apply_event(self, event):
+        if event['before'] is not None:
+            self._remove(event['before'])
+        if event['after'] is not None:
+            self._insert(event['after'])
+    
+    def _remove(self, row):
+        day = int(day_numbers([row['date']])[0])
+        if day < self.start_day:
+            return
+        lo, hi = np.searchsorted(self.days, [day, day + 1])
+        positions = lo + np.flatnonzero(self.ids[lo:hi] == row['id'])
+        for name in ('ids', 'cents', 'days', 'category_codes', 'types'):
+            setattr(self, name, np.delete(getattr(self, name), positions))
+    
+    def _insert(self, row):
+        day = int(day_numbers([row['date']])[0])
+        if day < self.start_day:
+            return
+        if row['category'] not in self._codes:
+            self._codes[row['category']] = len(self.categories)
+            self.categories.append(row['category'])
+            self.styles = self.db.get_category_styles()
+        amount = self.db.convert_amounts(
+            pd.Series([float(row['amount'])]), pd.Series([pd.Timestamp(row['date'])]), pd.Series([row['currency']])
+        ).iloc[0]
+        
+        # Mantém a ordem (dia, id) das colunas
+        lo, hi = np.searchsorted(self.days, [day, day + 1])
+        position = lo + int(np.searchsorted(self.ids[lo:hi], row['id']))
+        values = {
+            'ids': row['id'], 'cents': round(amount * 100), 'days': day,
+            'category_codes': self._codes[row['category']], 'types': int(row['type'] == 'expense')
+        }
+        for name, value in values.items():
+            column = getattr(self, name)
+            setattr(self, name, np.insert(column, position, np.array(value, dtype=column.dtype)))
+    
+    # Consultas (mesmo formato dos métodos do DatabaseManager)
+    def covers(self, start_date):
+        return start_date is not None and pd.Timestamp(start_date) >= self.start_date
+    
+    def _slice(self, start_date, end_date=None):
+        """Fatia [início, fim] das colunas, por busca binária na coluna de dias"""
+        self.refresh()
+        lo = np.searchsorted(self.days, day_numbers([start_date])[0], side='left')
+        hi = len(self.days) if end_date is None else np.searchsorted(self.days, day_numbers([end_date])[0], side='right')
+        return slice(lo, hi)
+    
+    def get_financial_summary(self, start_date=None, end_date=None):
+        if not self.covers(start_date):
+            return self.db.get_financial_summary(start_date, end_date)
+        window = self._slice(start_date, end_date)
+        totals = np.bincount(self.types[window], weights=self.cents[window], minlength=2) / 100
+        return build_financial_summary(totals[0], totals[1])
+    
+    def get_monthly_summary(self, start_date=None, end_date=None):
+        if not self.covers(start_date):
+            return self.db.get_monthly_summary(start_date, end_date)
+        window = self._slice(start_date, end_date)
+        if window.start == window.stop:
+            return pd.DataFrame()
+        
+        months = (self.days[window] + EPOCH).astype('datetime64[M]')
+        labels, month_index = np.unique(months, return_inverse=True)
+        groups = month_index * 2 + self.types[window]
+        totals = np.bincount(groups, weights=self.cents[window], minlength=len(labels) * 2).reshape(-1, 2) / 100
+        monthly = pd.DataFrame(totals, columns=pd.Index(TYPES, name='type'), index=pd.Index(labels.astype(str), name='month'))
+        present = [name for code, name in enumerate(TYPES) if (self.types[window] == code).any()]
+        return build_monthly_summary(monthly[sorted(present)])
+    
+    def get_category_analysis(self, type='expense', start_date=None, end_date=None):
+        if not self.covers(start_date):
+            return self.db.get_category_analysis(type, start_date, end_date)
+        window = self._slice(start_date, end_date)
+        selected = self.types[window] == TYPES.index(type)
+        codes = self.category_codes[window][selected]
+        if not len(codes):
+            return pd.DataFrame()
+        
+        size = len(self.categories)
+        totals = np.bincount(codes, weights=self.cents[window][selected], minlength=size) / 100
+        counts = np.bincount(codes, minlength=size)
+        used = counts > 0
+        frame = pd.DataFrame(
+            {'total_amount': totals[used], 'transaction_count': counts[used]},
+            index=pd.Index(np.array(self.categories, dtype=object)[used], name='category')
+        )
+        return build_category_frame(frame, self.styles)
+    
+    def get_range(self, start_date, end_date=None):
+        """Transações do período (id, data, valor convertido, tipo e categoria), em ordem de data"""
+        if not self.covers(start_date):
+            rows = self._read_rows(start_date, end_date)
+            rows['date'] = rows['date'].dt.normalize().astype('datetime64[ns]')
+            rows['amount'] = rows['amount'].round(2)
+            return rows[['id', 'date', 'amount', 'type', 'category']]
+        window = self._slice(start_date, end_date)
+        return pd.DataFrame({
+            'id': self.ids[window],
+            'date': (self.days[window] + EPOCH).astype('datetime64[ns]'),
+            'amount': self.cents[window] / 100,
+            'type': np.array(TYPES, dtype=object)[self.types[window]],
+            'category': np.array(self.categories, dtype=object)[self.category_codes[window]],
+        })
\ No newline at end of file
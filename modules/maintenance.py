@@ -0,0 +1,169 @@
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+# Intervalos entre execuções automáticas de cada tarefa
+OPTIMIZE_INTERVAL = timedelta(days=1)
+QUICK_CHECK_INTERVAL = timedelta(days=7)
+# Páginas livres (fração do arquivo) a partir das quais o vacuum incremental é disparado
+FREELIST_RATIO_THRESHOLD = 0.10
+FREELIST_PAGES_THRESHOLD = 1000
+# Páginas liberadas por passo do vacuum incremental
+VACUUM_STEP_PAGES = 256
+
+class DatabaseMaintenance:
+    """Manutenção do SQLite: estatísticas do planejador, vacuum incremental e verificação de integridade"""
+    
+    def __init__(self, db_manager):
+        self.db = db_manager
+        self.conn = db_manager.conn
+        with db_manager._write_transaction() as cursor:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS maintenance_log (
+                    task TEXT PRIMARY KEY,
+                    last_run TIMESTAMP NOT NULL,
+                    duration REAL NOT NULL,
+                    result TEXT
+                )
+            ''')
+    
+    # Estado
+    def last_run(self, task):
+        row = self.conn.execute('SELECT last_run FROM maintenance_log WHERE task = ?', (task,)).fetchone()
+        return datetime.fromisoformat(row[0]) if row else None
+    
+    def _record(self, task, started, result):
+        with self.db._write_transaction() as cursor:
+            cursor.execute('''
+                INSERT OR REPLACE INTO maintenance_log (task, last_run, duration, result)
+                VALUES (?, ?, ?, ?)
+            ''', (task, datetime.now().isoformat(timespec='seconds'), round(time.perf_counter() - started, 4), result))
+    
+    def _is_due(self, task, interval):
+        last_run = self.last_run(task)
+        return last_run is None or datetime.now() - last_run >= interval
+    
+    def get_status(self):
+        page_count = self.conn.execute('PRAGMA page_count').fetchone()[0]
+        freelist_count = self.conn.execute('PRAGMA freelist_count').fetchone()[0]
+        return {
+            'auto_vacuum': {0: 'none', 1: 'full', 2: 'incremental'}[self.conn.execute('PRAGMA auto_vacuum').fetchone()[0]],
+            'page_count': page_count,
+            'freelist_count': freelist_count,
+            'freelist_ratio': freelist_count / page_count if page_count else 0.0,
+            'last_runs': {
+                row[0]: {'last_run': row[1], 'duration': row[2], 'result': row[3]}
+                for row in self.conn.execute('SELECT task, last_run, duration, result FROM maintenance_log')
+            }
+        }
+    
+    def _with_deadline(self, deadline, operation):
+        """Executa a operação interrompendo o SQLite se o prazo estourar"""
+        if deadline is None:
+            return operation()
+        self.conn.set_progress_handler(lambda: 1 if time.perf_counter() > deadline else 0, 1000)
+        try:
+            return operation()
+        finally:
+            self.conn.set_progress_handler(None, 0)
+    
+    # Tarefas
+    def optimize(self, full=False, deadline=None):
+        """Atualiza as estatísticas do planejador (ANALYZE completo ou PRAGMA optimize)"""
+        started = time.perf_counter()
+        try:
+            # Na transação de escrita: na conexão compartilhada (modo por usuário), o
+            # commit ou rollback daqui não pode pegar a escrita pela metade de outra sessão
+            with self.db._write_transaction() as cursor:
+                if full:
+                    self._with_deadline(deadline, lambda: cursor.execute('ANALYZE'))
+                else:
+                    # analysis_limit amostra os índices e mantém o ANALYZE curto
+                    cursor.execute('PRAGMA analysis_limit = 400')
+                    self._with_deadline(deadline, lambda: cursor.execute('PRAGMA optimize'))
+        except sqlite3.OperationalError as e:
+            # Interrompida pelo prazo: desfeita, sem registro, para tentar de novo na próxima oportunidade
+            return f'interrompido: {e}'
+        self._record('optimize', started, 'ok')
+        return 'ok'
+    
+    def enable_incremental_vacuum(self):
+        """Passa um banco antigo ao vacuum incremental (VACUUM completo, uma única vez).
+        
+        Reescreve o arquivo inteiro: só roda pela linha de comando, nunca na abertura do app.
+        """
+        if self.conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+            return False
+        started = time.perf_counter()
+        with self.db._write_lock:
+            self.conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            self.conn.execute('VACUUM')
+        self._record('enable_incremental_vacuum', started, 'ok')
+        return True
+    
+    def incremental_vacuum(self, max_pages=None, deadline=None):
+        """Devolve páginas livres ao sistema em passos curtos, parando no prazo"""
+        started = time.perf_counter()
+        freed = 0
+        while True:
+            freelist = self.conn.execute('PRAGMA freelist_count').fetchone()[0]
+            if freelist == 0 or (max_pages is not None and freed >= max_pages):
+                break
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            step = min(VACUUM_STEP_PAGES, freelist)
+            if max_pages is not None:
+                step = min(step, max_pages - freed)
+            # Um passo por transação: a trava de escrita fica livre entre os passos
+            with self.db._write_transaction() as cursor:
+                cursor.execute(f'PRAGMA incremental_vacuum({int(step)})').fetchall()
+            after = self.conn.execute('PRAGMA freelist_count').fetchone()[0]
+            if after >= freelist:
+                # auto_vacuum desligado: nada a liberar incrementalmente
+                break
+            freed += freelist - after
+        self._record('incremental_vacuum', started, f'{freed} páginas liberadas')
+        return freed
+    
+    def integrity_check(self, quick=True, deadline=None):
+        """Verifica a integridade do banco; quick_check é bem mais barato"""
+        started = time.perf_counter()
+        pragma = 'quick_check' if quick else 'integrity_check'
+        try:
+            rows = self._with_deadline(deadline, lambda: self.conn.execute(f'PRAGMA {pragma}').fetchall())
+            messages = [row[0] for row in rows]
+            result = 'ok' if messages == ['ok'] else '; '.join(messages[:10])
+        except sqlite3.OperationalError as e:
+            # Verificação incompleta não conta como feita
+            return f'interrompido: {e}'
+        self._record(pragma, started, result)
+        return result
+    
+    def run_if_due(self, time_budget=0.25):
+        """Roda só o que estiver vencido, sem passar do orçamento de tempo (em segundos)"""
+        deadline = time.perf_counter() + time_budget
+        results = {}
+        
+        if self._is_due('optimize', OPTIMIZE_INTERVAL):
+            results['optimize'] = self.optimize(deadline=deadline)
+        
+        status = self.get_status()
+        if status['auto_vacuum'] == 'incremental' and (
+            status['freelist_ratio'] >= FREELIST_RATIO_THRESHOLD
+            or status['freelist_count'] >= FREELIST_PAGES_THRESHOLD
+        ):
+            results['incremental_vacuum'] = self.incremental_vacuum(deadline=deadline)
+        
+        if time.perf_counter() < deadline and self._is_due('quick_check', QUICK_CHECK_INTERVAL):
+            results['quick_check'] = self.integrity_check(quick=True, deadline=deadline)
+        
+        return results
+    
+    def run_all(self):
+        """Manutenção completa, sem limite de tempo (para rodar fora do horário de uso)"""
+        return {
+            'enable_incremental_vacuum': self.enable_incremental_vacuum(),
+            'optimize': self.optimize(full=True),
+            'incremental_vacuum': self.incremental_vacuum(),
+            'integrity_check': self.integrity_check(quick=False)
+        }
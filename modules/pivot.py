@@ -0,0 +1,117 @@
+import streamlit as st
+from datetime import datetime, timedelta
+from database import PIVOT_MAX_ROWS
+from utils.formatting import format_currency_column
+
+DIMENSION_LABELS = {
+    'month': 'Mês',
+    'week': 'Semana',
+    'weekday': 'Dia da semana',
+    'category': 'Categoria',
+    'type': 'Tipo',
+    'tag': 'Tag',
+}
+MEASURE_LABELS = {'sum': 'Soma', 'count': 'Quantidade', 'avg': 'Média', 'median': 'Mediana'}
+WEEKDAYS = ['Domingo', 'Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado']
+# Colunas de uma tabela cruzada (valores distintos da dimensão de coluna)
+MAX_PIVOT_COLUMNS = 60
+
+class PivotExplorer:
+    def __init__(self, db_manager):
+        self.db = db_manager
+    
+    def show_pivot_explorer(self):
+        st.header("🧮 Explorador de Dados")
+        st.caption("Escolha como agrupar e o que medir; o agrupamento é feito direto no banco.")
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            rows = st.multiselect(
+                "Linhas", list(DIMENSION_LABELS), default=['category'],
+                format_func=DIMENSION_LABELS.get, max_selections=2, key="pivot_rows"
+            )
+        with col2:
+            column_options = [None] + [d for d in DIMENSION_LABELS if d not in rows]
+            column = st.selectbox(
+                "Colunas", column_options,
+                format_func=lambda d: "Nenhuma" if d is None else DIMENSION_LABELS[d], key="pivot_column"
+            )
+        with col3:
+            measures = st.multiselect(
+                "Medidas", list(MEASURE_LABELS), default=['sum'],
+                format_func=MEASURE_LABELS.get, key="pivot_measures"
+            )
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            filter_type = st.selectbox(
+                "Tipo", [None, 'expense', 'income'],
+                format_func=lambda x: "Todos" if x is None else ("Despesa" if x == 'expense' else "Receita"),
+                key="pivot_type"
+            )
+        with col2:
+            start_date = st.date_input("Data Inicial", datetime.now() - timedelta(days=365), key="pivot_start")
+        with col3:
+            end_date = st.date_input("Data Final", datetime.now(), key="pivot_end")
+        
+        dimensions = rows + ([column] if column else [])
+        if not dimensions or not measures:
+            st.info("Escolha ao menos uma dimensão e uma medida.")
+            return
+        
+        result = self.db.get_pivot(
+            dimensions, measures,
+            filters={'type': filter_type, 'start_date': start_date, 'end_date': end_date}
+        )
+        if result.attrs.get('truncated'):
+            st.warning(f"⚠️ Resultado limitado aos primeiros {PIVOT_MAX_ROWS} grupos. Refine os filtros ou as dimensões.")
+        if result.empty:
+            st.info("📝 Nenhuma transação no período selecionado.")
+            return
+        
+        if 'weekday' in result:
+            result['weekday'] = result['weekday'].map(dict(enumerate(WEEKDAYS)))
+        if 'type' in result:
+            result['type'] = result['type'].map({'income': 'Receita', 'expense': 'Despesa'})
+        
+        if column:
+            self.show_crosstab(result, rows, column, measures)
+        else:
+            self.show_table(result, measures)
+        
+        st.download_button(
+            "📥 Exportar CSV",
+            data=result.to_csv(index=False),
+            file_name="explorador.csv",
+            mime="text/csv",
+            use_container_width=True
+        )
+    
+    def _labels(self, frame):
+        return frame.rename(columns={**DIMENSION_LABELS, **MEASURE_LABELS})
+    
+    def show_table(self, result, measures):
+        display = result.copy()
+        for measure in ('sum', 'avg', 'median'):
+            if measure in display:
+                display[measure] = format_currency_column(display[measure], self.db.reporting_currency)
+        st.dataframe(self._labels(display), hide_index=True, use_container_width=True)
+    
+    def show_crosstab(self, result, rows, column, measures):
+        """Tabela cruzada de uma medida; o resultado agregado já é pequeno, então o pivot é no pandas"""
+        if result[column].nunique() > MAX_PIVOT_COLUMNS:
+            st.warning(f"⚠️ Mais de {MAX_PIVOT_COLUMNS} colunas: use '{DIMENSION_LABELS[column]}' como linha.")
+            return
+        measure = measures[0]
+        if len(measures) > 1:
+            measure = st.selectbox("Medida exibida", measures, format_func=MEASURE_LABELS.get, key="pivot_shown")
+        
+        index = rows or None
+        table = result.pivot_table(index=index, columns=column, values=measure, aggfunc='sum', sort=False)
+        if index is None:
+            table.index = [MEASURE_LABELS[measure]]
+        table = table.rename_axis(
+            index=[DIMENSION_LABELS.get(name, name) for name in table.index.names],
+            columns=DIMENSION_LABELS[column]
+        )
+        st.dataframe(table, use_container_width=True)
\ No newline at end of file
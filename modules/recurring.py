@@ -0,0 +1,130 @@
+import streamlit as st
+import pandas as pd
+from datetime import date, timedelta
+from utils.helpers import DEFAULT_CURRENCY, RECURRENCE_FREQUENCIES, format_currency, recurrence_dates
+from utils.formatting import format_currency_column, format_date_column
+
+class RecurringManager:
+    def __init__(self, db_manager):
+        self.db = db_manager
+    
+    def show_recurring_rules(self):
+        st.header("🔁 Transações Recorrentes")
+        
+        if st.button("▶️ Lançar ocorrências pendentes"):
+            result = self.db.materialize_recurring()
+            st.success(f"✅ {result['inserted']} transações lançadas ({result['duplicates']} já existiam)")
+        
+        self.show_rule_list()
+        self.show_projection()
+        self.show_rule_form()
+    
+    def show_rule_list(self):
+        rules = self.db.get_recurring_rules()
+        if rules.empty:
+            st.info("📝 Nenhuma regra cadastrada. Crie a primeira abaixo (salário, aluguel, assinaturas...).")
+            return
+        
+        st.subheader("Regras Cadastradas")
+        amounts = format_currency_column(rules['amount'], rules['currency'])
+        for rule, amount in zip(rules.to_dict('records'), amounts):
+            next_dates = recurrence_dates(
+                rule['start_date'], rule['frequency'], rule['interval'],
+                rule['end_date'] if pd.notna(rule['end_date']) else date.today() + timedelta(days=400),
+                after=rule['materialized_through'] if pd.notna(rule['materialized_through']) else None
+            )
+            next_text = next_dates[0].strftime('%d/%m/%Y') if len(next_dates) else "encerrada"
+            every = f"a cada {rule['interval']} " if rule['interval'] > 1 else ""
+            
+            col1, col2, col3 = st.columns([4, 1, 1])
+            with col1:
+                icon = "📈" if rule['type'] == 'income' else "📉"
+                status = "" if rule['active'] else " (pausada)"
+                st.markdown(
+                    f"{icon} **{rule['description'] or rule['category']}** - {amount} · "
+                    f"{every}{RECURRENCE_FREQUENCIES[rule['frequency']]}{status} · próxima: {next_text}"
+                )
+            with col2:
+                label = "⏸️ Pausar" if rule['active'] else "▶️ Retomar"
+                if st.button(label, key=f"toggle_rule_{rule['id']}"):
+                    self.db.set_recurring_rule_active(rule['id'], not rule['active'])
+                    st.rerun()
+            with col3:
+                if st.button("🗑️", key=f"delete_rule_{rule['id']}"):
+                    self.db.delete_recurring_rule(rule['id'])
+                    st.rerun()
+    
+    def show_projection(self):
+        st.subheader("📅 Próximas Ocorrências")
+        days = st.slider("Horizonte (dias)", min_value=7, max_value=365, value=30)
+        projection = self.db.project_recurring(date.today() + timedelta(days=days))
+        if projection.empty:
+            st.info("Nenhuma ocorrência prevista no período.")
+            return
+        
+        currency = self.db.reporting_currency
+        converted = self.db.convert_amounts(projection['amount'], projection['date'], projection['currency'])
+        income = converted[projection['type'] == 'income'].sum()
+        expense = converted[projection['type'] == 'expense'].sum()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Receitas previstas", format_currency(income, currency))
+        col2.metric("Despesas previstas", format_currency(expense, currency))
+        col3.metric("Saldo previsto", format_currency(income - expense, currency))
+        
+        st.dataframe(pd.DataFrame({
+            'Data': format_date_column(projection['date']),
+            'Tipo': projection['type'].map({'income': '📈 Receita', 'expense': '📉 Despesa'}),
+            'Categoria': projection['category'],
+            'Descrição': projection['description'],
+            'Valor': format_currency_column(projection['amount'], projection['currency']),
+        }), hide_index=True, use_container_width=True)
+    
+    def show_rule_form(self):
+        st.subheader("Nova Regra")
+        
+        rule_type = st.radio(
+            "Tipo",
+            ["income", "expense"],
+            format_func=lambda x: "📈 Receita" if x == "income" else "📉 Despesa",
+            horizontal=True,
+            key="rule_type"
+        )
+        categories_df = self.db.get_categories(type=rule_type)
+        category_icons = categories_df.set_index('name')['icon'].to_dict()
+        
+        with st.form("recurring_rule_form"):
+            col1, col2 = st.columns(2)
+            with col1:
+                amount = st.number_input("Valor", min_value=0.01, step=0.01, format="%.2f")
+                category = st.selectbox(
+                    "Categoria",
+                    categories_df['name'].tolist(),
+                    format_func=lambda x: f"{category_icons.get(x, '💰')} {x}"
+                )
+                description = st.text_input("Descrição", placeholder="Ex: Aluguel, Netflix...")
+                currencies = self.db.get_currencies()
+                currency = st.selectbox("Moeda", currencies, index=currencies.index(DEFAULT_CURRENCY))
+            with col2:
+                frequency = st.selectbox(
+                    "Frequência", list(RECURRENCE_FREQUENCIES), format_func=RECURRENCE_FREQUENCIES.get
+                )
+                interval = st.number_input("Repetir a cada (meses/semanas/dias)", min_value=1, value=1, step=1)
+                start_date = st.date_input("Início", value=date.today())
+                has_end = st.checkbox("Tem data de término")
+                end_date = st.date_input("Término", value=date.today() + timedelta(days=365))
+            
+            submitted = st.form_submit_button("💾 Salvar Regra")
+            
+            if submitted:
+                if not category:
+                    st.error("❌ Selecione uma categoria")
+                elif has_end and end_date < start_date:
+                    st.error("❌ O término deve ser depois do início")
+                else:
+                    self.db.add_recurring_rule(
+                        amount, rule_type, category, description, frequency,
+                        start_date.strftime('%Y-%m-%d'), interval=int(interval),
+                        end_date=end_date.strftime('%Y-%m-%d') if has_end else None, currency=currency
+                    )
+                    result = self.db.materialize_recurring()
+                    st.success(f"🎉 Regra criada! {result['inserted']} ocorrências lançadas até hoje.")
\ No newline at end of file
@@ -1,11 +1,19 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
+from modules.forecast import CashFlowForecaster
+from utils.helpers import comparison_periods, format_currency, format_percentage
+from utils.formatting import format_currency_column
 
 class ReportGenerator:
-    def __init__(self, db_manager, analytics):
+    def __init__(self, db_manager, analytics, ledger=None, engine=None):
         self.db = db_manager
         self.analytics = analytics
+        # Agregados de todo o período vêm do modelo da sessão, quando houver
+        self.ledger = ledger or db_manager
+        # Resumos por período recente vêm do motor em memória (o resto cai no SQL)
+        self.engine = engine or db_manager
+        self.forecaster = CashFlowForecaster(db_manager)
     
     def show_financial_reports(self):
         st.header("📈 Relatórios Financeiros")
@@ -21,43 +29,49 @@ class ReportGenerator:
             end_date = st.date_input("Data Final", datetime.now())
         
         # Resumo financeiro
-        summary = self.db.get_financial_summary(start_date, end_date)
+        summary = self.engine.get_financial_summary(start_date, end_date)
+        currency = self.db.reporting_currency
         
         # Métricas principais
         col1, col2, col3, col4 = st.columns(4)
         with col1:
             st.metric(
                 "💰 Saldo", 
-                f"R$ {summary['balance']:,.2f}",
-                delta=f"R$ {summary['balance']:,.2f}"
+                format_currency(summary['balance'], currency),
+                delta=format_currency(summary['balance'], currency)
             )
         with col2:
             st.metric(
                 "📈 Receitas", 
-                f"R$ {summary['total_income']:,.2f}"
+                format_currency(summary['total_income'], currency)
             )
         with col3:
             st.metric(
                 "📉 Despesas", 
-                f"R$ {summary['total_expense']:,.2f}"
+                format_currency(summary['total_expense'], currency)
             )
         with col4:
             st.metric(
                 "🎯 Taxa de Economia", 
-                f"{summary['savings_rate']:.1f}%"
+                format_percentage(summary['savings_rate'])
             )
         
         # Gráficos
-        monthly_data = self.db.get_monthly_summary()
-        expense_by_category = self.db.get_category_analysis('expense')
-        income_by_category = self.db.get_category_analysis('income')
+        monthly_data = self.ledger.get_monthly_summary()
+        expense_by_category = self.ledger.get_category_analysis('expense')
+        income_by_category = self.ledger.get_category_analysis('income')
         
         if not monthly_data.empty:
+            # Projeção de fluxo de caixa
+            forecast_months = st.slider("🔮 Meses de previsão", 0, 12, 3)
+            by_category = self.forecaster.forecast_categories(forecast_months)
+            forecast = self.forecaster.forecast_monthly(forecast_months, by_category)
+            
             # Gráficos de tendência
             col1, col2 = st.columns(2)
             
             with col1:
-                trend_chart = self.analytics.create_monthly_trend_chart(monthly_data)
+                trend_chart = self.analytics.create_monthly_trend_chart(monthly_data, forecast=forecast)
                 st.plotly_chart(trend_chart, use_container_width=True)
             
             with col2:
@@ -89,6 +103,95 @@ class ReportGenerator:
                 if not income_by_category.empty:
                     income_bar = self.analytics.create_category_bar_chart(income_by_category, 'income')
                     st.plotly_chart(income_bar, use_container_width=True)
+            
+            # Comparação entre períodos
+            self.show_period_comparison()
+            
+            # Totais por tag no período selecionado
+            self.show_tag_totals(start_date, end_date)
+            
+            # Previsão detalhada por categoria
+            if forecast_months > 0:
+                with st.expander("🔮 Previsão por categoria"):
+                    st.dataframe(
+                        by_category.pivot_table(
+                            index=['type', 'category', 'method'], columns='month',
+                            values='amount', aggfunc='sum'
+                        ).reset_index(),
+                        use_container_width=True,
+                        hide_index=True
+                    )
         
         else:
-            st.info("📊 Adicione transações para visualizar os relatórios.")
\ No newline at end of file
+            st.info("📊 Adicione transações para visualizar os relatórios.")
+    
+    def show_tag_totals(self, start_date, end_date):
+        tag_expenses = self.db.get_tag_analysis('expense', start_date, end_date)
+        tag_income = self.db.get_tag_analysis('income', start_date, end_date)
+        if tag_expenses.empty and tag_income.empty:
+            return
+        
+        st.subheader("🏷️ Totais por Tag")
+        currency = self.db.reporting_currency
+        col1, col2 = st.columns(2)
+        for column, title, totals in ((col1, "📉 Despesas", tag_expenses), (col2, "📈 Receitas", tag_income)):
+            with column:
+                st.markdown(f"**{title}**")
+                if totals.empty:
+                    st.caption("Nenhuma transação com tag no período")
+                    continue
+                st.dataframe(pd.DataFrame({
+                    'Tag': totals['tag'],
+                    'Total': format_currency_column(totals['total_amount'], currency),
+                    'Transações': totals['transaction_count'],
+                }), hide_index=True, use_container_width=True)
+    
+    def show_period_comparison(self):
+        st.subheader("🔁 Comparação entre Períodos")
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            mode = st.radio(
+                "Comparar",
+                ["mom", "yoy"],
+                format_func=lambda x: "📅 Mês a mês" if x == "mom" else "📆 Ano a ano",
+                horizontal=True,
+                key="comparison_mode"
+            )
+        with col2:
+            comparison_type = st.radio(
+                "Tipo",
+                ["expense", "income"],
+                format_func=lambda x: "📉 Despesas" if x == "expense" else "📈 Receitas",
+                horizontal=True,
+                key="comparison_type"
+            )
+        with col3:
+            reference = st.date_input("Até a data", datetime.now(), key="comparison_reference")
+        
+        current, previous = comparison_periods(mode, reference)
+        comparison = self.db.get_period_comparison(current, previous, comparison_type)
+        if comparison.empty:
+            st.info("📊 Sem transações nos períodos comparados.")
+            return
+        
+        st.caption(
+            f"Atual: {current[0]:%d/%m/%Y} a {current[1]:%d/%m/%Y} · "
+            f"Anterior: {previous[0]:%d/%m/%Y} a {previous[1]:%d/%m/%Y}"
+        )
+        
+        chart = self.analytics.create_period_comparison_chart(comparison)
+        st.plotly_chart(chart, use_container_width=True)
+        
+        st.dataframe(
+            comparison[['category', 'current', 'previous', 'delta', 'change_pct']],
+            column_config={
+                'category': 'Categoria',
+                'current': st.column_config.NumberColumn('Atual', format='%.2f'),
+                'previous': st.column_config.NumberColumn('Anterior', format='%.2f'),
+                'delta': st.column_config.NumberColumn('Diferença', format='%.2f'),
+                'change_pct': st.column_config.NumberColumn('Variação (%)', format='%.1f')
+            },
+            use_container_width=True,
+            hide_index=True
+        )
\ No newline at end of file
@@ -0,0 +1,115 @@
+import pandas as pd
+from database import build_category_frame, build_financial_summary, build_monthly_summary
+from modules.write_listener import WriteListenerModel
+
+# Linhas extras guardadas além das exibidas, para absorver exclusões sem nova consulta
+RECENT_SLACK = 20
+
+class SessionLedger(WriteListenerModel):
+    """Agregados do livro-caixa mantidos na sessão e atualizados por deltas.
+    
+    O efeito de cada escrita é aplicado aos totais em O(1); lacunas de revisão
+    recarregam o modelo por completo (ver WriteListenerModel).
+    """
+    
+    def __init__(self, db_manager, recent_size=10):
+        super().__init__(db_manager)
+        self.recent_size = recent_size
+        self._state = None
+    
+    def _load(self):
+        rollup = self.db.get_monthly_category_summary()
+        month_totals, category_totals, type_totals = {}, {}, {'income': 0.0, 'expense': 0.0}
+        for row in rollup.itertuples(index=False):
+            self._add(month_totals, (row.month, row.type), row.amount, row.transaction_count)
+            self._add(category_totals, (row.type, row.category), row.amount, row.transaction_count)
+            type_totals[row.type] += row.amount
+        
+        self._state = {
+            'months': month_totals,
+            'categories': category_totals,
+            'types': type_totals,
+            'styles': self.db.get_category_styles(),
+            'recent': self.db.get_transactions(limit=self.recent_size + RECENT_SLACK),
+        }
+    
+    @staticmethod
+    def _add(totals, key, amount, count):
+        """Soma ao balde; baldes sem transações são removidos"""
+        total, total_count = totals.get(key, (0.0, 0))
+        total_count += count
+        if total_count <= 0:
+            totals.pop(key, None)
+        else:
+            totals[key] = (total + amount, total_count)
+    
+    # Deltas
+    def _apply_event(self, event):
+        for row, sign in ((event['before'], -1), (event['after'], 1)):
+            if row is not None:
+                self._apply_row(row, sign)
+        self._patch_recent(event)
+    
+    def _apply_row(self, row, sign):
+        state = self._state
+        date = pd.Timestamp(row['date'])
+        amount = self.db.convert_amounts(
+            pd.Series([float(row['amount'])]), pd.Series([date]), pd.Series([row['currency']])
+        ).iloc[0]
+        self._add(state['months'], (date.strftime('%Y-%m'), row['type']), sign * amount, sign)
+        self._add(state['categories'], (row['type'], row['category']), sign * amount, sign)
+        state['types'][row['type']] += sign * amount
+        if row['category'] not in state['styles'].index:
+            # Categoria criada depois da carga: atualiza cores e ícones
+            state['styles'] = self.db.get_category_styles()
+    
+    def _patch_recent(self, event):
+        state = self._state
+        recent = state['recent']
+        if event['before'] is not None:
+            recent = recent[recent['id'] != event['before']['id']]
+        
+        after = event['after']
+        capacity = self.recent_size + RECENT_SLACK
+        if after is not None:
+            row = pd.DataFrame([after]).reindex(columns=recent.columns)
+            row['date'] = pd.to_datetime(row['date'])
+            if len(recent) < capacity or row['date'].iloc[0] >= recent['date'].min():
+                recent = pd.concat([recent, row], ignore_index=True) if not recent.empty else row
+                recent = recent.sort_values(['date', 'id'], ascending=False).head(capacity)
+        
+        if len(recent) < self.recent_size and event['action'] != 'insert':
+            # Exclusões esgotaram a folga: busca de novo as últimas transações
+            recent = self.db.get_transactions(limit=capacity)
+        state['recent'] = recent.reset_index(drop=True)
+    
+    # Leituras (mesmo formato dos métodos do DatabaseManager)
+    def get_financial_summary(self):
+        types = self.refresh()._state['types']
+        return build_financial_summary(types['income'], types['expense'])
+    
+    def get_monthly_summary(self):
+        months = self.refresh()._state['months']
+        if not months:
+            return pd.DataFrame()
+        rows = pd.DataFrame(
+            [(month, type, total) for (month, type), (total, count) in months.items()],
+            columns=['month', 'type', 'amount']
+        )
+        return build_monthly_summary(rows.groupby(['month', 'type'])['amount'].sum().unstack(fill_value=0))
+    
+    def get_category_analysis(self, type='expense'):
+        state = self.refresh()._state
+        totals = [
+            (category, total, count)
+            for (row_type, category), (total, count) in state['categories'].items()
+            if row_type == type
+        ]
+        if not totals:
+            return pd.DataFrame()
+        frame = pd.DataFrame(totals, columns=['category', 'total_amount', 'transaction_count']).set_index('category')
+        return build_category_frame(frame, state['styles'])
+    
+    def get_transactions(self, limit=None):
+        recent = self.refresh()._state['recent']
+        return recent.head(min(limit or self.recent_size, self.recent_size)).copy()
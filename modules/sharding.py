@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+from datetime import datetime
+
+# Diretório dos bancos por usuário e arquivo que liga o modo (criado pela migração)
+SHARD_DIR = 'users'
+SHARDS_FILE = 'shards.json'
+
+def shard_dir(db_path='data/finance.db'):
+    return os.path.join(os.path.dirname(db_path) or '.', SHARD_DIR)
+
+def load_shard_config(db_path='data/finance.db'):
+    """Configuração do modo por usuário, ou None se o banco ainda não foi dividido"""
+    path = os.path.join(shard_dir(db_path), SHARDS_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def sharding_enabled(db_path='data/finance.db'):
+    return load_shard_config(db_path) is not None
+
+def user_file_name(username):
+    """Nome de arquivo do usuário: nome seguro + hash, para nomes diferentes nunca colidirem"""
+    safe_name = re.sub(r'[^\w.-]', '_', username).lstrip('.') or '_'
+    digest = hashlib.sha256(username.encode()).hexdigest()[:8]
+    return f'{safe_name}-{digest}'
+
+def shard_path(username, db_path='data/finance.db'):
+    """Arquivo do banco do usuário"""
+    return os.path.join(shard_dir(db_path), f'{user_file_name(username)}.db')
+
+def user_database_path(username, db_path='data/finance.db'):
+    """Banco com o livro-caixa visível para o usuário.
+    
+    Sem divisão, todas as contas compartilham db_path; depois da migração, cada
+    conta tem seu próprio arquivo (e sua própria trava de escrita).
+    """
+    if username is None or not sharding_enabled(db_path):
+        return db_path
+    return shard_path(username, db_path)
+
+def ensure_user_database(username, db_path='data/finance.db'):
+    """Como user_database_path, criando o banco do usuário (esquema e categorias padrão) se ainda não existir.
+    
+    Contas cadastradas depois da migração só ganham arquivo no primeiro acesso;
+    leitores somente leitura (extratos, backups) passam por aqui antes de abrir.
+    """
+    path = user_database_path(username, db_path)
+    if not os.path.exists(path):
+        from database import DatabaseManager
+        DatabaseManager(path).close()
+    return path
+
+def shard_files(db_path='data/finance.db'):
+    """Arquivos de banco por usuário existentes, em ordem de nome"""
+    directory = shard_dir(db_path)
+    if not sharding_enabled(db_path):
+        return []
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.endswith('.db')
+    )
+
+class ShardMigration:
+    """Divide o banco único em um arquivo por usuário.
+    
+    O livro-caixa atual (transações, categorias, cotações, estatísticas) vai
+    para o banco do dono indicado; as demais contas começam com um banco novo.
+    Usuários e senhas continuam no banco principal, que não é alterado: apagar
+    o shards.json volta ao modo de arquivo único.
+    """
+    
+    def __init__(self, db_path='data/finance.db', owner='admin'):
+        self.db_path = db_path
+        self.owner = owner
+    
+    def get_usernames(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return [row[0] for row in conn.execute('SELECT username FROM users ORDER BY username')]
+        finally:
+            conn.close()
+    
+    def _copy_ledger(self, target_path):
+        """Cópia online do banco principal (API de backup), sem a tabela de usuários"""
+        source = sqlite3.connect(self.db_path)
+        target = sqlite3.connect(target_path)
+        try:
+            source.backup(target)
+            target.execute('DROP TABLE IF EXISTS users')
+            target.commit()
+            target.execute('VACUUM')
+        finally:
+            source.close()
+            target.close()
+    
+    def run(self, progress=print):
+        from database import DatabaseManager
+        
+        if sharding_enabled(self.db_path):
+            raise ValueError(f"O banco já foi dividido ({shard_dir(self.db_path)})")
+        usernames = self.get_usernames()
+        if self.owner not in usernames:
+            raise ValueError(f"Usuário dono do livro-caixa não encontrado: {self.owner}")
+        
+        os.makedirs(shard_dir(self.db_path), exist_ok=True)
+        for username in usernames:
+            path = shard_path(username, self.db_path)
+            if os.path.exists(path):
+                progress(f"↪️ {username}: {path} já existe, mantido")
+                continue
+            if username == self.owner:
+                self._copy_ledger(path)
+            # Completa o esquema (ou cria um banco novo com as categorias padrão)
+            DatabaseManager(path).close()
+            progress(f"✅ {username}: {path}")
+        
+        config = {
+            'version': 1,
+            'owner': self.owner,
+            'users': len(usernames),
+            'migrated_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        with open(os.path.join(shard_dir(self.db_path), SHARDS_FILE), 'w', encoding='utf-8') as f:
+            json.dump(config, f, indent=2, ensure_ascii=False)
+        return config
\ No newline at end of file
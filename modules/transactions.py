@@ -1,6 +1,9 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime, date
+from modules.anomalies import DEFAULT_THRESHOLD
+from utils.helpers import DEFAULT_CURRENCY, format_currency
+from utils.formatting import format_currency_column, format_date_column
 
 class TransactionManager:
     def __init__(self, db_manager):
@@ -15,12 +18,14 @@ class TransactionManager:
         default_category = edit_transaction['category'] if edit_transaction else ""
         default_description = edit_transaction['description'] if edit_transaction else ""
         default_date = edit_transaction['date'] if edit_transaction else date.today()
+        default_currency = edit_transaction.get('currency', DEFAULT_CURRENCY) if edit_transaction else DEFAULT_CURRENCY
+        default_tags = edit_transaction.get('tags', '') if edit_transaction else ""
         
         col1, col2 = st.columns(2)
         
         with col1:
             amount = st.number_input(
-                "Valor (R$)", 
+                "Valor", 
                 min_value=0.01, 
                 step=0.01,
                 format="%.2f",
@@ -44,6 +49,16 @@ class TransactionManager:
             )
         
         with col2:
+            currencies = self.db.get_currencies()
+            if default_currency not in currencies:
+                currencies.append(default_currency)
+            currency = st.selectbox(
+                "Moeda",
+                currencies,
+                index=currencies.index(default_currency),
+                key="currency_input"
+            )
+            
             # Obter categorias baseadas no tipo
             categories_df = self.db.get_categories(type=transaction_type)
             
@@ -71,6 +86,14 @@ class TransactionManager:
                 placeholder="Ex: Salário mensal, Conta de luz...",
                 key="description_input"
             )
+            
+            tags = st.text_input(
+                "🏷️ Tags",
+                value=default_tags,
+                placeholder="Ex: viagem-2026, reembolsável, empresa",
+                help="Separe as tags por vírgula",
+                key="tags_input"
+            )
         
         # Botões de ação
         col1, col2 = st.columns(2)
@@ -86,7 +109,9 @@ class TransactionManager:
                                 transaction_type, 
                                 selected_category, 
                                 description, 
-                                transaction_date
+                                transaction_date,
+                                currency,
+                                tags
                             ):
                                 st.success("✅ Transação atualizada com sucesso!")
                                 st.rerun()
@@ -105,7 +130,9 @@ class TransactionManager:
                                 transaction_type, 
                                 selected_category, 
                                 description, 
-                                transaction_date
+                                transaction_date,
+                                currency,
+                                tags
                             )
                             st.success("✅ Transação adicionada com sucesso!")
                             st.rerun()
@@ -118,18 +145,10 @@ class TransactionManager:
             if st.button("🗑️ Cancelar", use_container_width=True):
                 st.rerun()
     
-    def update_transaction(self, transaction_id, amount, type, category, description, date):
+    def update_transaction(self, transaction_id, amount, type, category, description, date, currency=None, tags=None):
         """Atualiza uma transação existente"""
         try:
-            conn = self.db.conn
-            cursor = conn.cursor()
-            cursor.execute('''
-                UPDATE transactions 
-                SET amount = ?, type = ?, category = ?, description = ?, date = ?
-                WHERE id = ?
-            ''', (amount, type, category, description, date, transaction_id))
-            conn.commit()
-            return cursor.rowcount > 0
+            return self.db.update_transaction(transaction_id, amount, type, category, description, date, currency, tags)
         except Exception as e:
             st.error(f"Erro ao atualizar: {e}")
             return False
@@ -159,6 +178,21 @@ class TransactionManager:
         with col4:
             filter_end_date = st.date_input("Data Final", key="end_date")
         
+        tag_options = self.db.get_tags()['name'].tolist()
+        filter_tags, filter_tag_mode = [], 'all'
+        if tag_options:
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                filter_tags = st.multiselect("🏷️ Tags", tag_options, key="filter_tags")
+            with col2:
+                filter_tag_mode = st.radio(
+                    "Combinar tags",
+                    ["all", "any"],
+                    format_func=lambda x: "Todas (E)" if x == "all" else "Qualquer (OU)",
+                    horizontal=True,
+                    key="filter_tag_mode"
+                )
+        
         # Aplicar filtros
         filters = {}
         if filter_type != "Todos":
@@ -169,30 +203,42 @@ class TransactionManager:
             filters['start_date'] = filter_start_date
         if filter_end_date:
             filters['end_date'] = filter_end_date
+        if filter_tags:
+            filters['tags'] = filter_tags
+            filters['tag_mode'] = filter_tag_mode
         
         # Obter transações
-        transactions = self.db.get_transactions(filters=filters)
+        transactions = self.db.get_transactions(filters=filters, with_tags=True)
         
         if not transactions.empty:
-            # Mostrar estatísticas
-            total_income = transactions[transactions['type'] == 'income']['amount'].sum()
-            total_expense = transactions[transactions['type'] == 'expense']['amount'].sum()
+            # Mostrar estatísticas (convertidas para a moeda dos relatórios)
+            converted = self.db.convert_amounts(transactions['amount'], transactions['date'], transactions['currency'])
+            total_income = converted[transactions['type'] == 'income'].sum()
+            total_expense = converted[transactions['type'] == 'expense'].sum()
             balance = total_income - total_expense
             
+            currency = self.db.reporting_currency
             col1, col2, col3 = st.columns(3)
-            col1.metric("📈 Total Receitas", f"R$ {total_income:,.2f}")
-            col2.metric("📉 Total Despesas", f"R$ {total_expense:,.2f}")
-            col3.metric("💰 Saldo", f"R$ {balance:,.2f}")
+            col1.metric("📈 Total Receitas", format_currency(total_income, currency))
+            col2.metric("📉 Total Despesas", format_currency(total_expense, currency))
+            col3.metric("💰 Saldo", format_currency(balance, currency))
             
             st.markdown("---")
             
+            # Textos formatados em lote; o laço só monta os widgets de cada linha
+            date_display = format_date_column(transactions['date'])
+            amount_display = format_currency_column(transactions['amount'], transactions['currency'])
+            flagged = (transactions['type'] == 'expense') & (transactions['anomaly_score'] >= DEFAULT_THRESHOLD)
+            
             # Tabela de transações com ações
-            for idx, row in transactions.iterrows():
+            for row, row_date, row_amount, row_flagged in zip(
+                transactions.to_dict('records'), date_display, amount_display, flagged
+            ):
                 with st.container():
                     col1, col2, col3, col4, col5, col6 = st.columns([2, 1, 2, 2, 3, 2])
                     
                     with col1:
-                        st.write(f"**{row['date'].strftime('%d/%m/%Y')}**")
+                        st.write(f"**{row_date}**")
                     
                     with col2:
                         if row['type'] == 'income':
@@ -204,10 +250,15 @@ class TransactionManager:
                         st.write(f"{row['icon']} {row['category']}")
                     
                     with col4:
-                        st.write(f"**R$ {row['amount']:,.2f}**")
+                        if row_flagged:
+                            st.write(f"**{row_amount}** ⚠️ _fora do padrão_")
+                        else:
+                            st.write(f"**{row_amount}**")
                     
                     with col5:
                         st.write(row['description'] or "-")
+                        if row['tags']:
+                            st.caption(f"🏷️ {row['tags']}")
                     
                     with col6:
                         subcol1, subcol2 = st.columns(2)
@@ -219,7 +270,9 @@ class TransactionManager:
                                     'type': row['type'],
                                     'category': row['category'],
                                     'description': row['description'],
-                                    'date': row['date']
+                                    'date': row['date'],
+                                    'currency': row['currency'],
+                                    'tags': row['tags']
                                 }
                                 st.rerun()
                         
@@ -233,7 +286,7 @@ class TransactionManager:
             
             # Exportar dados
             st.markdown("---")
-            csv = transactions[['date', 'type', 'category', 'amount', 'description']].to_csv(index=False)
+            csv = transactions[['date', 'type', 'category', 'amount', 'currency', 'description', 'tags']].to_csv(index=False)
             st.download_button(
                 "📥 Exportar CSV", 
                 data=csv, 
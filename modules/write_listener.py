@@ -0,0 +1,65 @@
+import os
+
+class WriteListenerModel:
+    """Base dos modelos em memória mantidos em dia pelas escritas do DatabaseManager.
+    
+    O modelo guarda a chave do estado carregado (revisões do livro e das
+    cotações, moeda de relatório e arquivo). Cada escrita confirmada chega como
+    evento com as linhas antes/depois e a revisão que ela gerou: se a revisão
+    for exatamente a seguinte à do modelo, _apply_event aplica o efeito da
+    escrita; caso contrário (outra sessão escreveu, importação em lote, troca
+    de moeda ou de cotações) o modelo é recarregado na próxima leitura.
+    
+    Subclasses implementam _load (carga completa) e _apply_event.
+    """
+    
+    def __init__(self, db_manager):
+        self.db = db_manager
+        self._key = None
+        self.reloads = 0
+        self.deltas = 0
+    
+    def attach(self, db_manager):
+        """Associa o modelo ao DatabaseManager da execução atual do script"""
+        if self.db is not db_manager:
+            self.db.remove_write_listener(self.apply_write)
+        self.db = db_manager
+        db_manager.remove_write_listener(self.apply_write)
+        db_manager.add_write_listener(self.apply_write)
+        return self
+    
+    def _state_key(self):
+        return self.db.get_revisions() + (self.db.reporting_currency, os.path.abspath(self.db.db_path))
+    
+    def refresh(self):
+        """Recarrega só se o banco mudou por fora dos deltas já aplicados"""
+        if self._key != self._state_key():
+            self.reload()
+        return self
+    
+    def reload(self):
+        # Chave lida antes da carga: uma escrita no meio dela força outra recarga
+        key = self._state_key()
+        self._load()
+        self._key = key
+        self.reloads += 1
+    
+    def apply_write(self, event):
+        if self._key is None:
+            return
+        ledger_revision, fx_revision, currency, path = self._key
+        if event['revision'] != ledger_revision + 1:
+            # Alguma escrita ficou de fora: recarrega na próxima leitura
+            self._key = None
+            return
+        
+        self._apply_event(event)
+        self._key = (event['revision'], fx_revision, currency, path)
+        self.deltas += 1
+    
+    def _load(self):
+        raise NotImplementedError
+    
+    def _apply_event(self, event):
+        raise NotImplementedError
+
@@ -0,0 +1,14 @@
+import pandas as pd
+from modules.anomalies import rolling_scores
+
+def test_old_spending_leaves_the_window():
+    # Gastos altos há dois anos não escondem o salto atual
+    dates = pd.to_datetime(['2024-01-10'] * 6 + ['2026-01-10', '2026-02-10', '2026-03-10',
+                                                 '2026-04-10', '2026-05-10', '2026-06-10'])
+    values = [500] * 6 + [50, 52, 48, 51, 49, 200]
+    scores = rolling_scores([0] * 12, dates, values)
+    assert pd.isna(scores[:5]).all()
+    assert scores[-1] > 3
+
+    # Com a janela cobrindo tudo, o mesmo valor parece normal
+    assert rolling_scores([0] * 12, dates, values, window_months=36)[-1] < 0
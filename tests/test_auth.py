@@ -0,0 +1,61 @@
+import time
+from auth import AuthManager
+
+def make_auth(tmp_path, **kwargs):
+    # Custo baixo: o teste confere o formato, não a resistência do hash
+    return AuthManager(str(tmp_path / 'finance.db'), iterations=1000, **kwargs)
+
+def test_token_roundtrip_and_expiry(tmp_path, monkeypatch):
+    auth = make_auth(tmp_path, session_ttl=60)
+    token = auth.issue_token('admin')
+    assert auth.verify_token(token) == 'admin'
+
+    payload, signature = token.split('.')
+    assert auth.verify_token(f"{payload}.{signature[:-2]}xx") is None
+    assert auth.verify_token('lixo') is None
+
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 61)
+    assert auth.verify_token(token) is None
+
+def test_revoking_one_token_keeps_other_sessions(tmp_path):
+    auth = make_auth(tmp_path)
+    laptop, phone = auth.issue_token('admin'), auth.issue_token('admin')
+    auth.revoke_token(laptop)
+    assert auth.verify_token(laptop) is None
+    assert auth.verify_token(phone) == 'admin'
+
+    # A revogação vale depois de reiniciar o processo
+    assert make_auth(tmp_path).verify_token(laptop) is None
+
+    auth.revoke_sessions('admin')
+    assert auth.verify_token(phone) is None
+    assert auth.verify_token(auth.issue_token('admin')) == 'admin'
+
+def test_verify_token_stays_in_memory(tmp_path):
+    auth = make_auth(tmp_path)
+    token = auth.issue_token('admin')
+    statements = []
+    auth.conn.set_trace_callback(statements.append)
+    for _ in range(3):
+        assert auth.verify_token(token) == 'admin'
+    assert statements == []
+
+def test_malformed_password_hash(tmp_path):
+    auth = make_auth(tmp_path)
+    for password_hash in ['pbkdf2_sha256$abc', 'pbkdf2_sha256$x$zz$00', 'pbkdf2_sha256$1000$0g$00']:
+        assert auth.check_password('1234', password_hash) is False
+    assert auth.verify_user('admin', '1234')
+    assert not auth.verify_user('admin', '4321')
+
+def test_session_only_login_without_cookie_support(tmp_path, monkeypatch):
+    import auth as auth_module
+    import streamlit as st
+    monkeypatch.setattr(auth_module, 'COOKIES_SUPPORTED', False)
+    monkeypatch.setattr(st, 'html', lambda *args, **kwargs: (_ for _ in ()).throw(AssertionError('st.html')))
+    auth = make_auth(tmp_path)
+
+    st.session_state.clear()
+    st.session_state.pending_session_cookie = auth.issue_token('admin')
+    assert auth.restore_session() is False
+    assert 'pending_session_cookie' not in st.session_state
@@ -0,0 +1,50 @@
+import pandas as pd
+from database import DatabaseManager
+from utils.helpers import transaction_fingerprints
+
+def statement(*rows):
+    return pd.DataFrame(rows, columns=['date', 'type', 'category', 'amount', 'description'])
+
+def test_repeated_rows_numbered_per_file():
+    rows = statement(('2026-01-02', 'expense', 'Alimentação', 10, 'Café'),
+                     ('2026-01-02', 'expense', 'Alimentação', 10, 'café!'))
+    first, second = transaction_fingerprints(rows)
+    assert first != second
+
+    # O mesmo lançamento em dois extratos sobrepostos tem a mesma impressão
+    both = pd.concat([rows.iloc[:1].assign(source='a.csv'), rows.iloc[:1].assign(source='b.csv')])
+    assert len(set(transaction_fingerprints(both))) == 1
+
+def test_import_dedupes_across_files(tmp_path):
+    db = DatabaseManager(str(tmp_path / 'finance.db'))
+    a = statement(('2026-01-02', 'expense', 'Alimentação', 10, 'Café'),
+                  ('2026-01-02', 'expense', 'Alimentação', 10, 'Café'),
+                  ('2026-01-03', 'expense', 'Transporte', 5, 'Ônibus')).assign(source='a.csv')
+    b = statement(('2026-01-02', 'expense', 'Alimentação', 10, 'Café'),
+                  ('2026-01-03', 'expense', 'Transporte', 5, 'Ônibus'),
+                  ('2026-01-04', 'expense', 'Lazer', 50, 'Cinema')).assign(source='b.csv')
+
+    result = db.add_transactions_bulk(pd.concat([a, b], ignore_index=True))
+    assert (result['inserted'], result['duplicates']) == (4, 2)
+    assert db.add_transactions_bulk(b)['inserted'] == 0
+    db.close()
+
+def test_import_dedupes_against_manual_and_legacy_rows(tmp_path):
+    path = str(tmp_path / 'finance.db')
+    db = DatabaseManager(path)
+    db.add_transaction(10, 'expense', 'Alimentação', 'Café', '2026-01-02')
+    db.add_transaction(10, 'expense', 'Alimentação', 'Café', '2026-01-02')
+    db.add_transaction(5, 'expense', 'Transporte', 'Ônibus', '2026-01-03')
+    # Linha gravada antes da deduplicação existir
+    db.conn.execute("UPDATE transactions SET fingerprint = NULL WHERE description = 'Ônibus'")
+    db.conn.commit()
+    db.close()
+
+    db = DatabaseManager(path)
+    assert db.conn.execute('SELECT COUNT(*) FROM transactions WHERE fingerprint IS NULL').fetchone()[0] == 0
+    rows = statement(('2026-01-02', 'expense', 'Alimentação', 10, 'Café'),
+                     ('2026-01-02', 'expense', 'Alimentação', 10, 'Café'),
+                     ('2026-01-03', 'expense', 'Transporte', 5, 'Ônibus'),
+                     ('2026-01-04', 'expense', 'Lazer', 50, 'Cinema'))
+    assert db.add_transactions_bulk(rows)['inserted'] == 1
+    db.close()
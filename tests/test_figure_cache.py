@@ -0,0 +1,34 @@
+import json
+import pandas as pd
+import plotly.graph_objects as go
+from modules.analytics import FigureCache, FinancialAnalytics
+
+def spec(figure):
+    return json.loads(figure.to_json())
+
+class Database:
+    reporting_currency = 'BRL'
+
+def monthly():
+    return pd.DataFrame({
+        'month': ['2026-01', '2026-02', '2026-03'],
+        'income': [1000.0, 1200.0, 900.0],
+        'expense': [800.0, 700.0, 950.0],
+        'balance': [200.0, 500.0, -50.0],
+        'savings_rate': [20.0, 41.7, -5.6],
+    })
+
+def test_changing_a_returned_figure_does_not_change_the_cache():
+    cache = FigureCache()
+    analytics = FinancialAnalytics(Database(), cache=cache)
+    original = spec(analytics.create_monthly_trend_chart(monthly()))
+
+    for _ in range(2):
+        figure = analytics.create_monthly_trend_chart(monthly())
+        assert spec(figure) == original
+        figure.update_layout(title='Alterado', xaxis_title='x')
+        figure.add_trace(go.Bar(x=['2026-01'], y=[1]))
+        figure.data[0].name = 'alterado'
+
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert spec(analytics.create_monthly_trend_chart(monthly())) == original
@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+from modules.forecast import CashFlowForecaster
+
+def test_seasonality_uses_the_trend_window():
+    # Histórico plano até 2023 e crescendo depois: a reta só vale para os últimos 24 meses
+    all_months = pd.period_range('2020-01', '2025-12', freq='M')
+    t = np.arange(len(all_months))
+    december = np.where(all_months.month == 12, 120.0, 0.0)
+    values = (np.where(all_months.year < 2024, 1000.0, 1000.0 + 20 * (t - 47)) + december)[None, :]
+    
+    forecaster = CashFlowForecaster(db_manager=None)
+    level, slope = forecaster._trend(values)
+    seasonal = forecaster._seasonality(values, all_months, level, slope)
+    
+    # Sem o viés dos anos fora da janela, o índice é só o pico de dezembro
+    # menos a inclinação que ele mesmo induz na reta
+    window = values[:, -24:]
+    expected = np.zeros(12)
+    residuals = window[0] - (level[0] + slope[0] * (np.arange(24) - 23))
+    for month in range(12):
+        expected[month] = residuals[month::12].mean()
+    np.testing.assert_allclose(seasonal[0], expected - expected.mean())
+    assert seasonal[0].argmax() == 11
+    assert abs(seasonal[0][:11]).max() < 25
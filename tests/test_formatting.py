@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+from utils.formatting import format_currency_column, format_date_column, format_percentage_column
+from utils.helpers import format_currency, format_percentage
+
+def test_currency_column_pt_br():
+    values = pd.Series([1234.5, -3, 0.004, None])
+    assert format_currency_column(values).tolist() == ['R$ 1.234,50', '-R$ 3,00', 'R$ 0,00', '']
+
+def test_currency_column_per_row_currency():
+    values = pd.Series([10.0, 1000000.0], index=[7, 8])
+    currencies = pd.Series(['USD', 'XYZ'])
+    result = format_currency_column(values, currencies)
+    assert result.tolist() == ['US$ 10,00', 'XYZ 1.000.000,00']
+    assert result.index.tolist() == [7, 8]
+
+def test_empty_columns():
+    # Histórico ou dashboard sem transações
+    empty = pd.Series([], dtype=float)
+    assert format_currency_column(empty, pd.Series([], dtype=str)).empty
+    assert format_currency_column(empty).empty
+    assert format_percentage_column(empty).empty
+    assert format_date_column(pd.Series([], dtype='datetime64[ns]')).empty
+
+def test_percentage_column():
+    assert format_percentage_column(pd.Series([12.54, -0.04, -7.26])).tolist() == ['12,5%', '0,0%', '-7,3%']
+
+def test_column_matches_scalar_formatting():
+    # Valores com meio centavo (.xx5) arredondam igual nos dois caminhos
+    values = pd.Series([0.005, -0.005, 0.015, 0.025, 2.675, 47188.785, -47188.785, 1e9 + 0.005, -0.004])
+    rng = np.random.default_rng(0)
+    values = pd.concat([values, pd.Series(rng.uniform(-1e5, 1e5, 20000).round(3))], ignore_index=True)
+    assert format_currency_column(values).tolist() == [format_currency(value) for value in values]
+    assert format_currency_column(values).iloc[:2].tolist() == ['R$ 0,01', '-R$ 0,01']
+
+    percentages = pd.Series(rng.uniform(-100, 100, 20000).round(2))
+    assert format_percentage_column(percentages).tolist() == [format_percentage(value) for value in percentages]
@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+from database import DatabaseManager
+
+RATES = pd.DataFrame({
+    'date': ['2026-01-10', '2026-02-01', '2026-01-15'],
+    'currency': ['USD', 'USD', 'EUR'],
+    'rate': [5.0, 5.5, 6.0],
+})
+
+@pytest.fixture
+def path(tmp_path):
+    path = str(tmp_path / 'finance.db')
+    db = DatabaseManager(path)
+    db.save_fx_rates(RATES)
+    db.add_transaction(1000, 'income', 'Salário', 'salário', '2026-01-05')
+    # Antes da primeira cotação do dólar: usa a primeira (5,0)
+    db.add_transaction(100, 'income', 'Extra', 'freela', '2026-01-02', currency='USD')
+    db.add_transaction(20, 'expense', 'Lazer', 'app', '2026-01-20', currency='USD')
+    db.add_transaction(30, 'expense', 'Lazer', 'app', '2026-02-03', currency='USD')
+    db.add_transaction(10, 'expense', 'Alimentação', 'café', '2026-01-16', currency='EUR')
+    db.add_transaction(45, 'expense', 'Alimentação', 'mercado', '2026-02-10')
+    db.close()
+    return path
+
+def sql_totals(db, dimension):
+    # Caminho SQL: FX_RATE_SQL dentro do GROUP BY da tabela dinâmica
+    return db.get_pivot([dimension]).set_index(dimension)['sum']
+
+def pandas_totals(db, dimension):
+    # Caminho pandas: somas no SQLite convertidas com merge_asof
+    df = db._converted_rollup([dimension])
+    return df.groupby(dimension)['amount'].sum().round(2)
+
+@pytest.mark.parametrize('currency', ['BRL', 'USD'])
+@pytest.mark.parametrize('dimension', ['type', 'category'])
+def test_sql_and_pandas_conversion_agree(path, currency, dimension):
+    db = DatabaseManager(path, reporting_currency=currency)
+    pd.testing.assert_series_equal(
+        sql_totals(db, dimension), pandas_totals(db, dimension), check_names=False, check_index_type=False
+    )
+    db.close()
+
+def test_base_currency_totals(path):
+    db = DatabaseManager(path)
+    summary = db.get_financial_summary()
+    assert summary['total_income'] == pytest.approx(1000 + 100 * 5.0)
+    assert summary['total_expense'] == pytest.approx(20 * 5.0 + 30 * 5.5 + 10 * 6.0 + 45)
+
+    # Escore e estatísticas de anomalia usam a mesma regra (_base_rate)
+    cursor = db.conn.cursor()
+    assert db._base_rate(cursor, 'USD', '2026-01-02') == 5.0
+    assert db._base_rate(cursor, 'USD', '2026-02-03') == 5.5
+    assert db._base_rate(cursor, 'BRL', '2026-02-03') == 1.0
+    db.close()
+
+def test_new_rate_invalidates_cache(path):
+    db = DatabaseManager(path)
+    monthly = db.get_monthly_summary()
+    pivot = db.get_pivot(['month'])
+    assert db.get_monthly_summary().equals(monthly)
+
+    db.save_fx_rates(pd.DataFrame({'date': ['2026-02-01'], 'currency': ['USD'], 'rate': [6.5]}))
+    february = db.get_monthly_summary().set_index('month').loc['2026-02', 'expense']
+    assert february == pytest.approx(30 * 6.5 + 45)
+    assert db.get_pivot(['month']).set_index('month').loc['2026-02', 'sum'] == pytest.approx(february)
+    assert not db.get_pivot(['month']).equals(pivot)
+    db.close()
@@ -0,0 +1,41 @@
+import threading
+import time
+from database import DatabaseManager
+from modules.maintenance import DatabaseMaintenance
+
+def test_maintenance_waits_for_other_sessions_writes(tmp_path):
+    path = str(tmp_path / 'user.db')
+    session = DatabaseManager(path, pooled=True)
+    maintenance = DatabaseMaintenance(DatabaseManager(path, pooled=True))
+    written, release = threading.Event(), threading.Event()
+
+    def half_finished_write():
+        try:
+            with session._write_transaction() as cursor:
+                cursor.execute("INSERT INTO meta (key, value) VALUES ('rascunho', 1)")
+                written.set()
+                release.wait()
+                raise RuntimeError('escrita desfeita')
+        except RuntimeError:
+            pass
+
+    writer = threading.Thread(target=half_finished_write)
+    writer.start()
+    written.wait()
+    tasks = [
+        threading.Thread(target=maintenance.optimize, kwargs={'full': True}),
+        threading.Thread(target=maintenance.incremental_vacuum),
+    ]
+    for task in tasks:
+        task.start()
+    time.sleep(0.1)
+    # Na conexão compartilhada, o commit da manutenção confirmaria a escrita da outra sessão
+    assert all(task.is_alive() for task in tasks)
+    release.set()
+    for thread in [writer] + tasks:
+        thread.join()
+
+    assert session.conn.execute("SELECT COUNT(*) FROM meta WHERE key = 'rascunho'").fetchone()[0] == 0
+    assert maintenance.last_run('optimize') is not None
+    session.close()
+    maintenance.db.close()
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+from database import DatabaseManager
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager(str(tmp_path / 'finance.db'))
+    rng = np.random.default_rng(7)
+    categories = ['Alimentação', 'Transporte', 'Lazer']
+    for i in range(120):
+        day = pd.Timestamp('2026-01-01') + pd.Timedelta(days=int(rng.integers(0, 90)))
+        db.add_transaction(
+            round(float(rng.uniform(1, 500)), 2), 'expense', categories[i % 3], f'gasto {i}',
+            day.strftime('%Y-%m-%d'), tags=['viagem'] if i % 4 == 0 else None
+        )
+    # Grupo de tamanho par e grupo de um elemento só
+    db.add_transaction(10, 'income', 'Salário', 'a', '2026-05-01')
+    db.add_transaction(30, 'income', 'Salário', 'b', '2026-05-02')
+    db.add_transaction(7, 'income', 'Extra', 'c', '2026-05-03')
+    yield db
+    db.close()
+
+def expected(df, dimensions):
+    return (df.groupby(dimensions)['amount'].agg(['median', 'sum', 'count'])
+            .round(2).reset_index().sort_values(dimensions).reset_index(drop=True))
+
+@pytest.mark.parametrize('dimensions', [['type'], ['month', 'category'], ['type', 'category']])
+def test_median_matches_pandas(db, dimensions):
+    transactions = db.get_transactions()
+    transactions['month'] = transactions['date'].dt.strftime('%Y-%m')
+    
+    result = db.get_pivot(dimensions, measures=('median', 'sum', 'count'))
+    pd.testing.assert_frame_equal(
+        result[dimensions + ['median', 'sum', 'count']], expected(transactions, dimensions),
+        check_dtype=False
+    )
+
+def test_median_by_tag(db):
+    transactions = db.get_transactions(filters={'tags': ['viagem']})
+    result = db.get_pivot(['tag'], measures=('median',))
+    assert result['tag'].tolist() == ['viagem']
+    assert result['median'].iloc[0] == pytest.approx(round(transactions['amount'].median(), 2))
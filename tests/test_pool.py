@@ -0,0 +1,34 @@
+import sqlite3
+import threading
+import database
+from database import CONNECTION_CACHE_SIZE, DatabaseManager
+
+def test_connection_reused_across_threads(tmp_path):
+    path = str(tmp_path / 'user.db')
+    first = DatabaseManager(path, pooled=True)
+    seen = []
+    # Cada execução do Streamlit roda em uma thread nova
+    thread = threading.Thread(target=lambda: seen.append(DatabaseManager(path, pooled=True).conn))
+    thread.start()
+    thread.join()
+    assert seen == [first.conn]
+    first.close()
+
+def test_evicted_connections_are_closed(tmp_path):
+    held = DatabaseManager(str(tmp_path / 'held.db'), pooled=True)
+    released = []
+    for i in range(CONNECTION_CACHE_SIZE + 1):
+        db = DatabaseManager(str(tmp_path / f'{i}.db'), pooled=True)
+        released.append(db.conn)
+        db.close()
+    assert len(database._connection_cache) == CONNECTION_CACHE_SIZE
+
+    # A conexão ainda em uso só fecha quando o gerenciador a devolve
+    assert held.conn.execute('SELECT COUNT(*) FROM categories').fetchone()[0] > 0
+    held.close()
+    for conn in [held.conn, released[0]]:
+        try:
+            conn.execute('SELECT 1')
+        except sqlite3.ProgrammingError:
+            continue
+        raise AssertionError('conexão removida do cache continua aberta')
@@ -0,0 +1,17 @@
+from datetime import date, timedelta
+from database import DatabaseManager
+
+def test_resume_skips_the_paused_period(tmp_path):
+    db = DatabaseManager(str(tmp_path / 'finance.db'))
+    start = date.today() - timedelta(days=60)
+    rule_id = db.add_recurring_rule(10, 'expense', 'Lazer', 'streaming', 'daily', start)
+    assert db.materialize_recurring(until=start + timedelta(days=9))['inserted'] == 10
+
+    db.set_recurring_rule_active(rule_id, False)
+    assert db.materialize_recurring()['inserted'] == 0
+
+    # Retomada hoje: só a ocorrência de hoje é lançada, nada do período pausado
+    db.set_recurring_rule_active(rule_id, True)
+    assert db.materialize_recurring()['inserted'] == 1
+    assert db.get_transactions()['date'].min().date() == start
+    db.close()
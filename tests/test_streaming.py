@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+from database import DatabaseManager
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager(str(tmp_path / 'finance.db'))
+    db.save_fx_rates(pd.DataFrame({'date': ['2025-11-01', '2026-01-01'], 'currency': ['USD'] * 2, 'rate': [5.0, 5.4]}))
+    rng = np.random.default_rng(3)
+    categories = {'income': ['Salário', 'Freelance'], 'expense': ['Alimentação', 'Transporte', 'Lazer']}
+    types = np.where(np.arange(300) % 5 == 0, 'income', 'expense')
+    db.add_transactions_bulk(pd.DataFrame({
+        'date': pd.Timestamp('2025-10-01') + pd.to_timedelta(rng.integers(0, 180, 300), unit='D'),
+        'type': types,
+        'category': [categories[type][i % len(categories[type])] for i, type in enumerate(types)],
+        'amount': rng.uniform(5, 900, 300).round(2),
+        'description': [f'lançamento {i}' for i in range(300)],
+        'currency': np.where(np.arange(300) % 7 == 0, 'USD', 'BRL'),
+    }))
+    yield db
+    db.close()
+
+# Blocos pequenos: os parciais de vários blocos precisam ser combinados
+CHUNKSIZE = 16
+
+def test_financial_summary(db):
+    for period in [(None, None), ('2025-12-01', '2026-02-15')]:
+        assert db.stream_financial_summary(*period, chunksize=CHUNKSIZE) == pytest.approx(db.get_financial_summary(*period))
+
+def test_monthly_summary(db):
+    streamed = db.stream_monthly_summary(chunksize=CHUNKSIZE)
+    pd.testing.assert_frame_equal(streamed, db.get_monthly_summary(), check_names=False, check_like=True)
+
+@pytest.mark.parametrize('type', ['income', 'expense'])
+def test_category_analysis(db, type):
+    streamed = db.stream_category_analysis(type, '2025-11-15', None, chunksize=CHUNKSIZE)
+    pd.testing.assert_frame_equal(streamed, db.get_category_analysis(type, '2025-11-15', None))
+
+def test_empty_period(db):
+    assert db.stream_financial_summary('2030-01-01') == db.get_financial_summary('2030-01-01')
+    assert db.stream_category_analysis('expense', '2030-01-01').empty
@@ -0,0 +1,34 @@
+import pytest
+from database import DatabaseManager
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager(str(tmp_path / 'finance.db'))
+    db.add_transaction(100, 'expense', 'Transporte', 'passagem', '2026-01-05', tags='Viagem 2026, empresa')
+    db.add_transaction(40, 'expense', 'Alimentação', 'jantar', '2026-01-06', tags=['viagem-2026'])
+    db.add_transaction(15, 'expense', 'Alimentação', 'almoço', '2026-01-07', tags=['empresa'])
+    db.add_transaction(30, 'expense', 'Lazer', 'cinema', '2026-01-08')
+    yield db
+    db.close()
+
+def descriptions(db, tags, mode):
+    df = db.get_transactions(filters={'tags': tags, 'tag_mode': mode})
+    return sorted(df['description'])
+
+def test_all_requires_every_tag(db):
+    assert descriptions(db, ['viagem-2026', 'empresa'], 'all') == ['passagem']
+    assert descriptions(db, ['Viagem 2026'], 'all') == ['jantar', 'passagem']
+
+def test_any_matches_each_transaction_once(db):
+    assert descriptions(db, 'viagem-2026, empresa', 'any') == ['almoço', 'jantar', 'passagem']
+
+def test_unknown_tag(db):
+    assert descriptions(db, ['viagem-2026', 'inexistente'], 'all') == []
+    assert descriptions(db, ['viagem-2026', 'inexistente'], 'any') == ['jantar', 'passagem']
+
+def test_retagging_changes_the_filter(db):
+    transaction_id = int(db.get_transactions(filters={'tags': ['empresa'], 'tag_mode': 'all'})
+                         .query("description == 'almoço'")['id'].iloc[0])
+    db.set_transaction_tags(transaction_id, ['viagem-2026', 'empresa'])
+    assert descriptions(db, ['viagem-2026', 'empresa'], 'all') == ['almoço', 'passagem']
+    assert descriptions(db, ['viagem-2026'], 'any') == ['almoço', 'jantar', 'passagem']
@@ -0,0 +1,64 @@
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+import pytest
+from utils.helpers import (
+    FUTURE_DATE, INVALID_AMOUNT, INVALID_DATE, INVALID_TYPE, MISSING_CATEGORY, UNKNOWN_CATEGORY,
+    validate_transaction_data, validate_transactions
+)
+
+TODAY = date.today()
+
+def legacy_messages(amount, type, category, date):
+    """Validação linha a linha anterior ao validador vetorizado"""
+    errors = []
+    if amount <= 0:
+        errors.append("Valor deve ser maior que zero")
+    if type not in ['income', 'expense']:
+        errors.append("Tipo deve ser 'income' ou 'expense'")
+    if not category or category.strip() == "":
+        errors.append("Categoria é obrigatória")
+    if date > TODAY:
+        errors.append("Data não pode ser futura")
+    return errors
+
+def test_each_flag():
+    rows = pd.DataFrame([
+        (10, 'expense', 'Lazer', TODAY),
+        (0, 'expense', 'Lazer', TODAY),
+        (10, 'transfer', 'Lazer', TODAY),
+        (10, 'expense', '  ', TODAY),
+        (10, 'expense', 'Inexistente', TODAY),
+        (10, 'expense', 'Lazer', 'não é data'),
+        (10, 'expense', 'Lazer', TODAY + timedelta(days=1)),
+        (-5, 'x', '', TODAY + timedelta(days=3)),
+    ], columns=['amount', 'type', 'category', 'date'])
+    codes = validate_transactions(rows, known_categories=['Lazer'], today=TODAY)
+    assert codes.tolist() == [
+        0, INVALID_AMOUNT, INVALID_TYPE, MISSING_CATEGORY, UNKNOWN_CATEGORY, INVALID_DATE, FUTURE_DATE,
+        INVALID_AMOUNT | INVALID_TYPE | MISSING_CATEGORY | FUTURE_DATE
+    ]
+
+@pytest.mark.parametrize('row', [
+    (10, 'expense', 'Lazer', TODAY),
+    (0, 'expense', 'Lazer', TODAY),
+    (-1.5, 'income', 'Salário', TODAY - timedelta(days=30)),
+    (10, 'transfer', 'Lazer', TODAY),
+    (10, 'expense', '', TODAY),
+    (10, 'expense', '   ', TODAY),
+    (10, 'expense', None, TODAY),
+    (10, 'expense', 'Lazer', TODAY + timedelta(days=1)),
+    (0, 'x', '', TODAY + timedelta(days=400)),
+])
+def test_wrapper_matches_legacy_messages(row):
+    assert validate_transaction_data(*row) == legacy_messages(*row)
+
+def test_missing_values():
+    rows = {'amount': [np.nan, None, 10], 'type': [None, 'income', 'income'],
+            'category': [np.nan, 'Salário', 'Salário'], 'date': [TODAY, None, pd.NaT]}
+    codes = validate_transactions(rows, today=TODAY)
+    assert codes.tolist() == [INVALID_AMOUNT | INVALID_TYPE | MISSING_CATEGORY, INVALID_AMOUNT | INVALID_DATE, INVALID_DATE]
+
+def test_empty_batch():
+    empty = pd.DataFrame(columns=['amount', 'type', 'category', 'date'])
+    assert validate_transactions(empty).empty
@@ -0,0 +1,50 @@
+import pytest
+from database import DatabaseManager
+from modules.ledger_engine import LedgerEngine
+from modules.session_ledger import SessionLedger
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager(str(tmp_path / 'finance.db'))
+    db.add_transaction(100, 'income', 'Salário', 'salário', '2026-01-05')
+    db.add_transaction(30, 'expense', 'Lazer', 'cinema', '2026-01-10')
+    yield db
+    db.close()
+
+def session_ledger(db):
+    model = SessionLedger(db).attach(db)
+    return model, model.get_financial_summary
+
+def ledger_engine(db):
+    # Consultas a partir do início do período quente não caem no SQL
+    model = LedgerEngine(db, start_date='2026-01-01').attach(db)
+    return model, lambda: model.get_financial_summary('2026-01-01')
+
+@pytest.mark.parametrize('make_model', [session_ledger, ledger_engine])
+def test_writes_apply_as_deltas(db, make_model):
+    model, summary = make_model(db)
+    assert summary()['balance'] == 70
+    transaction_id = db.add_transaction(20, 'expense', 'Lazer', 'bar', '2026-01-11')
+    db.update_transaction(transaction_id, 25, 'expense', 'Lazer', 'bar', '2026-01-11')
+    assert summary()['balance'] == 45
+    assert (model.reloads, model.deltas) == (1, 2)
+
+@pytest.mark.parametrize('make_model', [session_ledger, ledger_engine])
+def test_revision_gap_reloads(db, tmp_path, make_model):
+    model, summary = make_model(db)
+    summary()
+
+    # Escrita de outra sessão: este modelo não recebe o evento
+    other = DatabaseManager(str(tmp_path / 'finance.db'))
+    other.add_transaction(50, 'expense', 'Lazer', 'show', '2026-01-12')
+    other.close()
+    assert summary()['balance'] == 20
+    assert model.reloads == 2
+
+    # O evento seguinte chega com uma lacuna de revisão: descartado, e a leitura recarrega
+    db.conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'ledger_revision'")
+    db.conn.commit()
+    db.add_transaction(10, 'expense', 'Lazer', 'café', '2026-01-13')
+    assert model.deltas == 0
+    assert summary()['balance'] == 10
+    assert model.reloads == 3
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+from utils.helpers import DEFAULT_CURRENCY, CURRENCY_SYMBOLS
+
+# Códigos ASCII usados na montagem dos números
+SPACE, COMMA, DOT, ZERO = 32, 44, 46, 48
+
+def _units(values, decimals):
+    """Valores absolutos em unidades da última casa, com a metade arredondada para longe
+    do zero: a mesma conta de round_half_up, usada por format_currency e format_percentage
+    """
+    scaled = np.abs(values.to_numpy(dtype=float, na_value=0.0)) * 10 ** decimals
+    return np.floor(scaled + 0.5).astype(np.int64)
+
+def _number_strings(values, decimals):
+    """Valores absolutos no formato pt-BR (1.234,56), montados em lote com NumPy.
+    
+    Cada coluna de uma matriz de bytes recebe um dígito ou separador de todas as
+    linhas de uma vez; posições antes do primeiro dígito ficam em branco e são
+    removidas no final. Não há formatação linha a linha em Python.
+    """
+    scale = 10 ** decimals
+    units = _units(values, decimals)
+    integer, fraction = units // scale, units % scale
+    int_digits = len(str(int(integer.max()))) if len(units) else 1
+    
+    columns = []
+    for k in reversed(range(int_digits)):
+        power = 10 ** k
+        present = (integer >= power) | (k == 0)
+        columns.append(np.where(present, (integer // power) % 10 + ZERO, SPACE))
+        if k and k % 3 == 0:
+            columns.append(np.where(present, DOT, SPACE))
+    if decimals:
+        columns.append(np.full(len(units), COMMA))
+        for k in reversed(range(decimals)):
+            columns.append((fraction // 10 ** k) % 10 + ZERO)
+    
+    chars = np.ascontiguousarray(np.column_stack(columns).astype(np.uint8))
+    width = chars.shape[1]
+    text = chars.view(f'S{width}').ravel().astype(f'U{width}')
+    return pd.Series(text, index=values.index).str.lstrip()
+
+def _signs(values, decimals):
+    """'-' só para valores que continuam negativos depois do arredondamento"""
+    negative = (values.to_numpy(dtype=float, na_value=0.0) < 0) & (_units(values, decimals) > 0)
+    return pd.Series(np.where(negative, '-', ''), index=values.index)
+
+def format_currency_column(values, currency=DEFAULT_CURRENCY, decimals=2):
+    """Formata uma coluna inteira como moeda (R$ 1.234,56; -R$ 10,00).
+    
+    currency pode ser um código único ou uma Series com a moeda de cada linha.
+    """
+    values = pd.Series(values)
+    if isinstance(currency, pd.Series):
+        # Alinhada às linhas e sempre texto (vazia, viraria object e não concatenaria)
+        symbols = currency.map(CURRENCY_SYMBOLS).fillna(currency).astype(str).set_axis(values.index)
+    else:
+        symbols = CURRENCY_SYMBOLS.get(currency, currency)
+    
+    text = _signs(values, decimals) + symbols + ' ' + _number_strings(values, decimals)
+    return text.where(values.notna(), '')
+
+def format_percentage_column(values, decimals=1):
+    """Formata uma coluna como porcentagem pt-BR (12,5%)"""
+    values = pd.Series(values)
+    text = _signs(values, decimals) + _number_strings(values, decimals) + '%'
+    return text.where(values.notna(), '')
+
+def format_date_column(dates):
+    """Formata uma coluna de datas como DD/MM/AAAA"""
+    return pd.to_datetime(pd.Series(dates)).dt.strftime('%d/%m/%Y').fillna('')
@@ -1,13 +1,41 @@
+import calendar
+import hashlib
+import math
 import pandas as pd
-from datetime import datetime
+from datetime import date, datetime
 
-def format_currency(value):
-    """Formata valor como moeda brasileira"""
-    return f"R$ {value:,.2f}"
+DEFAULT_CURRENCY = 'BRL'
+CURRENCY_SYMBOLS = {'BRL': 'R$', 'USD': 'US$', 'EUR': '€'}
+
+def currency_symbol(currency=DEFAULT_CURRENCY):
+    """Símbolo da moeda (o próprio código ISO se não houver símbolo conhecido)"""
+    return CURRENCY_SYMBOLS.get(currency, currency)
+
+# Troca os separadores do formato americano (1,234.56) pelos brasileiros (1.234,56)
+PT_BR_SEPARATORS = str.maketrans(',.', '.,')
+
+def round_half_up(value, decimals=2):
+    """Arredonda a metade para longe do zero (0,005 -> 0,01).
+    
+    Mesma conta das colunas de utils.formatting (valor absoluto vezes a escala,
+    mais meio, piso), para que o valor avulso e a coluna nunca divirjam.
+    """
+    if not math.isfinite(value):
+        return value
+    scale = 10 ** decimals
+    return math.copysign(math.floor(abs(value) * scale + 0.5) / scale, value)
+
+def format_currency(value, currency=DEFAULT_CURRENCY):
+    """Formata valor na moeda informada, no padrão brasileiro (R$ 1.234,56)"""
+    value = round_half_up(value, 2)
+    sign = '-' if value < 0 else ''
+    return f"{sign}{currency_symbol(currency)} {abs(value):,.2f}".translate(PT_BR_SEPARATORS)
 
 def format_percentage(value):
-    """Formata valor como porcentagem"""
-    return f"{value:.1f}%"
+    """Formata valor como porcentagem (12,5%)"""
+    value = round_half_up(value, 1)
+    sign = '-' if value < 0 else ''
+    return f"{sign}{abs(value):,.1f}%".translate(PT_BR_SEPARATORS)
 
 def get_month_name(month_number):
     """Retorna o nome do mês"""
@@ -17,26 +45,155 @@ def get_month_name(month_number):
     ]
     return months[month_number - 1]
 
+def comparison_periods(mode, reference=None):
+    """Períodos (início, fim) atual e anterior até a data de referência.
+    
+    'mom' compara o mês corrente com o mesmo trecho do mês anterior; 'yoy', o ano
+    corrente com o mesmo trecho do ano anterior.
+    """
+    reference = reference or datetime.now().date()
+    if mode == 'mom':
+        current_start = reference.replace(day=1)
+        year, month = (reference.year, reference.month - 1) if reference.month > 1 else (reference.year - 1, 12)
+    elif mode == 'yoy':
+        current_start = reference.replace(month=1, day=1)
+        year, month = reference.year - 1, reference.month
+    else:
+        raise ValueError(f"Modo de comparação inválido: {mode}")
+    
+    # Dia equivalente no período anterior, limitado ao tamanho do mês (ex.: 31/03 -> 29/02)
+    previous_end = date(year, month, min(reference.day, calendar.monthrange(year, month)[1]))
+    previous_start = previous_end.replace(day=1) if mode == 'mom' else date(year, 1, 1)
+    return (current_start, reference), (previous_start, previous_end)
+
+# Frequências das transações recorrentes (o intervalo multiplica a unidade)
+RECURRENCE_FREQUENCIES = {'monthly': 'Mensal', 'weekly': 'Semanal', 'daily': 'Diária'}
+
+def recurrence_dates(start_date, frequency, interval, until, after=None):
+    """Ocorrências de uma regra entre start_date e until, posteriores a after.
+    
+    Na frequência mensal o dia do início é mantido e limitado ao tamanho do mês
+    (31/01 -> 28/02 -> 31/03).
+    """
+    start, until = pd.Timestamp(start_date), pd.Timestamp(until)
+    if until < start:
+        return pd.DatetimeIndex([])
+    
+    if frequency == 'monthly':
+        months = (until.year - start.year) * 12 + until.month - start.month
+        offsets = pd.Series(range(0, months + 1, interval)) + start.year * 12 + start.month - 1
+        first_days = pd.to_datetime(pd.DataFrame({'year': offsets // 12, 'month': offsets % 12 + 1, 'day': 1}))
+        days = first_days.dt.days_in_month.clip(upper=start.day) - 1
+        dates = pd.DatetimeIndex(first_days + pd.to_timedelta(days, unit='D'))
+    elif frequency in ('weekly', 'daily'):
+        step = interval * (7 if frequency == 'weekly' else 1)
+        dates = pd.date_range(start, until, freq=f'{step}D')
+    else:
+        raise ValueError(f"Frequência inválida: {frequency}")
+    
+    dates = dates[dates <= until]
+    if after is not None:
+        dates = dates[dates > pd.Timestamp(after)]
+    return dates
+
 def calculate_age_in_days(start_date, end_date=None):
     """Calcula diferença em dias entre duas datas"""
     if end_date is None:
         end_date = datetime.now().date()
     return (end_date - start_date).days
 
-def validate_transaction_data(amount, type, category, date):
-    """Valida dados da transação"""
-    errors = []
+# Códigos de erro da validação (bits combináveis; 0 = linha válida)
+INVALID_AMOUNT = 1
+INVALID_TYPE = 2
+MISSING_CATEGORY = 4
+UNKNOWN_CATEGORY = 8
+INVALID_DATE = 16
+FUTURE_DATE = 32
+
+VALIDATION_MESSAGES = {
+    INVALID_AMOUNT: "Valor deve ser maior que zero",
+    INVALID_TYPE: "Tipo deve ser 'income' ou 'expense'",
+    MISSING_CATEGORY: "Categoria é obrigatória",
+    UNKNOWN_CATEGORY: "Categoria não cadastrada",
+    INVALID_DATE: "Data inválida",
+    FUTURE_DATE: "Data não pode ser futura",
+}
+
+def validate_transactions(transactions, known_categories=None, today=None):
+    """Valida um lote de transações de uma vez, com máscaras do pandas.
     
-    if amount <= 0:
-        errors.append("Valor deve ser maior que zero")
+    Aceita um DataFrame ou um dicionário de colunas (amount, type, category, date)
+    e retorna, por linha, a soma dos códigos de erro encontrados. A categoria só
+    é conferida contra known_categories quando ele é informado.
+    """
+    df = pd.DataFrame(transactions)
+    today = pd.Timestamp(today or datetime.now().date())
     
-    if type not in ['income', 'expense']:
-        errors.append("Tipo deve ser 'income' ou 'expense'")
+    amounts = pd.to_numeric(df['amount'], errors='coerce')
+    categories = df['category'].fillna('').astype(str).str.strip()
+    dates = pd.to_datetime(df['date'], errors='coerce')
     
-    if not category or category.strip() == "":
-        errors.append("Categoria é obrigatória")
+    errors = pd.Series(0, index=df.index, dtype='int64')
+    errors += INVALID_AMOUNT * ~(amounts > 0)
+    errors += INVALID_TYPE * ~df['type'].isin(['income', 'expense'])
+    errors += MISSING_CATEGORY * (categories == '')
+    if known_categories is not None:
+        errors += UNKNOWN_CATEGORY * ((categories != '') & ~categories.isin(list(known_categories)))
+    errors += INVALID_DATE * dates.isna()
+    errors += FUTURE_DATE * (dates.dt.normalize() > today)
+    return errors
+
+def validation_messages(code):
+    """Mensagens correspondentes a um código de erro combinado"""
+    return [message for flag, message in VALIDATION_MESSAGES.items() if code & flag]
+
+def validate_transaction_data(amount, type, category, date, known_categories=None):
+    """Valida dados da transação"""
+    code = validate_transactions(
+        {'amount': [amount], 'type': [type], 'category': [category], 'date': [date]},
+        known_categories
+    ).iloc[0]
+    return validation_messages(code)
+
+def normalize_descriptions(descriptions):
+    """Normaliza descrições para comparação: minúsculas, sem acentos e sem pontuação"""
+    text = descriptions.fillna('').astype(str)
+    text = text.str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('ascii')
+    return text.str.lower().str.replace(r'[^a-z0-9]+', ' ', regex=True).str.strip()
+
+def normalize_tags(tags):
+    """Lista de tags sem repetição: minúsculas, sem espaços nas pontas e com hífen no lugar de espaços.
     
-    if date > datetime.now().date():
-        errors.append("Data não pode ser futura")
+    Aceita uma lista ou um texto separado por vírgulas ("Viagem 2026, empresa").
+    """
+    if isinstance(tags, str):
+        tags = tags.split(',')
+    names = (' '.join(str(tag).split()).lower().replace(' ', '-') for tag in tags or [])
+    return list(dict.fromkeys(name for name in names if name))
+
+def fingerprint_keys(transactions):
+    """Chave de comparação de cada transação: data, tipo, valor em centavos, descrição normalizada e conta"""
+    dates = pd.to_datetime(transactions['date']).dt.strftime('%Y-%m-%d')
+    cents = (transactions['amount'].astype(float) * 100).round().astype('int64').astype(str)
+    accounts = transactions['account'].fillna('').astype(str) if 'account' in transactions else ''
+    return (
+        dates + '|' + transactions['type'].astype(str) + '|' + cents + '|'
+        + normalize_descriptions(transactions['description']) + '|' + accounts
+    )
+
+def fingerprint(key, occurrence):
+    """Impressão digital da ocorrência de número occurrence de uma chave"""
+    return hashlib.sha1(f'{key}|{occurrence}'.encode()).hexdigest()
+
+def transaction_fingerprints(transactions):
+    """Impressão digital determinística de cada transação importada.
     
-    return errors
\ No newline at end of file
+    Linhas idênticas no mesmo arquivo recebem um número de ocorrência, para que
+    reimportar o mesmo extrato reconheça cada uma delas. Com a coluna source
+    (arquivo de origem), a contagem recomeça em cada arquivo: uma linha repetida
+    em dois extratos sobrepostos tem a mesma impressão nos dois.
+    """
+    keys = fingerprint_keys(transactions)
+    groups = [transactions['source'].astype(str), keys] if 'source' in transactions else keys
+    occurrences = keys.groupby(groups).cumcount()
+    return [fingerprint(key, occurrence) for key, occurrence in zip(keys, occurrences)]